@@ -0,0 +1,61 @@
+"""add order_outbox
+
+Revision ID: c3f1a9d27e54
+Revises: 6f139c5ff74b
+Create Date: 2026-10-19 09:12:41.503318
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c3f1a9d27e54"
+down_revision: Union[str, Sequence[str], None] = "6f139c5ff74b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+order_intake_status_enum = sa.Enum(
+    "pending",
+    "completed",
+    "rejected",
+    name="order_intake_status_enum",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "order_outbox",
+        sa.Column("order_id", sa.UUID(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("estimate_id", sa.UUID(), nullable=False),
+        sa.Column("status", order_intake_status_enum, nullable=False),
+        sa.Column("error", sa.String(length=1024), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("processed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["estimate_id"], ["estimates.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("order_id"),
+    )
+    op.create_index(
+        "ix_order_outbox_pending",
+        "order_outbox",
+        ["created_at"],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_order_outbox_pending", table_name="order_outbox")
+    op.drop_table("order_outbox")
+    order_intake_status_enum.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,75 @@
+"""indexes for the repository queries
+
+Revision ID: d8e4b7a2c915
+Revises: c3f1a9d27e54
+Create Date: 2026-10-19 15:40:12.118204
+
+Recommended by `python -m app.index_advisor` on a generated dataset.
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d8e4b7a2c915"
+down_revision: Union[str, Sequence[str], None] = "c3f1a9d27e54"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # KNN ordering for nearby. GeoAlchemy may already have created this one
+    # with the table, so only add it where it is missing
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_merchants_geog ON merchants USING gist (geog)"
+    )
+
+    # Substring (ilike '%..%') name searches
+    op.create_index(
+        "ix_merchants_name_trgm",
+        "merchants",
+        ["name"],
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_items_name_trgm",
+        "items",
+        ["name"],
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+
+    # Order history: one user's orders, newest first, without a sort
+    op.create_index(
+        "ix_orders_user_id_created_at",
+        "orders",
+        ["user_id", sa.text("created_at DESC")],
+    )
+    op.drop_index("ix_orders_user_id", table_name="orders")
+
+    # History loads order items by order, merchant deletes cascade to estimates
+    op.create_index("ix_order_items_order_id", "order_items", ["order_id"])
+    op.create_index("ix_estimate_items_merchant_id", "estimate_items", ["merchant_id"])
+
+    # Duplicates of the primary key indexes
+    op.drop_index("ix_merchants_id", table_name="merchants")
+    op.drop_index("ix_items_id", table_name="items")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index("ix_items_id", "items", ["id"], unique=False)
+    op.create_index("ix_merchants_id", "merchants", ["id"], unique=False)
+    op.drop_index("ix_estimate_items_merchant_id", table_name="estimate_items")
+    op.drop_index("ix_order_items_order_id", table_name="order_items")
+    op.create_index("ix_orders_user_id", "orders", ["user_id"])
+    op.drop_index("ix_orders_user_id_created_at", table_name="orders")
+    op.drop_index("ix_items_name_trgm", table_name="items")
+    op.drop_index("ix_merchants_name_trgm", table_name="merchants")
+    # idx_merchants_geog stays, it may predate this revision
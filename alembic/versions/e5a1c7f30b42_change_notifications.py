@@ -0,0 +1,115 @@
+"""notify workers of catalog and user changes
+
+Revision ID: e5a1c7f30b42
+Revises: d8e4b7a2c915
+Create Date: 2026-10-19 18:05:47.530216
+
+Statement-level triggers send the changed keys on the `catalog_changes`
+channel; app.invalidation fans them out to the in-process caches.
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e5a1c7f30b42"
+down_revision: Union[str, Sequence[str], None] = "d8e4b7a2c915"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Larger statements notify without ids, listeners then drop everything
+MAX_IDS = 100
+
+# TG_ARGV[0] is the key column sent to listeners. Further arguments list the
+# columns an UPDATE has to change to be worth a notification; without them
+# every updated row counts.
+NOTIFY_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION notify_row_changes() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    key_column text := TG_ARGV[0];
+    watched text;
+    changed text[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        EXECUTE format(
+            'SELECT array_agg(DISTINCT %I::text) FROM new_rows', key_column
+        ) INTO changed;
+    ELSIF TG_OP = 'DELETE' THEN
+        EXECUTE format(
+            'SELECT array_agg(DISTINCT %I::text) FROM old_rows', key_column
+        ) INTO changed;
+    ELSE
+        IF TG_NARGS > 1 THEN
+            SELECT format(
+                '(%s) IS DISTINCT FROM (%s)',
+                string_agg(format('n.%I', c), ', '),
+                string_agg(format('o.%I', c), ', ')
+            ) INTO watched
+            FROM unnest(TG_ARGV[1:]) AS c;
+        ELSE
+            watched := 'true';
+        END IF;
+        EXECUTE format(
+            'SELECT array_agg(DISTINCT n.%I::text) FROM new_rows n '
+            'JOIN old_rows o ON o.id = n.id WHERE %s',
+            key_column, watched
+        ) INTO changed;
+    END IF;
+
+    IF changed IS NOT NULL THEN
+        PERFORM pg_notify(
+            'catalog_changes',
+            json_build_object(
+                'table', TG_TABLE_NAME,
+                'ids', CASE WHEN cardinality(changed) <= {MAX_IDS}
+                            THEN to_json(changed) END
+            )::text
+        );
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+# table -> (key column, columns an UPDATE must change). Items only count for
+# what cached order history shows of them: stock moves on every order and
+# price edits are not shown, history prices come from the order. Orders have no
+# trigger: inserting them is the hottest write path, and cached history
+# pages check the user's order count and latest order themselves.
+TRIGGERS = {
+    "merchants": ("id", ()),
+    "items": ("id", ("merchant_id", "name", "product_category", "image_url")),
+    "users": ("id", ()),
+}
+
+# Postgres allows transition tables only on single-event triggers
+EVENTS = {
+    "insert": "REFERENCING NEW TABLE AS new_rows",
+    "update": "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    "delete": "REFERENCING OLD TABLE AS old_rows",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(NOTIFY_FUNCTION)
+    for table, (key, watched) in TRIGGERS.items():
+        for event, referencing in EVENTS.items():
+            arguments = ", ".join(f"'{arg}'" for arg in (key, *watched))
+            op.execute(
+                f"CREATE TRIGGER {table}_notify_{event} "
+                f"AFTER {event.upper()} ON {table} {referencing} "
+                f"FOR EACH STATEMENT EXECUTE FUNCTION notify_row_changes({arguments})"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TRIGGERS:
+        for event in EVENTS:
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_notify_{event} ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS notify_row_changes()")
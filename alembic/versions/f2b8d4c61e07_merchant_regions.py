@@ -0,0 +1,49 @@
+"""region keys on merchants and items
+
+Revision ID: f2b8d4c61e07
+Revises: e5a1c7f30b42
+Create Date: 2026-10-19 20:12:33.904871
+
+The geohash cell of each merchant (app.merchants.regions), copied onto its
+items. Partitioning on it is a separate step, `python -m
+app.merchants.partitioning convert`, since it rewrites both tables.
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f2b8d4c61e07"
+down_revision: Union[str, Sequence[str], None] = "e5a1c7f30b42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("merchants", sa.Column("region", sa.String(length=8)))
+    op.add_column("items", sa.Column("region", sa.String(length=8)))
+
+    # ST_GeoHash gives the same cells app.merchants.regions computes for new
+    # rows, at its REGION_PRECISION
+    op.execute(
+        "UPDATE merchants SET region = "
+        "ST_GeoHash(ST_SetSRID(ST_MakePoint(longitude, latitude), 4326), 3)"
+    )
+    op.execute(
+        "UPDATE items SET region = merchants.region "
+        "FROM merchants WHERE merchants.id = items.merchant_id"
+    )
+
+    op.alter_column("merchants", "region", nullable=False)
+    op.alter_column("items", "region", nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("items", "region")
+    op.drop_column("merchants", "region")
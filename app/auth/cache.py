@@ -0,0 +1,94 @@
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.invalidation import change_listener
+from app.users.models import User
+
+from .schemas import CurrentUser
+
+
+class AuthUserCache:
+    """
+    Bounded TTL cache of authenticated users keyed on the token subject,
+    so most authenticated requests skip the `users` lookup entirely.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, CurrentUser]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, subject: str) -> Optional[CurrentUser]:
+        entry = self._entries.get(subject)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[subject]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(subject)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, subject: str, user: CurrentUser) -> None:
+        if not self.enabled:
+            return
+        self._entries[subject] = (time.monotonic() + self.ttl_seconds, user)
+        self._entries.move_to_end(subject)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str) -> None:
+        if self._entries.pop(subject, None) is not None:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "ttlSeconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": (self.hits / lookups) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+auth_user_cache = AuthUserCache(
+    max_entries=settings.auth_user_cache_max_entries,
+    ttl_seconds=settings.auth_user_cache_ttl_seconds,
+)
+
+
+# Drop cached users whenever this process changes or deletes them
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target: User) -> None:
+    auth_user_cache.invalidate(str(target.id))
+
+
+# ...and whenever any worker does, including plain SQL
+def _invalidate_changed_users(ids: Optional[List[str]]) -> None:
+    if ids is None:
+        auth_user_cache.clear()
+        return
+    for user_id in ids:
+        auth_user_cache.invalidate(user_id)
+
+
+change_listener.register("users", _invalidate_changed_users)
@@ -0,0 +1,92 @@
+"""
+Benchmark Argon2id cost parameters on this host.
+
+Starts from the largest allowed memory cost and raises time_cost until a
+single hash reaches the target latency, halving memory when even time_cost=1
+is too slow. Prints the matching settings for the environment.
+
+    python -m app.auth.calibrate --target-ms 250 --max-memory-mib 256
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from argon2 import PasswordHasher
+
+
+def measure_ms(time_cost: int, memory_cost_kib: int, parallelism: int, rounds: int):
+    hasher = PasswordHasher(
+        time_cost=time_cost, memory_cost=memory_cost_kib, parallelism=parallelism
+    )
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        hasher.hash("calibration-password")
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def calibrate(
+    target_ms: float,
+    max_memory_mib: int,
+    min_memory_mib: int,
+    parallelism: int,
+    rounds: int,
+):
+    memory_kib = max_memory_mib * 1024
+    while memory_kib >= min_memory_mib * 1024:
+        best = None
+        time_cost = 1
+        while True:
+            elapsed = measure_ms(time_cost, memory_kib, parallelism, rounds)
+            print(f"  m={memory_kib // 1024:>5} MiB  t={time_cost:>2}  {elapsed:8.1f} ms")
+            if elapsed > target_ms:
+                break
+            best = (time_cost, memory_kib, elapsed)
+            time_cost += 1
+        if best is not None:
+            return best
+        memory_kib //= 2
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--max-memory-mib", type=int, default=256)
+    parser.add_argument("--min-memory-mib", type=int, default=19)
+    parser.add_argument("--parallelism", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"Calibrating Argon2id for <= {args.target_ms:.0f} ms per hash "
+        f"(parallelism={args.parallelism})"
+    )
+    result = calibrate(
+        args.target_ms,
+        args.max_memory_mib,
+        args.min_memory_mib,
+        args.parallelism,
+        args.rounds,
+    )
+    if result is None:
+        raise SystemExit(
+            "Even the minimum memory cost exceeds the target, raise --target-ms"
+        )
+
+    time_cost, memory_kib, elapsed = result
+    print(f"\nSelected: {elapsed:.1f} ms per hash")
+    print(f"ARGON2_TIME_COST={time_cost}")
+    print(f"ARGON2_MEMORY_COST_KIB={memory_kib}")
+    print(f"ARGON2_PARALLELISM={args.parallelism}")
+    print(
+        "Each PASSWORD_POOL_WORKERS thread then handles about "
+        f"{1000 / elapsed:.1f} logins/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
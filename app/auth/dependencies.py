@@ -1,13 +1,17 @@
 from typing import Optional
+from uuid import UUID
 
 from fastapi import Depends, HTTPException, Security, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.dependencies import get_session
-from app.users.models import User
+from app.observability.tracing import start_span
 
+from .cache import auth_user_cache
+from .repository import AuthRepository
+from .schemas import CurrentUser
 from .utils import decode_access_token
 
 bearer_scheme = HTTPBearer(auto_error=False)  # Handle errors ourselves
@@ -16,7 +20,7 @@ bearer_scheme = HTTPBearer(auto_error=False)  # Handle errors ourselves
 async def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Security(bearer_scheme),
     session: AsyncSession = Depends(get_session),
-):
+) -> CurrentUser:
     if (
         credentials is None
         or credentials.scheme.lower() != "bearer"
@@ -27,20 +31,36 @@ async def get_current_user(
         )
 
     token = credentials.credentials
-    payload = decode_access_token(token)
+    with start_span("auth.decode_access_token"):
+        payload = decode_access_token(token)
     subject = payload.get("sub")
     if subject is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload"
         )
+    try:
+        user_id = UUID(subject)
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload"
+        )
+
+    # The token is signed by us, so its claims can stand in for the users row
+    username = payload.get("username")
+    if settings.auth_trust_token_claims and isinstance(username, str):
+        return CurrentUser(id=user_id, username=username)
+
+    cached = auth_user_cache.get(subject)
+    if cached is not None:
+        return cached
 
-    user_id = subject
-    stmt = select(User).where(User.id == user_id)
-    result = await session.execute(stmt)
-    user = result.scalars().first()
+    # The session only checks out a connection here, on a cache miss
+    user = await AuthRepository.get_user_by_id(session, subject)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
         )
 
-    return user
+    current_user = CurrentUser(id=user.id, username=user.username)
+    auth_user_cache.set(subject, current_user)
+    return current_user
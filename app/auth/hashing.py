@@ -0,0 +1,63 @@
+from app.config import settings
+
+from .pool import password_pool
+
+
+class PasswordHashingService:
+    """
+    The single place passwords are hashed and verified (Argon2id).
+    Cost parameters come from Settings; `python -m app.auth.calibrate` picks
+    values for the current host. The argon2 backend is loaded on first use.
+    """
+
+    def __init__(self, time_cost: int, memory_cost_kib: int, parallelism: int):
+        self.time_cost = time_cost
+        self.memory_cost_kib = memory_cost_kib
+        self.parallelism = parallelism
+        self._hasher = None
+
+    @property
+    def hasher(self):
+        if self._hasher is None:
+            from argon2 import PasswordHasher
+
+            self._hasher = PasswordHasher(
+                time_cost=self.time_cost,
+                memory_cost=self.memory_cost_kib,
+                parallelism=self.parallelism,
+            )
+        return self._hasher
+
+    def hash(self, password: str) -> str:
+        return self.hasher.hash(password)
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        from argon2.exceptions import InvalidHashError, VerificationError
+
+        try:
+            return self.hasher.verify(password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True when the hash was made with other parameters than the current ones."""
+        from argon2.exceptions import InvalidHashError
+
+        try:
+            return self.hasher.check_needs_rehash(password_hash)
+        except InvalidHashError:
+            return True
+
+    # Async variants run on the bounded password pool, off the event loop
+    async def hash_async(self, password: str) -> str:
+        return await password_pool.run(self.hash, password)
+
+    async def verify_async(self, password_hash: str, password: str) -> bool:
+        return await password_pool.run(self.verify, password_hash, password)
+
+
+password_hasher = PasswordHashingService(
+    time_cost=settings.argon2_time_cost,
+    memory_cost_kib=settings.argon2_memory_cost_kib,
+    parallelism=settings.argon2_parallelism,
+)
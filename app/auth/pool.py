@@ -0,0 +1,106 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+
+T = TypeVar("T")
+
+
+class PasswordWorkerPool:
+    """
+    Size-limited thread pool for Argon2 hashing and verification.
+    argon2-cffi releases the GIL while hashing, so threads keep the event loop
+    free. Work beyond `max_workers + max_queue` outstanding jobs is rejected
+    with 503 instead of piling up.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._outstanding = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.run_seconds_total = 0.0
+        self.latency_seconds_max = 0.0
+
+    @property
+    def outstanding(self) -> int:
+        return self._outstanding
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="password-pool"
+            )
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        if self._outstanding >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent logins, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        timings = {}
+
+        def job() -> T:
+            timings["started"] = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                timings["finished"] = time.perf_counter()
+
+        self._outstanding += 1
+        future = self._get_executor().submit(job)
+        # Released when the thread is really done, even if the request was cancelled
+        future.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(self._record, submitted, timings)
+        )
+        return await asyncio.wrap_future(future)
+
+    def _record(self, submitted: float, timings: dict) -> None:
+        self._outstanding -= 1
+        self.completed += 1
+        started = timings.get("started", submitted)
+        finished = timings.get("finished", started)
+        self.wait_seconds_total += started - submitted
+        self.run_seconds_total += finished - started
+        self.latency_seconds_max = max(self.latency_seconds_max, finished - submitted)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        completed = self.completed
+        return {
+            "maxWorkers": self.max_workers,
+            "maxQueue": self.max_queue,
+            "outstanding": self._outstanding,
+            "completed": completed,
+            "rejected": self.rejected,
+            "avgWaitMs": (self.wait_seconds_total / completed * 1000)
+            if completed
+            else 0.0,
+            "avgRunMs": (self.run_seconds_total / completed * 1000)
+            if completed
+            else 0.0,
+            "maxLatencyMs": self.latency_seconds_max * 1000,
+        }
+
+
+password_pool = PasswordWorkerPool(
+    max_workers=settings.password_pool_workers,
+    max_queue=settings.password_pool_max_queue,
+)
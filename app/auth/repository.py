@@ -1,12 +1,30 @@
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload
 
 from app.users.models import User
 
+# Authentication needs the users row only; without this every lookup would
+# also selectin-load the user's orders and everything hanging off them
+USER_ONLY = raiseload("*")
+
 
 class AuthRepository:
     @staticmethod
     async def get_user_by_username(session: AsyncSession, username: str) -> User | None:
-        stmt = select(User).where(User.username == username)
+        stmt = select(User).where(User.username == username).options(USER_ONLY)
         result = await session.execute(stmt)
         return result.scalars().first()
+
+    @staticmethod
+    async def get_user_by_id(session: AsyncSession, user_id: str) -> User | None:
+        stmt = select(User).where(User.id == user_id).options(USER_ONLY)
+        result = await session.execute(stmt)
+        return result.scalars().first()
+
+    @staticmethod
+    async def update_password_hash(
+        session: AsyncSession, user: User, password_hash: str
+    ) -> None:
+        user.password_hash = password_hash
+        await session.flush()
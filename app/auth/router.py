@@ -4,10 +4,26 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.auth.schemas import LoginRequest, TokenResponse
 from app.auth.service import AuthService
 from app.dependencies import get_session
+from app.observability.dependencies import query_budget
+from app.ratelimit.dependencies import (
+    check_login_user_rate,
+    limit_login_rate,
+    login_slot,
+)
 
 router = APIRouter(prefix="/api/v1", tags=["auth"])
 
 
-@router.post("/login", response_model=TokenResponse)
+@router.post(
+    "/login",
+    response_model=TokenResponse,
+    dependencies=[
+        Depends(limit_login_rate),
+        Depends(login_slot),
+        # User lookup, plus the UPDATE when the hash needs upgrading
+        Depends(query_budget(2)),
+    ],
+)
 async def login(data: LoginRequest, session: AsyncSession = Depends(get_session)):
+    check_login_user_rate(data.username)
     return await AuthService.login(session, data)
@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+import uuid
+
+from pydantic import BaseModel, ConfigDict
 
 
 class LoginRequest(BaseModel):
@@ -8,3 +10,10 @@ class LoginRequest(BaseModel):
 
 class TokenResponse(BaseModel):
     access_token: str
+
+
+class CurrentUser(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    id: uuid.UUID
+    username: str
@@ -1,12 +1,14 @@
-from argon2 import PasswordHasher
+import logging
+
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.auth.hashing import password_hasher
 from app.auth.repository import AuthRepository
 from app.auth.schemas import LoginRequest, TokenResponse
 from app.auth.utils import create_access_token
 
-pwd_context = PasswordHasher()
+logger = logging.getLogger(__name__)
 
 
 class AuthService:
@@ -18,12 +20,23 @@ class AuthService:
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
             )
 
-        try:
-            pwd_context.verify(user.password_hash, data.password)
-        except Exception:
+        # Argon2 is CPU/memory heavy, keep it off the event loop
+        if not await password_hasher.verify_async(user.password_hash, data.password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
             )
 
-        token = create_access_token(subject=str(user.id))
+        # Upgrade hashes made with outdated parameters while we have the password
+        if password_hasher.needs_rehash(user.password_hash):
+            try:
+                new_hash = await password_hasher.hash_async(data.password)
+                await AuthRepository.update_password_hash(session, user, new_hash)
+                await session.commit()
+            except HTTPException:
+                # Pool is saturated; the login itself already succeeded
+                logger.info("Skipped password rehash for user %s", user.id)
+
+        token = create_access_token(
+            subject=str(user.id), claims={"username": user.username}
+        )
         return TokenResponse(access_token=token)
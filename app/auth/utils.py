@@ -1,41 +1,202 @@
+import hashlib
+import heapq
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 from fastapi import HTTPException, status
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
 
 from app.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 1 day by default
 ALGORITHM = "HS256"
-SECRET_KEY = settings.secret_key
 
+logger = logging.getLogger(__name__)
+
+
+class SigningKeyRing:
+    """
+    HS256 keys identified by `kid`. Tokens are signed with the active key and
+    verified with whichever key their header names, so old keys can stay in the
+    ring until every token signed with them has expired.
+    Keys are parsed into jose Key objects once, not on every sign/verify.
+    """
+
+    def __init__(self, secrets: Dict[str, str], active_kid: str):
+        if active_kid not in secrets:
+            raise ValueError(f"Active signing key {active_kid!r} is not in the keyset")
+        self.active_kid = active_kid
+        self._keys: Dict[str, Key] = {
+            kid: jwk.construct(secret, ALGORITHM) for kid, secret in secrets.items()
+        }
 
-def hash_password(plain: str) -> str:
-    return pwd_context.hash(plain)
+    @property
+    def kids(self) -> List[str]:
+        return list(self._keys)
 
+    @property
+    def active_key(self) -> Key:
+        return self._keys[self.active_kid]
 
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    def verification_key(self, kid: Optional[str]) -> Optional[Key]:
+        # Tokens issued before key ids existed carry no kid
+        if kid is None:
+            return self.active_key
+        return self._keys.get(kid)
 
 
-def create_access_token(subject: str, expires_minutes: Optional[int] = None) -> str:
+def load_signing_keys() -> SigningKeyRing:
+    """
+    Load the keyset from JWT_KEYS_FILE or JWT_KEYS, both holding JSON like
+    {"active": "2026-10", "keys": {"2026-10": "<secret>", "2026-04": "<secret>"}}.
+    Falls back to SECRET_KEY as a single key when neither is set.
+    """
+    raw = None
+    if settings.jwt_keys_file:
+        with open(settings.jwt_keys_file) as f:
+            raw = f.read()
+    elif settings.jwt_keys:
+        raw = settings.jwt_keys
+
+    if raw is not None:
+        keyset = json.loads(raw)
+        return SigningKeyRing(keyset["keys"], keyset["active"])
+
+    if "SECRET_KEY" not in os.environ:
+        logger.warning(
+            "No JWT keyset or SECRET_KEY configured, signing with a random "
+            "per-process key; tokens will not validate across workers or restarts"
+        )
+    return SigningKeyRing({"default": settings.secret_key}, "default")
+
+
+signing_keys = load_signing_keys()
+
+
+def reload_signing_keys() -> None:
+    """Re-read the keyset, e.g. after rotating keys on disk."""
+    global signing_keys
+    signing_keys = load_signing_keys()
+    token_cache.clear()
+
+
+def create_access_token(
+    subject: str,
+    expires_minutes: Optional[int] = None,
+    claims: Optional[dict] = None,
+) -> str:
     expire = datetime.now() + timedelta(
         minutes=(expires_minutes or ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    to_encode = {"sub": subject, "exp": expire}
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    to_encode = {**(claims or {}), "sub": subject, "exp": expire}
+    return jwt.encode(
+        to_encode,
+        signing_keys.active_key,
+        algorithm=ALGORITHM,
+        headers={"kid": signing_keys.active_kid},
+    )
+
+
+class TokenCache:
+    """
+    LRU cache of verified token payloads keyed on the token digest.
+    Entries are never served at or after the token's `exp`, and expired ones
+    are purged in expiry order on every insert.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()
+        self._expiries: List[Tuple[float, bytes]] = []
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._digest(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, token: str, payload: dict) -> None:
+        exp = payload.get("exp")
+        if self.max_entries <= 0 or not isinstance(exp, (int, float)):
+            return
+
+        now = time.time()
+        self._purge_expired(now)
+        if exp <= now:
+            return
+
+        key = self._digest(token)
+        self._entries[key] = (float(exp), payload)
+        self._entries.move_to_end(key)
+        heapq.heappush(self._expiries, (float(exp), key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        # LRU evictions leave stale heap entries behind, compact them now and then
+        if len(self._expiries) > 2 * self.max_entries:
+            self._expiries = [(e[0], k) for k, e in self._entries.items()]
+            heapq.heapify(self._expiries)
+
+    def _purge_expired(self, now: float) -> None:
+        while self._expiries and self._expiries[0][0] <= now:
+            exp, key = heapq.heappop(self._expiries)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == exp:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._expiries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+token_cache = TokenCache(max_entries=settings.token_cache_max_entries)
 
 
 def decode_access_token(token: str) -> dict:
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = signing_keys.verification_key(kid)
+        if key is None:
+            raise JWTError(f"Unknown signing key {kid!r}")
+        payload = jwt.decode(token, key, algorithms=[ALGORITHM])
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
         )
+    token_cache.set(token, payload)
+    return payload
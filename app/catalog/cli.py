@@ -0,0 +1,83 @@
+"""
+Bulk load merchants or items from CSV or NDJSON, straight into the database.
+
+    python -m app.catalog.cli merchants jakarta_merchants.csv
+    python -m app.catalog.cli items menus.ndjson --batch-rows 10000
+    zcat menus.csv.gz | python -m app.catalog.cli items - --format csv
+
+Fields match the API: merchants take merchantId (optional), name,
+merchantCategory, imageUrl, lat and long; items take itemId (optional),
+merchantId, name, productCategory, price, quantity and imageUrl. CSV files
+start with a header row. The same loader backs POST /api/v1/admin/catalog/*.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import AsyncIterator, BinaryIO
+
+from app.config import settings
+
+from .parsing import FORMATS
+from .service import CatalogIngestService
+
+CHUNK_BYTES = 1 << 20
+EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+
+async def read_chunks(f: BinaryIO) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await asyncio.to_thread(f.read, CHUNK_BYTES)
+        if not chunk:
+            return
+        yield chunk
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("kind", choices=("merchants", "items"))
+    parser.add_argument("path", help="File to load, - for stdin")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument(
+        "--batch-rows", type=int, default=settings.catalog_ingest_batch_rows
+    )
+    parser.add_argument("--max-errors", type=int, default=100)
+    parser.add_argument("--json", action="store_true", help="Print the full report")
+    args = parser.parse_args()
+
+    fmt = args.format or EXTENSIONS.get(os.path.splitext(args.path)[1].lower())
+    if fmt is None:
+        parser.error("cannot tell the format from the file name, pass --format")
+
+    f = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+    try:
+        report = asyncio.run(
+            CatalogIngestService.ingest(
+                args.kind, fmt, read_chunks(f), args.batch_rows, args.max_errors
+            )
+        )
+    finally:
+        f.close()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(
+            f"{report['received']} rows in {report['seconds']:.1f}s "
+            f"({report['rowsPerSecond']}/s): {report['inserted']} inserted, "
+            f"{report['updated']} updated, {report['unchanged']} unchanged, "
+            f"{report['failed']} failed"
+        )
+        for error in report["errors"]:
+            print(f"  line {error['line']}: {error['message']}", file=sys.stderr)
+        if report["errorsTruncated"]:
+            print("  ...", file=sys.stderr)
+    sys.exit(1 if report["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import csv
+import json
+import math
+import uuid
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.merchants.enums import ItemProductCategoryEnum, MerchantCategoryEnum
+from app.merchants.regions import region_of
+
+FORMATS = ("csv", "ndjson")
+
+CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+# Staging table columns after the leading line number, in COPY order
+MERCHANT_COLUMNS = (
+    "id",
+    "name",
+    "category",
+    "image_url",
+    "latitude",
+    "longitude",
+    "region",
+)
+ITEM_COLUMNS = (
+    "id",
+    "merchant_id",
+    "name",
+    "category",
+    "price",
+    "quantity",
+    "image_url",
+)
+
+
+class RowError(NamedTuple):
+    line: int
+    message: str
+
+
+class LineSplitter:
+    """Cuts an upload into numbered text lines as chunks arrive."""
+
+    def __init__(self):
+        self.line = 0
+        self._tail = b""
+
+    def feed(self, chunk: bytes) -> List[Tuple[int, str]]:
+        parts = (self._tail + chunk).split(b"\n")
+        self._tail = parts.pop()
+        return self._number(parts)
+
+    def close(self) -> List[Tuple[int, str]]:
+        tail, self._tail = self._tail, b""
+        return self._number([tail] if tail else [])
+
+    def _number(self, parts: List[bytes]) -> List[Tuple[int, str]]:
+        lines = []
+        for raw in parts:
+            self.line += 1
+            text = raw.decode("utf-8", errors="replace").rstrip("\r")
+            if self.line == 1:
+                text = text.lstrip("\ufeff")
+            if text.strip():
+                lines.append((self.line, text))
+        return lines
+
+
+def _text(record: dict, field: str, max_length: int) -> str:
+    value = record.get(field)
+    if value is None or not str(value).strip():
+        raise ValueError(f"{field} is required")
+    value = str(value).strip()
+    if len(value) > max_length:
+        raise ValueError(f"{field} is longer than {max_length} characters")
+    return value
+
+
+def _uuid(record: dict, field: str, generate: bool = False) -> uuid.UUID:
+    value = record.get(field)
+    if value in (None, "") and generate:
+        return uuid.uuid4()
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        raise ValueError(f"{field} is not a valid UUID") from None
+
+
+def _number(record: dict, field: str, low: float, high: float) -> float:
+    try:
+        value = float(record.get(field))
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} is not a number") from None
+    if not (low <= value <= high) or math.isnan(value):
+        raise ValueError(f"{field} must be between {low:g} and {high:g}")
+    return value
+
+
+def _integer(
+    record: dict, field: str, minimum: int, default: Optional[int] = None
+) -> int:
+    value = record.get(field)
+    if value in (None, "") and default is not None:
+        return default
+    try:
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} is not an integer") from None
+    if not minimum <= value <= 2**31 - 1:
+        raise ValueError(f"{field} must be between {minimum} and {2**31 - 1}")
+    return value
+
+
+def _url(record: dict, field: str) -> str:
+    value = _text(record, field, 1024)
+    parts = urlsplit(value)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        raise ValueError(f"{field} is not an http(s) URL")
+    return value
+
+
+def _enum(record: dict, field: str, enum) -> str:
+    value = record.get(field)
+    if not isinstance(value, str) or value not in enum.__members__:
+        raise ValueError(f"{field} must be one of {', '.join(enum.__members__)}")
+    return value
+
+
+def merchant_row(record: dict) -> tuple:
+    """Staging row for one merchant; a missing merchantId creates a new merchant."""
+    row = (
+        _uuid(record, "merchantId", generate=True),
+        _text(record, "name", 255),
+        _enum(record, "merchantCategory", MerchantCategoryEnum),
+        _url(record, "imageUrl"),
+        _number(record, "lat", -90, 90),
+        _number(record, "long", -180, 180),
+    )
+    return (*row, region_of(row[4], row[5]))
+
+
+def item_row(record: dict) -> tuple:
+    return (
+        _uuid(record, "itemId", generate=True),
+        _uuid(record, "merchantId"),
+        _text(record, "name", 255),
+        _enum(record, "productCategory", ItemProductCategoryEnum),
+        _integer(record, "price", 1),
+        _integer(record, "quantity", 0, default=0),
+        _url(record, "imageUrl"),
+    )
+
+
+ROW_BUILDERS: Dict[str, Callable[[dict], tuple]] = {
+    "merchants": merchant_row,
+    "items": item_row,
+}
+
+
+class RecordParser:
+    """
+    Turns numbered lines into staging rows, collecting an error per bad line.
+    CSV uploads start with a header naming the JSON fields; quoted values may
+    not span lines.
+    """
+
+    def __init__(self, kind: str, fmt: str):
+        self.build = ROW_BUILDERS[kind]
+        self.fmt = fmt
+        self.header: Optional[List[str]] = None
+
+    def parse(
+        self, lines: List[Tuple[int, str]]
+    ) -> Tuple[List[tuple], List[RowError]]:
+        rows, errors = [], []
+        for line, text in lines:
+            try:
+                record = self._record(text)
+                if record is None:
+                    continue
+                rows.append((line, *self.build(record)))
+            except ValueError as exc:
+                errors.append(RowError(line, str(exc)))
+        return rows, errors
+
+    def _record(self, text: str) -> Optional[dict]:
+        if self.fmt == "ndjson":
+            try:
+                record = json.loads(text)
+            except ValueError:
+                raise ValueError("not valid JSON") from None
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+            return record
+
+        values = next(csv.reader([text]))
+        if self.header is None:
+            self.header = [name.strip() for name in values]
+            return None
+        if len(values) != len(self.header):
+            raise ValueError(
+                f"expected {len(self.header)} columns, found {len(values)}"
+            )
+        return dict(zip(self.header, values))
@@ -0,0 +1,218 @@
+from typing import List, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.merchants.enums import ItemProductCategoryEnum, MerchantCategoryEnum
+
+from .parsing import ITEM_COLUMNS, MERCHANT_COLUMNS, RowError
+
+STAGING_DDL = {
+    "merchants": """
+        CREATE TEMP TABLE IF NOT EXISTS catalog_staging_merchants (
+            line integer NOT NULL,
+            id uuid NOT NULL,
+            name text NOT NULL,
+            category text NOT NULL,
+            image_url text NOT NULL,
+            latitude double precision NOT NULL,
+            longitude double precision NOT NULL,
+            region text NOT NULL
+        )
+    """,
+    "items": """
+        CREATE TEMP TABLE IF NOT EXISTS catalog_staging_items (
+            line integer NOT NULL,
+            id uuid NOT NULL,
+            merchant_id uuid NOT NULL,
+            name text NOT NULL,
+            category text NOT NULL,
+            price integer NOT NULL,
+            quantity integer NOT NULL,
+            image_url text NOT NULL
+        )
+    """,
+}
+
+STAGING_COLUMNS = {
+    "merchants": ("line", *MERCHANT_COLUMNS),
+    "items": ("line", *ITEM_COLUMNS),
+}
+
+# Arbitrary but fixed pg_advisory_xact_lock keys, one per table. The
+# NOT EXISTS inserts below cannot rely on a unique index on id once the
+# tables are partitioned (the key is then (id, region)), so concurrent
+# uploads take turns per batch instead of inserting the same id twice.
+UPSERT_LOCK_IDS = {"merchants": 4_817_202_510, "items": 4_817_202_511}
+
+# The last line wins when an upload repeats an id. Rows that would not change
+# are left alone, so their xmin (and the ETags built from it) stays put.
+# UPDATE then INSERT rather than ON CONFLICT (id): once partitioned there is
+# no unique index on id alone, and a merchant that moves can change region.
+UPSERT_MERCHANTS = text(
+    f"""
+    WITH latest AS (
+        SELECT DISTINCT ON (id) *
+        FROM catalog_staging_merchants
+        ORDER BY id, line DESC
+    ),
+    updated AS (
+        UPDATE merchants AS m SET
+            name = l.name,
+            merchant_category = l.category::{MerchantCategoryEnum.__pg_name__},
+            image_url = l.image_url,
+            latitude = l.latitude,
+            longitude = l.longitude,
+            geog = ST_SetSRID(ST_MakePoint(l.longitude, l.latitude), 4326)::geography,
+            region = l.region
+        FROM latest l
+        WHERE m.id = l.id
+          AND (m.name, m.merchant_category::text, m.image_url, m.latitude, m.longitude)
+              IS DISTINCT FROM (
+                  l.name, l.category, l.image_url, l.latitude, l.longitude
+              )
+        RETURNING false AS inserted
+    ),
+    inserted AS (
+        INSERT INTO merchants (
+            id, name, merchant_category, image_url, latitude, longitude, geog,
+            region
+        )
+        SELECT id, name, category::{MerchantCategoryEnum.__pg_name__}, image_url,
+               latitude, longitude,
+               ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography,
+               region
+        FROM latest l
+        WHERE NOT EXISTS (SELECT 1 FROM merchants m WHERE m.id = l.id)
+        RETURNING true AS inserted
+    )
+    SELECT inserted FROM updated
+    UNION ALL
+    SELECT inserted FROM inserted
+    """
+)
+
+# Items follow their merchant into its new region
+SYNC_ITEM_REGIONS = text(
+    """
+    UPDATE items AS i SET region = m.region
+    FROM merchants m
+    WHERE m.id = i.merchant_id
+      AND i.region <> m.region
+      AND m.id IN (SELECT id FROM catalog_staging_merchants)
+    """
+)
+
+REJECTED_ITEMS = text(
+    """
+    SELECT s.line, s.id,
+           CASE WHEN m.id IS NULL THEN 'merchantId does not exist'
+                ELSE 'itemId belongs to another merchant' END AS message
+    FROM catalog_staging_items s
+    LEFT JOIN merchants m ON m.id = s.merchant_id
+    LEFT JOIN items i ON i.id = s.id
+    WHERE m.id IS NULL OR i.merchant_id <> s.merchant_id
+    ORDER BY s.line
+    """
+)
+
+UPSERT_ITEMS = text(
+    f"""
+    WITH latest AS (
+        SELECT DISTINCT ON (id) *
+        FROM catalog_staging_items
+        ORDER BY id, line DESC
+    ),
+    updated AS (
+        UPDATE items AS i SET
+            name = l.name,
+            product_category = l.category::{ItemProductCategoryEnum.__pg_name__},
+            price = l.price,
+            quantity = l.quantity,
+            image_url = l.image_url
+        FROM latest l
+        WHERE i.id = l.id
+          AND i.merchant_id = l.merchant_id
+          AND (i.name, i.product_category::text, i.price, i.quantity, i.image_url)
+              IS DISTINCT FROM (
+                  l.name, l.category, l.price, l.quantity, l.image_url
+              )
+        RETURNING false AS inserted
+    ),
+    inserted AS (
+        INSERT INTO items (
+            id, merchant_id, region, name, product_category, price, quantity,
+            image_url
+        )
+        SELECT l.id, l.merchant_id, m.region, l.name,
+               l.category::{ItemProductCategoryEnum.__pg_name__},
+               l.price, l.quantity, l.image_url
+        FROM latest l
+        JOIN merchants m ON m.id = l.merchant_id
+        WHERE NOT EXISTS (SELECT 1 FROM items WHERE items.id = l.id)
+        RETURNING true AS inserted
+    )
+    SELECT inserted FROM updated
+    UNION ALL
+    SELECT inserted FROM inserted
+    """
+)
+
+
+class CatalogRepository:
+    """
+    Set-based catalog writes. Takes a connection rather than a session: the
+    temporary staging table lives on one connection across batch commits.
+    """
+
+    @staticmethod
+    async def create_staging(conn: AsyncConnection, kind: str) -> None:
+        await conn.execute(text(STAGING_DDL[kind]))
+
+    @staticmethod
+    async def drop_staging(conn: AsyncConnection, kind: str) -> None:
+        await conn.execute(text(f"DROP TABLE IF EXISTS catalog_staging_{kind}"))
+
+    @staticmethod
+    async def copy_to_staging(
+        conn: AsyncConnection, kind: str, rows: Sequence[tuple]
+    ) -> None:
+        # Through SQLAlchemy first: that opens the transaction the COPY joins
+        await conn.execute(text(f"TRUNCATE catalog_staging_{kind}"))
+        raw = await conn.get_raw_connection()
+        # Binary COPY through asyncpg, no SQL text or parameters per row
+        await raw.driver_connection.copy_records_to_table(
+            f"catalog_staging_{kind}", records=rows, columns=STAGING_COLUMNS[kind]
+        )
+
+    @staticmethod
+    async def lock_upserts(conn: AsyncConnection, kind: str) -> None:
+        """Held until the batch's transaction ends."""
+        await conn.execute(
+            text("SELECT pg_advisory_xact_lock(:id)"), {"id": UPSERT_LOCK_IDS[kind]}
+        )
+
+    @staticmethod
+    async def upsert_merchants(conn: AsyncConnection) -> Tuple[List[bool], list]:
+        """Returns one inserted/updated flag per written row; nothing is rejected."""
+        await CatalogRepository.lock_upserts(conn, "merchants")
+        result = await conn.execute(UPSERT_MERCHANTS)
+        written = [row.inserted for row in result]
+        await conn.execute(SYNC_ITEM_REGIONS)
+        return written, []
+
+    @staticmethod
+    async def upsert_items(
+        conn: AsyncConnection,
+    ) -> Tuple[List[bool], List[Tuple[RowError, object]]]:
+        """
+        Returns one inserted/updated flag per written row, and the staged rows
+        that cannot be written (unknown merchant, item of another merchant).
+        """
+        await CatalogRepository.lock_upserts(conn, "items")
+        rejected = [
+            (RowError(row.line, row.message), row.id)
+            for row in await conn.execute(REJECTED_ITEMS)
+        ]
+        result = await conn.execute(UPSERT_ITEMS)
+        return [row.inserted for row in result], rejected
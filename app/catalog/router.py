@@ -0,0 +1,44 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+
+from app.internal.dependencies import require_internal_token
+from app.observability.dependencies import batched_statements
+
+from .parsing import CONTENT_TYPES, FORMATS
+from .schemas import IngestResponse
+from .service import CatalogIngestService
+
+router = APIRouter(
+    prefix="/api/v1/admin/catalog",
+    tags=["catalog"],
+    dependencies=[Depends(require_internal_token), Depends(batched_statements)],
+)
+
+
+def upload_format(request: Request, format: Optional[str]) -> str:
+    if format is None:
+        content_type = request.headers.get("content-type", "").split(";")[0]
+        format = CONTENT_TYPES.get(content_type.strip().lower())
+    if format not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send text/csv or application/x-ndjson, or pass ?format=",
+        )
+    return format
+
+
+@router.post(
+    "/merchants", response_model=IngestResponse, status_code=status.HTTP_200_OK
+)
+async def ingest_merchants(request: Request, format: Optional[str] = Query(None)):
+    return await CatalogIngestService.ingest(
+        "merchants", upload_format(request, format), request.stream()
+    )
+
+
+@router.post("/items", response_model=IngestResponse, status_code=status.HTTP_200_OK)
+async def ingest_items(request: Request, format: Optional[str] = Query(None)):
+    return await CatalogIngestService.ingest(
+        "items", upload_format(request, format), request.stream()
+    )
@@ -0,0 +1,20 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class IngestRowError(BaseModel):
+    line: int
+    message: str
+
+
+class IngestResponse(BaseModel):
+    received: int
+    inserted: int
+    updated: int
+    unchanged: int
+    failed: int
+    errors: List[IngestRowError]
+    errorsTruncated: bool
+    seconds: float
+    rowsPerSecond: int
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, List, Optional
+
+import asyncpg
+from sqlalchemy.exc import DBAPIError
+
+from app.config import settings
+from app.database import engine
+
+from .parsing import LineSplitter, RecordParser, RowError
+from .repository import CatalogRepository
+
+logger = logging.getLogger(__name__)
+
+
+class IngestReport:
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.received = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.failed = 0
+        self.errors: List[RowError] = []
+        # Errors past max_errors, not reported one by one
+        self.dropped = 0
+
+    def reject(self, errors: List[RowError], rows: Optional[int] = None) -> None:
+        """`rows` failed rows, when `errors` covers more than one row each."""
+        self.failed += len(errors) if rows is None else rows
+        room = max(self.max_errors - len(self.errors), 0)
+        self.errors.extend(errors[:room])
+        self.dropped += max(len(errors) - room, 0)
+
+    def to_dict(self, seconds: float) -> dict:
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "failed": self.failed,
+            "errors": [{"line": e.line, "message": e.message} for e in self.errors],
+            "errorsTruncated": self.dropped > 0,
+            "seconds": round(seconds, 3),
+            "rowsPerSecond": round(self.received / seconds) if seconds else 0,
+        }
+
+
+class CatalogIngestService:
+    @staticmethod
+    async def ingest(
+        kind: str,
+        fmt: str,
+        chunks: AsyncIterator[bytes],
+        batch_rows: int = settings.catalog_ingest_batch_rows,
+        max_errors: int = settings.catalog_ingest_max_errors,
+    ) -> dict:
+        """
+        Stream an upload of merchants or items into the catalog. Lines are
+        validated as they arrive; valid rows are COPYed into a staging table and
+        upserted one batch per transaction, so a bad row or batch never stops
+        the rest of the upload.
+        """
+        started = time.perf_counter()
+        report = IngestReport(max_errors)
+        splitter = LineSplitter()
+        parser = RecordParser(kind, fmt)
+        parse = CatalogIngestService._parse
+        pending: list = []
+
+        async with engine.connect() as conn:
+            await CatalogRepository.create_staging(conn, kind)
+            await conn.commit()
+            try:
+                async for chunk in chunks:
+                    lines = splitter.feed(chunk)
+                    if lines:
+                        pending.extend(await parse(parser, lines, report))
+                    while len(pending) >= batch_rows:
+                        batch, pending = pending[:batch_rows], pending[batch_rows:]
+                        await CatalogIngestService._load(conn, kind, batch, report)
+                pending.extend(await parse(parser, splitter.close(), report))
+                if pending:
+                    await CatalogIngestService._load(conn, kind, pending, report)
+            finally:
+                await conn.rollback()
+                await CatalogRepository.drop_staging(conn, kind)
+                await conn.commit()
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            "Ingested %d %s rows in %.1fs: %d inserted, %d updated, %d failed",
+            report.received,
+            kind,
+            elapsed,
+            report.inserted,
+            report.updated,
+            report.failed,
+        )
+        return report.to_dict(elapsed)
+
+    @staticmethod
+    async def _parse(parser: RecordParser, lines, report: IngestReport) -> list:
+        # Validation is pure Python, keep it off the event loop
+        rows, errors = await asyncio.to_thread(parser.parse, lines)
+        report.received += len(rows) + len(errors)
+        report.reject(errors)
+        return rows
+
+    @staticmethod
+    async def _load(conn, kind: str, rows: list, report: IngestReport) -> None:
+        upsert = (
+            CatalogRepository.upsert_merchants
+            if kind == "merchants"
+            else CatalogRepository.upsert_items
+        )
+        try:
+            async with conn.begin():
+                await CatalogRepository.copy_to_staging(conn, kind, rows)
+                written, rejected = await upsert(conn)
+        except (DBAPIError, asyncpg.PostgresError) as exc:
+            # Anything the row checks did not catch fails this batch only
+            first, last = rows[0][0], rows[-1][0]
+            reason = str(getattr(exc, "orig", exc)).strip().splitlines()[0]
+            logger.warning("Catalog batch at line %d failed: %s", first, reason)
+            report.reject(
+                [RowError(first, f"lines {first}-{last} were not loaded: {reason}")],
+                rows=len(rows),
+            )
+            return
+
+        inserted = sum(written)
+        report.inserted += inserted
+        report.updated += len(written) - inserted
+        report.reject([error for error, _ in rejected])
+        # Repeated ids count once, the last line wins
+        distinct = {row[1] for row in rows} - {item_id for _, item_id in rejected}
+        report.unchanged += len(distinct) - len(written)
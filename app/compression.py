@@ -0,0 +1,138 @@
+import gzip
+from typing import List, Optional, Tuple
+
+from app.config import settings
+
+Headers = List[Tuple[bytes, bytes]]
+
+COMPRESSIBLE_TYPES = (b"application/json", b"text/")
+
+_brotli = None
+
+
+def brotli_module():
+    """The optional `brotli` package, or None when it is not installed."""
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+        except ImportError:
+            brotli = False
+        _brotli = brotli
+    return _brotli or None
+
+
+def accepted_encodings(header: str) -> dict:
+    """Parse Accept-Encoding into {coding: q}."""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    accepted = accepted_encodings(header)
+    wildcard = accepted.get("*", 0.0)
+    candidates = ["br", "gzip"] if brotli_module() else ["gzip"]
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = accepted.get(coding, wildcard)
+        # Ties go to the first candidate, br compresses JSON best
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli_module().compress(body, quality=settings.brotli_quality)
+    return gzip.compress(body, compresslevel=settings.gzip_level, mtime=0)
+
+
+def _header(headers: Headers, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _tag_with_encoding(etag: bytes, encoding: str) -> bytes:
+    # Different bytes need a different strong validator (RFC 9110 8.8.3)
+    if etag.endswith(b'"'):
+        return etag[:-1] + b"-" + encoding.encode() + b'"'
+    return etag
+
+
+class CompressionMiddleware:
+    """
+    Compresses complete JSON/text responses of at least `min_bytes` with br
+    or gzip, depending on Accept-Encoding. Streaming responses pass through.
+    """
+
+    def __init__(self, app, min_bytes: int = 1024):
+        self.app = app
+        self.min_bytes = min_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = _header(scope["headers"], b"accept-encoding")
+        encoding = choose_encoding(accept.decode("latin-1")) if accept else None
+        start = None
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                content_type = _header(headers, b"content-type") or b""
+                if (
+                    content_type.startswith(COMPRESSIBLE_TYPES)
+                    or message["status"] == 304
+                ):
+                    headers.append((b"vary", b"Accept-Encoding"))
+                    message = {**message, "headers": headers}
+                    if encoding and _header(headers, b"content-encoding") is None:
+                        # Hold the start until the body size is known
+                        start = message
+                        return
+                await send(message)
+                return
+
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            held, start = start, None
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.min_bytes:
+                await send(held)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            headers = [
+                (key, value)
+                for key, value in held["headers"]
+                if key.lower() not in (b"content-length", b"etag")
+            ]
+            headers.append((b"content-encoding", encoding.encode()))
+            headers.append((b"content-length", str(len(compressed)).encode()))
+            etag = _header(held["headers"], b"etag")
+            if etag is not None:
+                headers.append((b"etag", _tag_with_encoding(etag, encoding)))
+            await send({**held, "headers": headers})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
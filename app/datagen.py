@@ -0,0 +1,478 @@
+"""
+Synthetic catalog, user and order data at production scale.
+
+Merchants are clustered around city centres: most sit near one of each city's
+hotspots, the rest spread around the centre. Every row is derived from
+(--seed, table, index), so a run is reproducible and chunks can be generated
+independently in worker processes and loaded through asyncpg COPY in parallel.
+
+    python -m app.datagen --merchants 1000000 --users 100000 \\
+        --estimates 200000 --orders 100000 --workers 8 --truncate
+
+All generated users share the password given by --password.
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import io
+import math
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+import asyncpg
+
+from app.config import settings
+from app.database import asyncpg_dsn
+from app.merchants.enums import ItemProductCategoryEnum, MerchantCategoryEnum
+from app.merchants.regions import region_of
+
+KM_PER_DEG_LAT = 110.574
+HOTSPOTS_PER_CITY = 24
+HOTSPOT_SHARE = 0.7
+
+
+class City(NamedTuple):
+    name: str
+    lat: float
+    long: float
+    spread_km: float
+    weight: float
+
+
+DEFAULT_CITIES = (
+    City("jakarta", -6.2088, 106.8456, 12.0, 0.45),
+    City("surabaya", -7.2575, 112.7521, 8.0, 0.2),
+    City("bandung", -6.9175, 107.6191, 7.0, 0.15),
+    City("medan", 3.5952, 98.6722, 7.0, 0.1),
+    City("makassar", -5.1477, 119.4327, 6.0, 0.1),
+)
+
+MERCHANT_PREFIXES = (
+    "Warung",
+    "Kedai",
+    "Depot",
+    "Bakmi",
+    "Rumah Makan",
+    "Toko",
+    "Kopi",
+    "Sate",
+    "Soto",
+    "Martabak",
+)
+MERCHANT_NAMES = (
+    "Sederhana",
+    "Nusantara",
+    "Gading",
+    "Mawar",
+    "Melati",
+    "Barokah",
+    "Sentosa",
+    "Jaya",
+    "Makmur",
+    "Lestari",
+    "Pelangi",
+    "Bahari",
+)
+ITEM_NAMES = {
+    ItemProductCategoryEnum.Food: (
+        "Nasi Goreng",
+        "Mie Ayam",
+        "Ayam Bakar",
+        "Gado Gado",
+        "Rendang",
+        "Soto Ayam",
+        "Bakso",
+        "Nasi Uduk",
+    ),
+    ItemProductCategoryEnum.Beverage: (
+        "Es Teh",
+        "Kopi Susu",
+        "Jus Alpukat",
+        "Es Jeruk",
+        "Teh Tarik",
+    ),
+    ItemProductCategoryEnum.Snack: ("Pisang Goreng", "Keripik", "Risoles", "Lumpia"),
+    ItemProductCategoryEnum.Condiments: ("Sambal", "Kecap", "Kerupuk"),
+    ItemProductCategoryEnum.Additions: ("Telur", "Keju", "Extra Nasi"),
+}
+ITEM_CATEGORIES = tuple(ITEM_NAMES)
+ITEM_CATEGORY_WEIGHTS = (5, 3, 2, 1, 1)
+
+MERCHANT_COLUMNS = (
+    "id",
+    "name",
+    "merchant_category",
+    "image_url",
+    "latitude",
+    "longitude",
+    "geog",
+    "created_at",
+    "region",
+)
+ITEM_COLUMNS = (
+    "id",
+    "merchant_id",
+    "name",
+    "product_category",
+    "price",
+    "quantity",
+    "image_url",
+    "created_at",
+    "region",
+)
+USER_COLUMNS = ("id", "username", "email", "password_hash", "created_at", "updated_at")
+ESTIMATE_COLUMNS = ("id", "total_price", "est_minutes", "created_at")
+ESTIMATE_ITEM_COLUMNS = (
+    "estimate_id",
+    "item_id",
+    "merchant_id",
+    "quantity",
+    "unit_price",
+    "item_name",
+    "product_category",
+    "image_url",
+    "created_at",
+)
+ORDER_COLUMNS = ("id", "user_id", "estimate_id", "created_at")
+ORDER_ITEM_COLUMNS = ("id", "order_id", "item_id", "quantity", "price", "created_at")
+
+
+class Params(NamedTuple):
+    seed: int
+    cities: Tuple[City, ...]
+    merchants: int
+    users: int
+    estimates: int
+    items_min: int
+    items_max: int
+    password_hash: str
+    anchor: datetime
+
+
+def make_id(seed: int, kind: str, index: int) -> uuid.UUID:
+    digest = hashlib.blake2b(f"{seed}:{kind}:{index}".encode(), digest_size=16)
+    return uuid.UUID(bytes=digest.digest(), version=4)
+
+
+def _rng(seed: int, kind: str, index) -> random.Random:
+    return random.Random(f"{seed}:{kind}:{index}")
+
+
+def _hotspots(seed: int, city: City) -> List[Tuple[float, float, float]]:
+    rng = _rng(seed, "hotspots", city.name)
+    spots = []
+    for _ in range(HOTSPOTS_PER_CITY):
+        north = rng.gauss(0, city.spread_km / 2)
+        east = rng.gauss(0, city.spread_km / 2)
+        spots.append((north, east, rng.uniform(0.2, 1.5)))
+    return spots
+
+
+def _offset(city: City, north_km: float, east_km: float) -> Tuple[float, float]:
+    lat = city.lat + north_km / KM_PER_DEG_LAT
+    km_per_deg_long = 111.320 * math.cos(math.radians(lat))
+    return round(lat, 6), round(city.long + east_km / km_per_deg_long, 6)
+
+
+def _timestamp(params: Params, rng: random.Random, max_days: int = 90) -> str:
+    offset = timedelta(seconds=rng.randrange(max_days * 86400))
+    return (params.anchor - offset).isoformat()
+
+
+def merchant_rows(params: Params, index: int, hotspots) -> Tuple[tuple, List[tuple]]:
+    """The merchant at `index` and its items, pure so other tables can rederive them."""
+    rng = _rng(params.seed, "merchant", index)
+    city_index = rng.choices(
+        range(len(params.cities)), weights=[c.weight for c in params.cities]
+    )[0]
+    city = params.cities[city_index]
+    if rng.random() < HOTSPOT_SHARE:
+        north, east, sigma = rng.choice(hotspots[city_index])
+        north, east = rng.gauss(north, sigma), rng.gauss(east, sigma)
+    else:
+        north, east = rng.gauss(0, city.spread_km), rng.gauss(0, city.spread_km)
+    lat, long = _offset(city, north, east)
+
+    merchant_id = make_id(params.seed, "merchant", index)
+    region = region_of(lat, long)
+    created_at = _timestamp(params, rng, 365)
+    merchant = (
+        merchant_id,
+        f"{rng.choice(MERCHANT_PREFIXES)} {rng.choice(MERCHANT_NAMES)} {index}",
+        rng.choice(list(MerchantCategoryEnum)).value,
+        f"https://cdn.example.com/merchants/{merchant_id}.jpg",
+        lat,
+        long,
+        f"SRID=4326;POINT({long} {lat})",
+        created_at,
+        region,
+    )
+
+    items = []
+    for j in range(rng.randint(params.items_min, params.items_max)):
+        category = rng.choices(ITEM_CATEGORIES, weights=ITEM_CATEGORY_WEIGHTS)[0]
+        item_id = make_id(params.seed, f"item:{index}", j)
+        items.append(
+            (
+                item_id,
+                merchant_id,
+                rng.choice(ITEM_NAMES[category]),
+                category.value,
+                rng.randrange(5, 150) * 1000,
+                rng.randint(1_000, 10_000),
+                f"https://cdn.example.com/items/{item_id}.jpg",
+                created_at,
+                region,
+            )
+        )
+    return merchant, items
+
+
+def _csv(rows: Sequence[tuple]) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerows(rows)
+    return buf.getvalue().encode()
+
+
+def generate_chunk(params: Params, kind: str, start: int, stop: int):
+    """Rows for [start, stop) of `kind`, as (table, columns, csv bytes) triples."""
+    if kind == "merchants":
+        hotspots = [_hotspots(params.seed, city) for city in params.cities]
+        merchants, items = [], []
+        for i in range(start, stop):
+            merchant, merchant_items = merchant_rows(params, i, hotspots)
+            merchants.append(merchant)
+            items.extend(merchant_items)
+        return [
+            ("merchants", MERCHANT_COLUMNS, _csv(merchants)),
+            ("items", ITEM_COLUMNS, _csv(items)),
+        ]
+
+    if kind == "users":
+        users = []
+        for i in range(start, stop):
+            created_at = _timestamp(params, _rng(params.seed, "user", i), 365)
+            users.append(
+                (
+                    make_id(params.seed, "user", i),
+                    f"user{i}",
+                    f"user{i}@example.com",
+                    params.password_hash,
+                    created_at,
+                    created_at,
+                )
+            )
+        return [("users", USER_COLUMNS, _csv(users))]
+
+    if kind == "estimates":
+        hotspots = [_hotspots(params.seed, city) for city in params.cities]
+        estimates, estimate_items = [], []
+        for i in range(start, stop):
+            estimate, rows = estimate_rows(params, i, hotspots)
+            estimates.append(estimate)
+            estimate_items.extend(rows)
+        return [
+            ("estimates", ESTIMATE_COLUMNS, _csv(estimates)),
+            ("estimate_items", ESTIMATE_ITEM_COLUMNS, _csv(estimate_items)),
+        ]
+
+    if kind == "orders":
+        hotspots = [_hotspots(params.seed, city) for city in params.cities]
+        orders, order_items = [], []
+        for i in range(start, stop):
+            # Order i materializes estimate i, like the real intake does
+            _, est_items = estimate_rows(params, i, hotspots)
+            rng = _rng(params.seed, "order", i)
+            order_id = make_id(params.seed, "order", i)
+            created_at = est_items[0][-1]
+            orders.append(
+                (
+                    order_id,
+                    make_id(params.seed, "user", rng.randrange(params.users)),
+                    make_id(params.seed, "estimate", i),
+                    created_at,
+                )
+            )
+            for j, row in enumerate(est_items):
+                order_items.append(
+                    (
+                        make_id(params.seed, f"order_item:{i}", j),
+                        order_id,
+                        row[1],
+                        row[3],
+                        row[4],
+                        created_at,
+                    )
+                )
+        return [
+            ("orders", ORDER_COLUMNS, _csv(orders)),
+            ("order_items", ORDER_ITEM_COLUMNS, _csv(order_items)),
+        ]
+
+    raise ValueError(f"unknown chunk kind {kind}")
+
+
+def estimate_rows(params: Params, index: int, hotspots) -> Tuple[tuple, List[tuple]]:
+    rng = _rng(params.seed, "estimate", index)
+    estimate_id = make_id(params.seed, "estimate", index)
+    created_at = _timestamp(params, rng)
+    rows: Dict[uuid.UUID, tuple] = {}
+    total_price = 0
+    merchant_count = min(rng.randint(1, 3), params.merchants)
+    for m in rng.sample(range(params.merchants), merchant_count):
+        merchant, items = merchant_rows(params, m, hotspots)
+        for item in rng.sample(items, min(rng.randint(1, 3), len(items))):
+            quantity = rng.randint(1, 4)
+            total_price += item[4] * quantity
+            rows[item[0]] = (
+                estimate_id,
+                item[0],
+                merchant[0],
+                quantity,
+                item[4],
+                item[2],
+                item[3],
+                item[6],
+                created_at,
+            )
+    estimate = (estimate_id, total_price, rng.randint(5, 60), created_at)
+    return estimate, list(rows.values())
+
+
+async def load(
+    params: Params, orders: int, workers: int, chunk_size: int, truncate: bool
+) -> None:
+    pool = await asyncpg.create_pool(asyncpg_dsn(), min_size=workers, max_size=workers)
+    loop = asyncio.get_running_loop()
+    try:
+        if truncate:
+            await pool.execute(
+                "TRUNCATE order_outbox, order_items, orders, estimate_items, "
+                "estimates, items, merchants, users CASCADE"
+            )
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Parents before children so foreign keys hold at every commit
+            for kind, total in (
+                ("merchants", params.merchants),
+                ("users", params.users),
+                ("estimates", params.estimates),
+                ("orders", orders),
+            ):
+                if total <= 0:
+                    continue
+                started = time.perf_counter()
+                limit = asyncio.Semaphore(workers)
+
+                async def copy_chunk(start: int) -> int:
+                    async with limit:
+                        stop = min(start + chunk_size, total)
+                        parts = await loop.run_in_executor(
+                            executor, generate_chunk, params, kind, start, stop
+                        )
+                        async with pool.acquire() as conn, conn.transaction():
+                            for table, columns, data in parts:
+                                await conn.copy_to_table(
+                                    table,
+                                    source=io.BytesIO(data),
+                                    columns=columns,
+                                    format="csv",
+                                )
+                        return stop - start
+
+                done = sum(
+                    await asyncio.gather(
+                        *(copy_chunk(s) for s in range(0, total, chunk_size))
+                    )
+                )
+                elapsed = time.perf_counter() - started
+                print(f"{kind}: {done} rows in {elapsed:.1f}s ({done / elapsed:.0f}/s)")
+
+        await pool.execute(
+            "ANALYZE merchants, items, users, estimates, estimate_items, "
+            "orders, order_items"
+        )
+    finally:
+        await pool.close()
+
+
+def parse_city(value: str) -> City:
+    try:
+        name, lat, long, spread_km, weight = value.split(":")
+        return City(name, float(lat), float(long), float(spread_km), float(weight))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected name:lat:long:spread_km:weight, got {value!r}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic data and bulk load it with COPY."
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--merchants", type=int, default=100_000)
+    parser.add_argument("--items-min", type=int, default=3)
+    parser.add_argument("--items-max", type=int, default=12)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--estimates", type=int, default=20_000)
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument(
+        "--city",
+        type=parse_city,
+        action="append",
+        help="name:lat:long:spread_km:weight, repeatable "
+        "(default: five Indonesian cities)",
+    )
+    parser.add_argument("--password", default="password")
+    parser.add_argument(
+        "--anchor",
+        type=datetime.fromisoformat,
+        default=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        help="Timestamps are spread backwards from this instant",
+    )
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=20_000)
+    parser.add_argument(
+        "--truncate", action="store_true", help="Empty the tables first"
+    )
+    args = parser.parse_args()
+
+    if args.items_min < 1 or args.items_max < args.items_min:
+        parser.error("need 1 <= --items-min <= --items-max")
+    if args.orders > args.estimates:
+        parser.error("--orders cannot exceed --estimates, order i reuses estimate i")
+    if args.orders and not args.users:
+        parser.error("--orders needs at least one user")
+    if (args.estimates or args.orders) and not args.merchants:
+        parser.error("estimates and orders need merchants")
+
+    from app.auth.hashing import password_hasher
+
+    params = Params(
+        seed=args.seed,
+        cities=tuple(args.city or DEFAULT_CITIES),
+        merchants=args.merchants,
+        users=args.users,
+        estimates=args.estimates,
+        items_min=args.items_min,
+        items_max=args.items_max,
+        # Hashed once, with a seeded salt; Argon2 per user would take hours
+        password_hash=password_hasher.hasher.hash(
+            args.password,
+            salt=hashlib.blake2b(f"{args.seed}:salt".encode(), digest_size=16).digest(),
+        ),
+        anchor=args.anchor,
+    )
+    asyncio.run(load(params, args.orders, args.workers, args.chunk_size, args.truncate))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,43 @@
 from collections.abc import AsyncGenerator
+
+from fastapi import HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import asyncSessionLocal
+
+from app.auth.utils import decode_access_token
+from app.database import (
+    asyncReadSessionLocal,
+    asyncSessionLocal,
+    engine,
+    primary_pins,
+    read_engine,
+)
+from app.observability.tracing import start_span
 
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with asyncSessionLocal() as session:
         yield session
+
+
+def _token_subject(request: Request) -> str | None:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        with start_span("auth.decode_access_token"):
+            return decode_access_token(token).get("sub")
+    except HTTPException:
+        # get_current_user rejects the request anyway
+        return None
+
+
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only routes: the replica, unless the user just wrote."""
+    sessionmaker = asyncReadSessionLocal
+    if read_engine is not engine:
+        subject = _token_subject(request)
+        if subject is not None and primary_pins.is_pinned(subject):
+            sessionmaker = asyncSessionLocal
+
+    async with sessionmaker() as session:
+        yield session
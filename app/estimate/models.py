@@ -46,6 +46,7 @@ class EstimateItem(Base):
         UUID(as_uuid=True),
         ForeignKey("merchants.id", ondelete="CASCADE"),
         nullable=False,
+        index=True,
     )
 
     quantity: Mapped[int] = mapped_column(Integer, nullable=False)
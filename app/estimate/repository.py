@@ -1,6 +1,7 @@
 import uuid
 from typing import Dict, List
 
+from sqlalchemy import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy.sql import insert
@@ -40,3 +41,26 @@ class EstimateRepository:
         )
         res = await session.execute(q)
         return res.scalars().first()
+
+    @staticmethod
+    async def estimate_exists(session: AsyncSession, estimate_id: str) -> bool:
+        q = select(Estimate.id).where(Estimate.id == estimate_id)
+        res = await session.execute(q)
+        return res.scalar_one_or_none() is not None
+
+    @staticmethod
+    async def get_item_rows_for_estimates(
+        session: AsyncSession, estimate_ids: List[uuid.UUID]
+    ) -> Dict[uuid.UUID, List[Row]]:
+        # Plain column rows: skips the joined item/merchant loads of EstimateItem
+        q = select(
+            EstimateItem.estimate_id,
+            EstimateItem.item_id,
+            EstimateItem.quantity,
+            EstimateItem.unit_price,
+        ).where(EstimateItem.estimate_id.in_(estimate_ids))
+        res = await session.execute(q)
+        rows_by_estimate: Dict[uuid.UUID, List[Row]] = {}
+        for row in res.all():
+            rows_by_estimate.setdefault(row.estimate_id, []).append(row)
+        return rows_by_estimate
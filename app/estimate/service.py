@@ -1,4 +1,5 @@
 import math
+import time
 from typing import Dict, List, Tuple
 
 from fastapi import HTTPException
@@ -6,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.merchants.models import Item, Merchant
 from app.merchants.repository import MerchantRepository
+from app.observability.metrics import estimate_solver_seconds
 
 from .repository import EstimateRepository
 from .schemas import EstimateRequest, EstimateResponse
@@ -135,15 +137,24 @@ class EstimateService:
                 detail=f"Merchants not found: {', '.join(missing_merchants)}",
             )
 
-        # Get items for each merchant and validate orders
-        total_price = 0
+        # Get items for every merchant at once and validate orders
+        item_ids_by_merchant: Dict[str, List[str]] = {}
         for o in body.orders:
-            items_map: Dict[
-                str, Item
-            ] = await MerchantRepository.get_items_by_merchant_and_item_ids(
-                session, o.merchantId, [it.itemId for it in o.items]
+            item_ids_by_merchant.setdefault(o.merchantId, []).extend(
+                it.itemId for it in o.items
             )
-            missing_items = [it.itemId for it in o.items if it.itemId not in items_map]
+        items_map: Dict[
+            Tuple[str, str], Item
+        ] = await MerchantRepository.get_items_by_merchant_and_item_ids(
+            session, item_ids_by_merchant
+        )
+        total_price = 0
+        for o in body.orders:
+            missing_items = [
+                it.itemId
+                for it in o.items
+                if (o.merchantId, it.itemId) not in items_map
+            ]
             if missing_items:
                 raise HTTPException(
                     status_code=404,
@@ -151,7 +162,11 @@ class EstimateService:
                 )
             # sum price
             for it in o.items:
-                total_price += int(items_map[it.itemId].price) * int(it.quantity)
+                total_price += int(items_map[(o.merchantId, it.itemId)].price) * int(
+                    it.quantity
+                )
+
+        solver_started = time.perf_counter()
 
         # If bounding box area > 3 km^2
         pts = [(u_lat, u_long)]
@@ -191,6 +206,7 @@ class EstimateService:
 
         # Nearest neighbor TSP -> total distance in km
         total_km = EstimateService._nearest_neighbor_route_km(start_idx, coords)
+        estimate_solver_seconds.observe(time.perf_counter() - solver_started)
 
         # Estimate time in minutes (round to integer)
         est_minutes = max(1, round((total_km / COURIER_SPEED_KMH) * 60.0))
@@ -205,13 +221,8 @@ class EstimateService:
         # Create estimate items rows
         rows = []
         for o in body.orders:
-            items_map: Dict[
-                str, Item
-            ] = await MerchantRepository.get_items_by_merchant_and_item_ids(
-                session, o.merchantId, [it.itemId for it in o.items]
-            )
             for it in o.items:
-                item: Item = items_map[it.itemId]
+                item: Item = items_map[(o.merchantId, it.itemId)]
                 rows.append(
                     {
                         "estimate_id": estimate_id,
@@ -0,0 +1,497 @@
+"""
+Index advisor for the repository queries.
+
+Runs the hot repository methods with inputs sampled from the database, then
+replays every SQL statement they sent under EXPLAIN (ANALYZE, BUFFERS) and
+reports sequential scans and sorts over large inputs. The schema is checked
+for duplicate or redundant indexes, indexes none of the queries used and
+foreign keys without a supporting index. Meant for a generated dataset:
+
+    python -m app.datagen --merchants 200000 --users 20000 --truncate
+    python -m app.index_advisor
+
+Everything runs in transactions that are rolled back.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Set
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import asyncSessionLocal, engine
+from app.estimate.repository import EstimateRepository
+from app.merchants.repository import MerchantRepository
+from app.orders.repository import OrderRepository
+
+TABLES = (
+    "merchants",
+    "items",
+    "users",
+    "estimates",
+    "estimate_items",
+    "orders",
+    "order_items",
+    "order_outbox",
+)
+
+
+class Scenario(NamedTuple):
+    name: str
+    run: Callable[[AsyncSession], Awaitable[object]]
+
+
+class Finding(NamedTuple):
+    kind: str
+    subject: str
+    detail: str
+
+
+async def sample_inputs(session: AsyncSession, seed: int) -> Optional[dict]:
+    rng = random.Random(seed)
+    merchants = (
+        await session.execute(
+            text(
+                "SELECT id, latitude, longitude, merchant_category FROM merchants "
+                "TABLESAMPLE SYSTEM (1) LIMIT 50"
+            )
+        )
+    ).all() or (
+        await session.execute(
+            text(
+                "SELECT id, latitude, longitude, merchant_category FROM merchants "
+                "LIMIT 50"
+            )
+        )
+    ).all()
+    if not merchants:
+        return None
+    origin = rng.choice(merchants)
+    picked = rng.sample(merchants, min(5, len(merchants)))
+
+    items = (
+        await session.execute(
+            text(
+                "SELECT merchant_id, id, name FROM items "
+                "WHERE merchant_id = ANY(:ids) ORDER BY merchant_id, id"
+            ),
+            {"ids": [m.id for m in picked]},
+        )
+    ).all()
+    item_ids_by_merchant: Dict[str, List[str]] = {}
+    for row in items:
+        ids = item_ids_by_merchant.setdefault(str(row.merchant_id), [])
+        if len(ids) < 2:
+            ids.append(str(row.id))
+    term = rng.choice(items).name.split()[0].lower() if items else "nasi"
+
+    # The busiest user gives history its worst case
+    user_id = (
+        await session.execute(
+            text(
+                "SELECT user_id FROM orders GROUP BY user_id "
+                "ORDER BY count(*) DESC LIMIT 1"
+            )
+        )
+    ).scalar()
+    username = None
+    if user_id is not None:
+        username = (
+            await session.execute(
+                text("SELECT username FROM users WHERE id = :id"), {"id": user_id}
+            )
+        ).scalar()
+    estimate_ids = (
+        (await session.execute(text("SELECT id FROM estimates LIMIT 20")))
+        .scalars()
+        .all()
+    )
+
+    return {
+        "lat": origin.latitude,
+        "long": origin.longitude,
+        "category": origin.merchant_category,
+        "term": term,
+        "merchant_ids": [str(m.id) for m in picked],
+        "item_ids_by_merchant": item_ids_by_merchant,
+        "user_id": str(user_id) if user_id else None,
+        "username": username,
+        "estimate_ids": list(estimate_ids),
+    }
+
+
+def build_scenarios(inputs: dict) -> List[Scenario]:
+    from app.auth.repository import AuthRepository
+
+    lat, long, term = inputs["lat"], inputs["long"], inputs["term"]
+    scenarios = [
+        Scenario(
+            "nearby",
+            lambda s: MerchantRepository.get_nearby_merchants(
+                lat, long, None, None, None, 5, 0, s
+            ),
+        ),
+        Scenario(
+            "nearby by category",
+            lambda s: MerchantRepository.get_nearby_merchants(
+                lat, long, None, inputs["category"], None, 5, 0, s
+            ),
+        ),
+        Scenario(
+            "nearby by name",
+            lambda s: MerchantRepository.get_nearby_merchants(
+                lat, long, None, None, term, 5, 0, s
+            ),
+        ),
+        Scenario(
+            "nearby page 10",
+            lambda s: MerchantRepository.get_nearby_merchants(
+                lat, long, None, None, None, 5, 45, s
+            ),
+        ),
+        Scenario(
+            "estimate merchants",
+            lambda s: MerchantRepository.get_merchants_by_ids(
+                s, inputs["merchant_ids"]
+            ),
+        ),
+        Scenario(
+            "estimate items",
+            lambda s: MerchantRepository.get_items_by_merchant_and_item_ids(
+                s, inputs["item_ids_by_merchant"]
+            ),
+        ),
+        Scenario(
+            "order intake estimates",
+            lambda s: EstimateRepository.get_item_rows_for_estimates(
+                s, inputs["estimate_ids"]
+            ),
+        ),
+        Scenario(
+            "pending outbox",
+            lambda s: OrderRepository.claim_pending_outbox(s, 100),
+        ),
+    ]
+    if inputs["user_id"]:
+        scenarios += [
+            Scenario(
+                "order history",
+                lambda s: OrderRepository.fetch_orders_for_user(
+                    s, inputs["user_id"], limit=5, offset=0
+                ),
+            ),
+            Scenario(
+                "order history by name",
+                lambda s: OrderRepository.fetch_orders_for_user(
+                    s, inputs["user_id"], name=term, limit=5, offset=0
+                ),
+            ),
+        ]
+    if inputs["username"]:
+        scenarios.append(
+            Scenario(
+                "login",
+                lambda s: AuthRepository.get_user_by_username(s, inputs["username"]),
+            )
+        )
+    return scenarios
+
+
+async def capture(scenario: Scenario) -> List[tuple]:
+    """Run the scenario once and return the statements it sent."""
+    statements: List[tuple] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    async with asyncSessionLocal() as session:
+        event.listen(engine.sync_engine, "before_cursor_execute", record)
+        try:
+            await scenario.run(session)
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", record)
+            await session.rollback()
+    return statements
+
+
+async def explain(statement: str, parameters) -> dict:
+    async with asyncSessionLocal() as session:
+        conn = await session.connection()
+        try:
+            result = await conn.exec_driver_sql(
+                "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters
+            )
+            plan = result.scalar()
+        finally:
+            await session.rollback()
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]
+
+
+def walk(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk(child)
+
+
+def plan_findings(plan: dict, min_rows: int) -> List[Finding]:
+    findings = []
+    for node in walk(plan["Plan"]):
+        loops = node.get("Actual Loops", 1)
+        if node["Node Type"] == "Seq Scan":
+            kept = node.get("Actual Rows", 0) * loops
+            read = kept + node.get("Rows Removed by Filter", 0) * loops
+            if read >= min_rows:
+                findings.append(
+                    Finding(
+                        "seq scan",
+                        node["Relation Name"],
+                        f"{read} rows read, {kept} kept",
+                    )
+                )
+        elif node["Node Type"] in ("Sort", "Incremental Sort"):
+            children = node.get("Plans", [])
+            rows = children[0].get("Actual Rows", 0) * loops if children else 0
+            detail = f"{rows} rows, {node.get('Sort Method', '?')}"
+            on_disk = node.get("Sort Space Type") == "Disk"
+            if on_disk:
+                detail += f", {node.get('Sort Space Used')} kB on disk"
+            if rows >= min_rows or on_disk:
+                findings.append(
+                    Finding("sort", ", ".join(node.get("Sort Key", [])), detail)
+                )
+    return findings
+
+
+def used_indexes(plan: dict) -> Set[str]:
+    return {n["Index Name"] for n in walk(plan["Plan"]) if "Index Name" in n}
+
+
+INDEXES_SQL = """
+SELECT c.relname AS table_name, i.relname AS index_name, am.amname AS method,
+       x.indkey::text AS columns, x.indclass::text AS opclasses,
+       x.indisunique AS is_unique, x.indisprimary AS is_primary,
+       x.indpred IS NOT NULL OR x.indexprs IS NOT NULL AS is_special,
+       pg_relation_size(i.oid) AS bytes, coalesce(s.idx_scan, 0) AS idx_scan,
+       pg_get_indexdef(i.oid) AS definition
+FROM pg_index x
+JOIN pg_class i ON i.oid = x.indexrelid
+JOIN pg_class c ON c.oid = x.indrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+JOIN pg_am am ON am.oid = i.relam
+LEFT JOIN pg_stat_user_indexes s ON s.indexrelid = x.indexrelid
+WHERE n.nspname = 'public' AND c.relname = ANY(:tables)
+ORDER BY c.relname, i.relname
+"""
+
+FOREIGN_KEYS_SQL = """
+SELECT c.relname AS table_name, con.conname AS name,
+       array_to_string(con.conkey, ' ') AS columns,
+       (
+           SELECT string_agg(a.attname, ', ' ORDER BY k.ord)
+           FROM unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+           JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+       ) AS column_names
+FROM pg_constraint con
+JOIN pg_class c ON c.oid = con.conrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE con.contype = 'f' AND n.nspname = 'public' AND c.relname = ANY(:tables)
+ORDER BY c.relname, con.conname
+"""
+
+
+def _size(n: int) -> str:
+    return f"{n / 1024 / 1024:.1f} MB" if n >= 1024 * 1024 else f"{n / 1024:.0f} kB"
+
+
+def _keep_order(ix) -> tuple:
+    return (not ix.is_primary, not ix.is_unique, ix.index_name)
+
+
+def index_findings(indexes, foreign_keys, used: Set[str]) -> List[Finding]:
+    findings = []
+    by_table: Dict[str, list] = {}
+    for ix in indexes:
+        by_table.setdefault(ix.table_name, []).append(ix)
+
+    redundant = set()
+    for table_indexes in by_table.values():
+        for ix in table_indexes:
+            if ix.is_special or ix.is_primary:
+                continue
+            columns, opclasses = ix.columns.split(), ix.opclasses.split()
+            for other in table_indexes:
+                if other is ix or other.is_special or other.method != ix.method:
+                    continue
+                other_columns = other.columns.split()
+                same_prefix = (
+                    other_columns[: len(columns)] == columns
+                    and other.opclasses.split()[: len(opclasses)] == opclasses
+                )
+                if not same_prefix:
+                    continue
+                exact = len(other_columns) == len(columns)
+                # A unique index is only redundant next to an identical one
+                if ix.is_unique and not (exact and other.is_unique):
+                    continue
+                # Of two identical indexes the constraint, else the first name, stays
+                if exact and _keep_order(other) > _keep_order(ix):
+                    continue
+                redundant.add(ix.index_name)
+                findings.append(
+                    Finding(
+                        "duplicate" if exact else "redundant",
+                        ix.index_name,
+                        f"covered by {other.index_name} ({_size(ix.bytes)})",
+                    )
+                )
+                break
+
+    for ix in indexes:
+        if ix.is_unique or ix.index_name in used or ix.index_name in redundant:
+            continue
+        findings.append(
+            Finding(
+                "unused",
+                ix.index_name,
+                f"{ix.table_name}, {_size(ix.bytes)}, {ix.idx_scan} scans since "
+                "the stats reset",
+            )
+        )
+
+    for fk in foreign_keys:
+        columns = fk.columns.split()
+        covered = any(
+            ix.method == "btree"
+            and not ix.is_special
+            and ix.columns.split()[: len(columns)] == columns
+            for ix in by_table.get(fk.table_name, [])
+        )
+        if not covered:
+            findings.append(
+                Finding(
+                    "unindexed fk",
+                    f"{fk.table_name}({fk.column_names})",
+                    f"{fk.name}: deletes on the parent scan {fk.table_name}",
+                )
+            )
+    return findings
+
+
+async def advise(seed: int, min_rows: int, analyze: bool) -> Optional[dict]:
+    async with asyncSessionLocal() as session:
+        if analyze:
+            await session.execute(text("ANALYZE " + ", ".join(TABLES)))
+            await session.commit()
+        inputs = await sample_inputs(session, seed)
+        if inputs is None:
+            return None
+        merchants = (
+            await session.execute(
+                text(
+                    "SELECT reltuples::bigint FROM pg_class "
+                    "WHERE relname = 'merchants'"
+                )
+            )
+        ).scalar()
+
+    queries = []
+    used: Set[str] = set()
+    for scenario in build_scenarios(inputs):
+        # Once to warm the caches, then every statement under EXPLAIN ANALYZE
+        statements = await capture(scenario)
+        for statement, parameters in statements:
+            plan = await explain(statement, parameters)
+            used |= used_indexes(plan)
+            queries.append(
+                {
+                    "scenario": scenario.name,
+                    "statement": " ".join(statement.split()),
+                    "executionMs": plan["Execution Time"],
+                    "sharedHit": plan["Plan"].get("Shared Hit Blocks", 0),
+                    "sharedRead": plan["Plan"].get("Shared Read Blocks", 0),
+                    "findings": [f._asdict() for f in plan_findings(plan, min_rows)],
+                }
+            )
+
+    async with asyncSessionLocal() as session:
+        indexes = (await session.execute(text(INDEXES_SQL), {"tables": TABLES})).all()
+        foreign_keys = (
+            await session.execute(text(FOREIGN_KEYS_SQL), {"tables": TABLES})
+        ).all()
+
+    return {
+        "merchants": merchants,
+        "queries": queries,
+        "schema": [f._asdict() for f in index_findings(indexes, foreign_keys, used)],
+    }
+
+
+def print_report(report: dict, verbose: bool) -> None:
+    if report["merchants"] < 10_000:
+        print(
+            f"warning: only ~{report['merchants']} merchants, the planner prefers "
+            "sequential scans on small tables; generate more with app.datagen\n"
+        )
+    print("Queries")
+    for q in report["queries"]:
+        print(
+            f"  {q['scenario']:<24} {q['executionMs']:>9.2f} ms  "
+            f"buffers {q['sharedHit']} hit / {q['sharedRead']} read"
+        )
+        if verbose:
+            print(f"    {q['statement'][:200]}")
+        for f in q["findings"]:
+            print(f"    {f['kind']} on {f['subject']}: {f['detail']}")
+    print("\nSchema")
+    if not report["schema"]:
+        print("  no findings")
+    for f in report["schema"]:
+        print(f"  {f['kind']:<13} {f['subject']}: {f['detail']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--min-rows",
+        type=int,
+        default=1000,
+        help="Report scans and sorts over at least this many rows",
+    )
+    parser.add_argument(
+        "--no-analyze", action="store_true", help="Skip refreshing table statistics"
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show statements")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit with status 1 when anything is reported (for CI)",
+    )
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    report = asyncio.run(advise(args.seed, args.min_rows, not args.no_analyze))
+    if report is None:
+        sys.exit("No merchants found, load a dataset with `python -m app.datagen`")
+
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        print_report(report, args.verbose)
+        print(f"\nDone in {time.perf_counter() - started:.1f}s")
+
+    findings = report["schema"] or any(q["findings"] for q in report["queries"])
+    if args.check and findings:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import hmac
+from typing import Optional
+
+from fastapi import Header, HTTPException, status
+
+from app.config import settings
+
+
+async def require_internal_token(
+    x_internal_token: Optional[str] = Header(None),
+):
+    # Internal endpoints are hidden entirely unless a token is configured
+    if not settings.internal_api_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+    if not x_internal_token or not hmac.compare_digest(
+        x_internal_token, settings.internal_api_token
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid internal token"
+        )
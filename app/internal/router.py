@@ -0,0 +1,107 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from app.auth.cache import auth_user_cache
+from app.auth.pool import password_pool
+from app.auth.utils import token_cache
+from app.database import engine, read_engine
+from app.invalidation import change_listener
+from app.observability.profiler import request_profiler
+from app.observability.tracing import InMemorySpanExporter, tracer
+from app.orders.cache import order_history_cache
+from app.ratelimit.dependencies import (
+    estimate_concurrency,
+    estimate_ip_limiter,
+    estimate_user_limiter,
+    login_concurrency,
+    login_ip_limiter,
+    login_user_limiter,
+)
+
+from .dependencies import require_internal_token
+
+router = APIRouter(
+    prefix="/api/v1/internal",
+    tags=["internal"],
+    dependencies=[Depends(require_internal_token)],
+)
+
+
+@router.get("/cache/order-history", status_code=status.HTTP_200_OK)
+async def get_order_history_cache_stats():
+    return order_history_cache.stats()
+
+
+@router.get("/cache/auth-users", status_code=status.HTTP_200_OK)
+async def get_auth_user_cache_stats():
+    return auth_user_cache.stats()
+
+
+@router.get("/cache/invalidation", status_code=status.HTTP_200_OK)
+async def get_change_listener_stats():
+    return change_listener.stats()
+
+
+@router.get("/auth/password-pool", status_code=status.HTTP_200_OK)
+async def get_password_pool_stats():
+    return password_pool.stats()
+
+
+@router.get("/cache/tokens", status_code=status.HTTP_200_OK)
+async def get_token_cache_stats():
+    return token_cache.stats()
+
+
+@router.get("/rate-limits", status_code=status.HTTP_200_OK)
+async def get_rate_limit_stats():
+    return {
+        "login": {
+            "perIp": login_ip_limiter.stats(),
+            "perUser": login_user_limiter.stats(),
+            "concurrency": login_concurrency.stats(),
+        },
+        "estimate": {
+            "perIp": estimate_ip_limiter.stats(),
+            "perUser": estimate_user_limiter.stats(),
+            "concurrency": estimate_concurrency.stats(),
+        },
+    }
+
+
+@router.get("/db/pool", status_code=status.HTTP_200_OK)
+async def get_db_pool_stats():
+    pools = {"primary": engine.pool.stats()}
+    if read_engine is not engine:
+        pools["replica"] = read_engine.pool.stats()
+    return pools
+
+
+@router.get("/traces", status_code=status.HTTP_200_OK)
+async def get_recent_traces(limit: int = Query(20, ge=1, le=200)):
+    if not isinstance(tracer.exporter, InMemorySpanExporter):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Traces are not kept in memory",
+        )
+    return tracer.exporter.recent(limit)
+
+
+@router.get("/profiles", status_code=status.HTTP_200_OK)
+async def get_slowest_profiles(route: Optional[str] = Query(None)):
+    return request_profiler.slowest(route)
+
+
+@router.get(
+    "/profiles/{profileId}",
+    response_class=PlainTextResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def get_profile(profileId: str):
+    body = request_profiler.read(profileId)
+    if body is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found"
+        )
+    return body
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import logging
+import random
+from typing import Callable, Dict, List, Optional
+
+import asyncpg
+
+from app.config import settings
+from app.database import asyncpg_dsn
+
+logger = logging.getLogger(__name__)
+
+# Must match the channel the notify_row_changes() triggers send on
+CHANNEL = "catalog_changes"
+
+# Called with the changed keys, or None when everything may have changed
+InvalidationCallback = Callable[[Optional[List[str]]], None]
+
+
+class ChangeListener:
+    """
+    One dedicated LISTEN connection per worker, fanning row change
+    notifications out to the in-process caches. Notifications sent while the
+    connection is down are lost, so every cache is flushed after each
+    (re)connect; the cache TTLs are only a backstop.
+    """
+
+    def __init__(self, max_backoff: float, ping_interval: float):
+        self.max_backoff = max_backoff
+        self.ping_interval = ping_interval
+        self._callbacks: Dict[str, List[InvalidationCallback]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.connected = False
+        self.notifications = 0
+        self.reconnects = 0
+        self.last_error: Optional[str] = None
+
+    def register(self, table: str, callback: InvalidationCallback) -> None:
+        self._callbacks.setdefault(table, []).append(callback)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="change-listener")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def dispatch(self, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            table, ids = message["table"], message.get("ids")
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed change notification %r", payload)
+            return
+        self.notifications += 1
+        self._invoke(self._callbacks.get(table, ()), ids)
+
+    def flush(self) -> None:
+        for callbacks in self._callbacks.values():
+            self._invoke(callbacks, None)
+
+    @staticmethod
+    def _invoke(callbacks, ids: Optional[List[str]]) -> None:
+        for callback in callbacks:
+            try:
+                callback(ids)
+            except Exception:
+                logger.exception("Cache invalidation callback failed")
+
+    async def _run(self) -> None:
+        attempt = 0
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                self.connected = False
+                raise
+            except Exception as exc:
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                logger.warning("Change listener disconnected: %s", self.last_error)
+            # Back off from scratch once a connection has worked
+            if self.connected:
+                attempt = 0
+            self.connected = False
+
+            # Full jitter, so a database restart does not reconnect every
+            # worker at the same moment
+            delay = random.uniform(0, min(self.max_backoff, 2**attempt))
+            attempt += 1
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+
+    async def _listen(self) -> None:
+        conn = await asyncpg.connect(
+            asyncpg_dsn(), timeout=settings.db_connect_timeout_seconds
+        )
+        lost = asyncio.Event()
+        try:
+            conn.add_termination_listener(lambda _: lost.set())
+            await conn.add_listener(
+                CHANNEL, lambda _conn, _pid, _channel, payload: self.dispatch(payload)
+            )
+            self.connected = True
+            # Anything may have changed while nobody was listening
+            self.flush()
+            logger.info("Listening for row changes on %s", CHANNEL)
+
+            # A half-open connection never reports termination, ping it
+            while not lost.is_set():
+                try:
+                    await asyncio.wait_for(lost.wait(), self.ping_interval)
+                except asyncio.TimeoutError:
+                    await conn.fetchval("SELECT 1", timeout=self.ping_interval)
+            raise ConnectionResetError("listener connection closed")
+        finally:
+            conn.terminate()
+
+    def stats(self) -> dict:
+        return {
+            "channel": CHANNEL,
+            "connected": self.connected,
+            "tables": sorted(self._callbacks),
+            "notifications": self.notifications,
+            "reconnects": self.reconnects,
+            "lastError": self.last_error,
+        }
+
+
+change_listener = ChangeListener(
+    max_backoff=settings.change_listener_max_backoff_seconds,
+    ping_interval=settings.change_listener_ping_seconds,
+)
@@ -1,41 +1,56 @@
-import os
-import subprocess
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
 import app.models
+from app.auth.pool import password_pool
 from app.auth.router import router as auth_router
+from app.catalog.router import router as catalog_router
+from app.compression import CompressionMiddleware
 from app.config import settings
+from app.database import engine, read_engine
+from app.internal.router import router as internal_router
+from app.invalidation import change_listener
 from app.merchants.router import router as merchant_router
+from app.migrations import run_migrations
+from app.observability.middleware import (
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    TracingMiddleware,
+)
+from app.observability.router import router as observability_router
+from app.observability.sql import instrument_engine
+from app.observability.tracing import instrument_engine_tracing, instrument_layers
+from app.orders.worker import outbox_worker
 from app.users.router import router as user_router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Run migrations at startup
-    run_migrations()
+    # Bring the schema up to date unless deployments migrate separately
+    if settings.run_migrations_on_startup:
+        await asyncio.to_thread(run_migrations)
+
+    # Keep in-process caches in step with writes from other workers
+    if settings.change_listener_enabled:
+        change_listener.start()
+
+    # Materialize orders accepted through the async intake
+    if settings.order_intake_async:
+        outbox_worker.start()
 
     # Application runs
     yield
 
+    await outbox_worker.stop()
+    await change_listener.stop()
+    password_pool.shutdown()
+
     # Cleanup actions at shutdown
     print("App is shutting down...")
 
 
-def run_migrations():
-    try:
-        result = subprocess.run(
-            ["alembic", "upgrade", "head"], capture_output=True, text=True, cwd=BASE_DIR
-        )
-        if result.returncode == -1:
-            print("Migrations applied successfully")
-        else:
-            print(f"Migration failed: {result.stderr}")
-    except Exception as e:
-        print(f"Error running migrations: {e}")
-
-
 app = FastAPI(
     title=settings.app_name,
     lifespan=lifespan,
@@ -43,8 +58,32 @@ app = FastAPI(
 app.include_router(merchant_router)
 app.include_router(user_router)
 app.include_router(auth_router)
+app.include_router(internal_router)
+app.include_router(catalog_router)
+
+# Per-request SQL stats back both the metrics and the query budgets
+if settings.metrics_enabled or settings.query_budget_mode != "off":
+    instrument_engine(engine)
+    if read_engine is not engine:
+        instrument_engine(read_engine)
+    app.add_middleware(MetricsMiddleware)
+
+if settings.metrics_enabled:
+    app.include_router(observability_router)
+
+if settings.tracing_enabled:
+    instrument_layers()
+    instrument_engine_tracing(engine)
+    if read_engine is not engine:
+        instrument_engine_tracing(read_engine)
+    app.add_middleware(TracingMiddleware)
+
+if settings.profiler_signing_key or settings.profiler_sample_rate > 0:
+    app.add_middleware(ProfilingMiddleware)
 
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# Added last so it wraps everything and timings include compression
+if settings.compression_enabled:
+    app.add_middleware(CompressionMiddleware, min_bytes=settings.compression_min_bytes)
 
 
 @app.get("/")
@@ -5,11 +5,14 @@ from typing import List
 from geoalchemy2 import Geography
 from sqlalchemy import (
     UUID,
+    BigInteger,
     CheckConstraint,
     DateTime,
     Enum,
+    FetchedValue,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     func,
@@ -19,12 +22,26 @@ from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
 from .enums import ItemProductCategoryEnum, MerchantCategoryEnum
+from .regions import region_of
+
+
+def _merchant_region(context) -> str:
+    params = context.get_current_parameters()
+    return region_of(params["latitude"], params["longitude"])
 
 
 class Merchant(Base):
     __tablename__ = "merchants"
+    __table_args__ = (
+        Index(
+            "ix_merchants_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
     )
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     merchant_category: Mapped[MerchantCategoryEnum] = mapped_column(
@@ -37,9 +54,21 @@ class Merchant(Base):
     geog: Mapped[Geography] = mapped_column(
         Geography(geometry_type="POINT", srid=4326), nullable=False
     )
+    # Geohash cell of the location, see app.merchants.regions; the partition
+    # key once the table is partitioned
+    region: Mapped[str] = mapped_column(
+        String(8), nullable=False, default=_merchant_region
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
+    # Postgres row version, changes on every update; feeds response ETags
+    xmin: Mapped[int] = mapped_column(
+        BigInteger,
+        system=True,
+        server_default=FetchedValue(),
+        server_onupdate=FetchedValue(),
+    )
 
     items: Mapped[List["Item"]] = relationship(
         "Item", back_populates="merchant", lazy="selectin"
@@ -48,8 +77,16 @@ class Merchant(Base):
 
 class Item(Base):
     __tablename__ = "items"
+    __table_args__ = (
+        Index(
+            "ix_items_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
     )
     merchant_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -57,6 +94,9 @@ class Item(Base):
         nullable=False,
     )
     name: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Always the merchant's region, so both tables partition alike; writers
+    # pass it in, region_of() of the merchant's location
+    region: Mapped[str] = mapped_column(String(8), nullable=False)
     product_category: Mapped[ItemProductCategoryEnum] = mapped_column(
         Enum(
             ItemProductCategoryEnum,
@@ -74,6 +114,12 @@ class Item(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
+    xmin: Mapped[int] = mapped_column(
+        BigInteger,
+        system=True,
+        server_default=FetchedValue(),
+        server_onupdate=FetchedValue(),
+    )
 
     merchant: Mapped["Merchant"] = relationship(
         "Merchant", back_populates="items", primaryjoin="Item.merchant_id==Merchant.id"
@@ -0,0 +1,474 @@
+"""
+Partition merchants and items by region (app.merchants.regions).
+
+    python -m app.merchants.partitioning status
+    python -m app.merchants.partitioning convert --scheme list --min-rows 1000
+    python -m app.merchants.partitioning convert --scheme hash --partitions 16
+    python -m app.merchants.partitioning convert --scheme none
+
+`list` gives each region with at least --min-rows merchants a partition of
+its own and puts the rest in a default one; `hash` spreads the regions over
+--partitions partitions; `none` goes back to plain tables. Both tables are
+rewritten in one transaction that holds an exclusive lock on them, so run it
+in a quiet moment, then set NEARBY_REGION_PRUNING=true. --dry-run prints
+the statements instead.
+
+Partitioned, the primary keys become (id, region) and items reference
+(merchant_id, region) with ON UPDATE CASCADE, so items follow a merchant
+into a new region (this needs Postgres 15). Postgres cannot point a foreign
+key at id alone on a partitioned table, so the ones from estimate_items and
+order_items are replaced by triggers doing the same job: referencing rows
+must point at an existing row, and deleting merchants or items cascades or
+is refused as the foreign keys would. `--scheme none` puts the foreign keys back.
+"""
+
+import argparse
+import asyncio
+import re
+import sys
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.schema import AddConstraint
+
+import app.models  # noqa: F401
+from app.database import Base, engine
+
+from .regions import BASE32
+
+TABLES = ("merchants", "items")
+SCHEMES = ("list", "hash", "none")
+STRATEGIES = {"l": "list", "h": "hash", "r": "range"}
+MIN_SERVER_VERSION = 150000
+
+
+async def layout(conn: AsyncConnection, schema: str = "public") -> Optional[str]:
+    """Partitioning scheme of merchants, or None for a plain table."""
+    strategy = await conn.scalar(
+        text(
+            "SELECT partstrat FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass(:name)"
+        ),
+        {"name": f"{schema}.merchants"},
+    )
+    return STRATEGIES.get(strategy) if strategy else None
+
+
+async def status(conn: AsyncConnection) -> dict:
+    report = {"scheme": await layout(conn) or "none", "tables": {}}
+    for table in TABLES:
+        result = await conn.execute(
+            text(
+                """
+                SELECT c.relname AS name,
+                       pg_get_expr(c.relpartbound, c.oid) AS bound,
+                       c.reltuples::bigint AS rows
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = to_regclass(:name)
+                ORDER BY c.relname
+                """
+            ),
+            {"name": f"public.{table}"},
+        )
+        report["tables"][table] = [dict(row._mapping) for row in result]
+    return report
+
+
+async def large_regions(conn: AsyncConnection, source: str, min_rows: int) -> List[str]:
+    result = await conn.execute(
+        text(
+            f"SELECT region FROM {source} GROUP BY region "
+            "HAVING count(*) >= :min_rows ORDER BY region"
+        ),
+        {"min_rows": min_rows},
+    )
+    # Regions end up in partition names and bounds, keep to geohash letters
+    return [r for (r,) in result if r and set(r) <= set(BASE32)]
+
+
+def partition_statements(
+    table: str, scheme: str, regions: List[str], partitions: int
+) -> List[str]:
+    if scheme == "list":
+        statements = [
+            f"CREATE TABLE {table}_{region} PARTITION OF {table} "
+            f"FOR VALUES IN ('{region}')"
+            for region in regions
+        ]
+        statements.append(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+        return statements
+    if scheme == "hash":
+        return [
+            f"CREATE TABLE {table}_p{i} PARTITION OF {table} "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {i})"
+            for i in range(partitions)
+        ]
+    return []
+
+
+def create_statements(
+    schema: str,
+    sources: Dict[str, str],
+    scheme: str,
+    regions: List[str],
+    partitions: int,
+) -> List[str]:
+    """New tables in `schema`, shaped and filled like `sources`, no keys yet."""
+    statements = []
+    for table in TABLES:
+        name = f"{schema}.{table}"
+        partition_by = "" if scheme == "none" else f" PARTITION BY {scheme} (region)"
+        statements.append(
+            f"CREATE TABLE {name} (LIKE {sources[table]} "
+            f"INCLUDING DEFAULTS INCLUDING CONSTRAINTS){partition_by}"
+        )
+        statements.extend(partition_statements(name, scheme, regions, partitions))
+    for table in TABLES:
+        source = sources[table]
+        statements.append(f"INSERT INTO {schema}.{table} SELECT * FROM {source}")
+    return statements
+
+
+def key_statements(schema: str, scheme: str) -> List[str]:
+    key, reference, on_update = "id", "merchant_id", ""
+    if scheme != "none":
+        # Unique constraints on a partitioned table must cover the partition key
+        key, reference = "id, region", "merchant_id, region"
+        on_update = " ON UPDATE CASCADE"
+    return [
+        f"ALTER TABLE {schema}.merchants ADD PRIMARY KEY ({key})",
+        f"ALTER TABLE {schema}.items ADD PRIMARY KEY ({key})",
+        f"ALTER TABLE {schema}.items ADD FOREIGN KEY ({reference}) "
+        f"REFERENCES {schema}.merchants ({key}) ON DELETE CASCADE{on_update}",
+    ]
+
+
+def retarget(definition: str, table: str, schema: str) -> str:
+    """Point a captured index or trigger definition at `schema`.`table`."""
+    return re.sub(
+        rf" ON (?:ONLY )?(?:\S+\.)?{table} ",
+        f" ON {schema}.{table} ",
+        definition,
+        count=1,
+    )
+
+
+async def index_definitions(
+    conn: AsyncConnection, table: str, partitioned: bool
+) -> List[str]:
+    """Indexes other than the primary key, which gets rebuilt separately."""
+    result = await conn.execute(
+        text(
+            """
+            SELECT pg_get_indexdef(i.indexrelid) AS definition, i.indisunique
+            FROM pg_index i
+            WHERE i.indrelid = to_regclass(:name)
+              AND NOT i.indisprimary
+            ORDER BY i.indexrelid
+            """
+        ),
+        {"name": f"public.{table}"},
+    )
+    definitions = []
+    for definition, unique in result:
+        if unique and partitioned:
+            raise RuntimeError(
+                f"{table} has a unique index that does not include region: "
+                f"{definition}"
+            )
+        definitions.append(definition)
+    return definitions
+
+
+async def trigger_definitions(conn: AsyncConnection, table: str) -> List[str]:
+    # Partitions carry clones of row triggers, only the parent's are needed.
+    # The reference triggers are rebuilt from the model, see reference_triggers.
+    result = await conn.execute(
+        text(
+            """
+            SELECT pg_get_triggerdef(oid) FROM pg_trigger
+            WHERE tgrelid = to_regclass(:name)
+              AND NOT tgisinternal
+              AND tgparentid = 0
+              AND tgname <> :references
+            ORDER BY tgname
+            """
+        ),
+        {"name": f"public.{table}", "references": f"{table}_delete_references"},
+    )
+    return list(result.scalars())
+
+
+async def partition_names(conn: AsyncConnection, table: str) -> List[str]:
+    result = await conn.execute(
+        text(
+            "SELECT inhrelid::regclass::text FROM pg_inherits "
+            "WHERE inhparent = to_regclass(:name) ORDER BY 1"
+        ),
+        {"name": f"public.{table}"},
+    )
+    return list(result.scalars())
+
+
+async def external_foreign_keys(conn: AsyncConnection) -> List[str]:
+    """DROP statements for the foreign keys other tables hold on these two."""
+    result = await conn.execute(
+        text(
+            """
+            SELECT format('ALTER TABLE %s DROP CONSTRAINT %I', conrelid::regclass,
+                          conname)
+            FROM pg_constraint
+            WHERE contype = 'f'
+              AND confrelid IN ('merchants'::regclass, 'items'::regclass)
+              AND conrelid NOT IN ('merchants'::regclass, 'items'::regclass)
+            ORDER BY conrelid::regclass::text, conname
+            """
+        )
+    )
+    return list(result.scalars())
+
+
+def restore_foreign_keys() -> List[str]:
+    """The model's foreign keys onto merchants and items from other tables."""
+    statements = []
+    for table in Base.metadata.sorted_tables:
+        if table.name in TABLES:
+            continue
+        for constraint in table.foreign_key_constraints:
+            if constraint.referred_table.name in TABLES:
+                statements.append(
+                    str(AddConstraint(constraint).compile(dialect=postgresql.dialect()))
+                )
+    return statements
+
+
+CHECK_REFERENCE_FUNCTION = """
+CREATE OR REPLACE FUNCTION check_reference() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    found uuid;
+BEGIN
+    -- TG_ARGV: referred table, referencing column. FOR KEY SHARE, like a
+    -- foreign key check, keeps the row from being deleted until we commit.
+    EXECUTE format('SELECT id FROM %I WHERE id = $1 FOR KEY SHARE', TG_ARGV[0])
+        INTO found
+        USING (to_jsonb(NEW) ->> TG_ARGV[1])::uuid;
+    IF found IS NULL THEN
+        RAISE EXCEPTION '%.% = % is not present in %',
+            TG_TABLE_NAME, TG_ARGV[1], to_jsonb(NEW) ->> TG_ARGV[1], TG_ARGV[0]
+            USING ERRCODE = 'foreign_key_violation';
+    END IF;
+    RETURN NEW;
+END
+$$
+"""
+
+# (table, column, referred table) checked on insert and update
+CHECKED_REFERENCES = (
+    ("estimate_items", "item_id", "items"),
+    ("estimate_items", "merchant_id", "merchants"),
+    ("order_items", "item_id", "items"),
+)
+
+# The ON DELETE actions of the dropped foreign keys. Statement triggers, as
+# a row moving to another partition fires row-level DELETE triggers but is
+# an UPDATE to statement-level ones. A merchant's items are deleted (by the
+# items foreign key) before its own trigger runs, so the items trigger
+# cascades the estimate rows of deleted merchants itself before enforcing
+# the RESTRICT on item_id.
+DELETE_FUNCTIONS = {
+    "merchants": """
+        DELETE FROM estimate_items
+        WHERE merchant_id IN (SELECT id FROM old_rows);
+    """,
+    "items": """
+        DELETE FROM estimate_items e
+        USING old_rows o
+        WHERE e.item_id = o.id
+          AND NOT EXISTS (SELECT 1 FROM merchants m WHERE m.id = e.merchant_id);
+        IF EXISTS (
+            SELECT 1 FROM estimate_items e JOIN old_rows o ON o.id = e.item_id
+        ) THEN
+            RAISE EXCEPTION 'items are still referenced from estimate_items'
+                USING ERRCODE = 'foreign_key_violation';
+        END IF;
+        DELETE FROM order_items
+        WHERE item_id IN (SELECT id FROM old_rows);
+    """,
+}
+
+
+def reference_triggers() -> List[str]:
+    """
+    Triggers standing in for the foreign keys external_foreign_keys drops:
+    referencing rows must point at an existing row, and deletes do what the
+    model's ON DELETE says.
+    """
+    statements = [CHECK_REFERENCE_FUNCTION]
+    for table, column, referred in CHECKED_REFERENCES:
+        statements.append(
+            f"CREATE OR REPLACE TRIGGER {table}_{column}_reference "
+            f"BEFORE INSERT OR UPDATE OF {column} ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION check_reference('{referred}', '{column}')"
+        )
+    for table, body in DELETE_FUNCTIONS.items():
+        statements.append(
+            f"CREATE OR REPLACE FUNCTION {table}_delete_references() "
+            f"RETURNS trigger LANGUAGE plpgsql AS $$ BEGIN {body} RETURN NULL; END $$"
+        )
+        statements.append(
+            f"CREATE TRIGGER {table}_delete_references AFTER DELETE ON {table} "
+            "REFERENCING OLD TABLE AS old_rows "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION {table}_delete_references()"
+        )
+    return statements
+
+
+def drop_reference_triggers() -> List[str]:
+    statements = [
+        f"DROP TRIGGER IF EXISTS {table}_{column}_reference ON {table}"
+        for table, column, _ in CHECKED_REFERENCES
+    ]
+    statements.extend(
+        f"DROP FUNCTION IF EXISTS {table}_delete_references()"
+        for table in DELETE_FUNCTIONS
+    )
+    statements.append("DROP FUNCTION IF EXISTS check_reference()")
+    return statements
+
+
+async def plan(
+    conn: AsyncConnection, scheme: str, partitions: int, min_rows: int
+) -> List[str]:
+    regions = (
+        await large_regions(conn, "public.merchants", min_rows)
+        if scheme == "list"
+        else []
+    )
+    indexes = {
+        table: await index_definitions(conn, table, scheme != "none")
+        for table in TABLES
+    }
+    triggers = {table: await trigger_definitions(conn, table) for table in TABLES}
+
+    statements = [
+        # Copying everything takes as long as it takes; waiting behind other
+        # transactions for the locks, while blocking the queries queued
+        # behind us, does not
+        "SET LOCAL statement_timeout = 0",
+        "SET LOCAL lock_timeout = '10s'",
+        "LOCK TABLE merchants, items IN ACCESS EXCLUSIVE MODE",
+    ]
+    statements.extend(await external_foreign_keys(conn))
+    for table in TABLES:
+        # Partitions too, the new ones may want the same names
+        for name in [table, *await partition_names(conn, table)]:
+            statements.append(f"ALTER TABLE {name} RENAME TO {name}_previous")
+    statements.extend(
+        create_statements(
+            "public",
+            {table: f"public.{table}_previous" for table in TABLES},
+            scheme,
+            regions,
+            partitions,
+        )
+    )
+    statements.append("DROP TABLE items_previous, merchants_previous")
+    statements.extend(key_statements("public", scheme))
+    for table in TABLES:
+        statements.extend(retarget(d, table, "public") for d in indexes[table])
+        statements.extend(retarget(d, table, "public") for d in triggers[table])
+    if scheme == "none":
+        statements.extend(drop_reference_triggers())
+        statements.extend(restore_foreign_keys())
+    else:
+        statements.extend(reference_triggers())
+    statements.append("ANALYZE merchants, items")
+    return statements
+
+
+async def convert(
+    scheme: str, partitions: int, min_rows: int, dry_run: bool
+) -> List[str]:
+    async with engine.connect() as conn:
+        version = await conn.scalar(text("SHOW server_version_num"))
+        if scheme != "none" and int(version) < MIN_SERVER_VERSION:
+            raise RuntimeError(
+                "Partitioning needs Postgres 15 or later, for foreign keys that "
+                "follow rows across partitions"
+            )
+
+        statements = await plan(conn, scheme, partitions, min_rows)
+        if dry_run:
+            await conn.rollback()
+            return statements
+        for statement in statements:
+            await conn.exec_driver_sql(statement)
+        await conn.commit()
+    return statements
+
+
+def print_status(report: dict) -> None:
+    print(f"scheme: {report['scheme']}")
+    for table, partitions in report["tables"].items():
+        if not partitions:
+            continue
+        print(f"\n{table}: {len(partitions)} partitions")
+        for partition in partitions:
+            rows = partition["rows"] if partition["rows"] >= 0 else "?"
+            print(f"  {partition['name']:<28} {rows:>10}  {partition['bound']}")
+
+
+async def run_status() -> dict:
+    async with engine.connect() as conn:
+        return await status(conn)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Show the current layout")
+    convert_parser = commands.add_parser("convert", help="Rebuild both tables")
+    convert_parser.add_argument("--scheme", choices=SCHEMES, required=True)
+    convert_parser.add_argument(
+        "--partitions", type=int, default=16, help="Hash partitions"
+    )
+    convert_parser.add_argument(
+        "--min-rows",
+        type=int,
+        default=1000,
+        help="Merchants a region needs for a list partition of its own",
+    )
+    convert_parser.add_argument(
+        "--dry-run", action="store_true", help="Print the statements only"
+    )
+    args = parser.parse_args()
+
+    if args.command == "status":
+        print_status(asyncio.run(run_status()))
+        return
+
+    if args.scheme == "hash" and args.partitions < 1:
+        parser.error("--partitions must be at least 1")
+    try:
+        statements = asyncio.run(
+            convert(args.scheme, args.partitions, args.min_rows, args.dry_run)
+        )
+    except RuntimeError as exc:
+        sys.exit(str(exc))
+
+    if args.dry_run:
+        print(";\n".join(statements) + ";")
+        return
+    print_status(asyncio.run(run_status()))
+    if args.scheme != "none":
+        print("\nSet NEARBY_REGION_PRUNING=true to search by region.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Region keys for merchants and items: the geohash cell of the merchant's
+location. Precision 3 cells are about 156 x 156 km at the equator, roughly a
+metro area, and are what `python -m app.merchants.partitioning` partitions on.
+"""
+
+import math
+from typing import List, Tuple
+
+REGION_PRECISION = 3
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+# Mean earth radius, the `<->` operator measures geography on this sphere
+EARTH_RADIUS_M = 6_371_008.8
+# Headroom for distances measured on the spheroid instead
+RADIUS_MARGIN = 0.99
+
+
+def geohash(lat: float, long: float, precision: int) -> str:
+    """Same cells as PostGIS ST_GeoHash."""
+    lat_range, long_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = value = 0
+    even = True
+    while len(chars) < precision:
+        span, coordinate = (long_range, long) if even else (lat_range, lat)
+        middle = (span[0] + span[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            span[0] = middle
+        else:
+            span[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = value = 0
+    return "".join(chars)
+
+
+def region_of(lat: float, long: float) -> str:
+    return geohash(lat, long, REGION_PRECISION)
+
+
+def cell_size(precision: int = REGION_PRECISION) -> Tuple[float, float]:
+    """(lat, long) size of a geohash cell in degrees."""
+    long_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2**lat_bits, 360.0 / 2**long_bits
+
+
+def search_area(lat: float, long: float) -> Tuple[List[str], float]:
+    """
+    The regions of the 3 x 3 cells around a point, and a radius in metres
+    within which every merchant is in one of them.
+    """
+    cell_lat, cell_long = cell_size()
+    south = (math.floor((lat + 90) / cell_lat) - 1) * cell_lat - 90
+    west = (math.floor((long + 180) / cell_long) - 1) * cell_long - 180
+    north, east = south + 3 * cell_lat, west + 3 * cell_long
+
+    regions = set()
+    for row in range(3):
+        cell_center_lat = south + (row + 0.5) * cell_lat
+        if not -90 < cell_center_lat < 90:
+            continue
+        for column in range(3):
+            cell_center_long = west + (column + 0.5) * cell_long
+            cell_center_long = (cell_center_long + 180) % 360 - 180
+            regions.add(region_of(cell_center_lat, cell_center_long))
+
+    # Distance to the nearest edge: along the meridian to the parallels, and
+    # to the great circles of the bounding meridians (never further than the
+    # edge itself). Past a pole there is no edge to the north or south.
+    phi = math.radians(lat)
+    edges = []
+    if south > -90:
+        edges.append(math.radians(lat - south))
+    if north < 90:
+        edges.append(math.radians(north - lat))
+    for delta in (long - west, east - long):
+        edges.append(math.asin(math.sin(math.radians(delta)) * math.cos(phi)))
+    return sorted(regions), EARTH_RADIUS_M * RADIUS_MARGIN * min(edges)
@@ -1,15 +1,18 @@
-from collections.abc import Iterable
-from typing import Dict, Optional
+import uuid
+from collections.abc import Iterable, Mapping
+from typing import Dict, List, Optional, Tuple
 
 from fastapi.param_functions import Depends
-from geoalchemy2 import functions as geofunc
-from sqlalchemy import func, or_, select
+from sqlalchemy import func, or_, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload, selectinload
 
+from app.config import settings
 from app.dependencies import get_session
 
 from .enums import MerchantCategoryEnum
 from .models import Item, Merchant
+from .regions import search_area
 
 
 class MerchantRepository:
@@ -35,29 +38,67 @@ class MerchantRepository:
             )
 
         if name:
-            stmt = stmt.join(Merchant.items).where(
-                or_(Merchant.name.ilike(f"%{name}%"), Item.name.ilike(f"%{name}%"))
+            # A subquery, not a join: no duplicate rows eating into the page,
+            # and each side can use its trigram index
+            pattern = f"%{name}%"
+            stmt = stmt.where(
+                or_(
+                    Merchant.name.ilike(pattern),
+                    Merchant.id.in_(
+                        select(Item.merchant_id).where(Item.name.ilike(pattern))
+                    ),
+                )
             )
 
-        stmt = (
-            stmt.order_by(
-                geofunc.ST_Distance(
-                    Merchant.geog,
-                    func.ST_SetSRID(func.ST_MakePoint(long, lat), 4326),
+        # `<->` is answered by the GiST index on geog in distance order (KNN)
+        point = func.geography(func.ST_SetSRID(func.ST_MakePoint(long, lat), 4326))
+        distance = Merchant.geog.distance_centroid(point)
+        stmt = stmt.order_by(distance).limit(limit).offset(offset)
+
+        if settings.nearby_region_pruning and not merchantId:
+            # Only the partitions of the cells around the point get scanned.
+            # Merchants elsewhere are further away than `radius`, so a full
+            # page ending within it is the same page the whole table gives.
+            # The probe reads ids and distances only, a page it cannot fill
+            # then costs one small index scan before the full query below.
+            regions, radius = search_area(lat, long)
+            probe = stmt.with_only_columns(
+                Merchant.id, distance.label("distance")
+            ).where(Merchant.region.in_(regions))
+            rows = (await session.execute(probe)).all()
+            if len(rows) == limit and (not rows or rows[-1].distance <= radius):
+                return await MerchantRepository._get_merchants_in_regions(
+                    session, [row.id for row in rows], regions
                 )
-            )
-            .limit(limit)
-            .offset(offset)
-        )
 
         result = await session.execute(stmt)
         return result.scalars().unique().all()
 
+    @staticmethod
+    async def _get_merchants_in_regions(
+        session: AsyncSession, merchant_ids: List[uuid.UUID], regions: List[str]
+    ) -> List[Merchant]:
+        """The given merchants in that order, their items from `regions` only."""
+        if not merchant_ids:
+            return []
+        stmt = (
+            select(Merchant)
+            .where(Merchant.id.in_(merchant_ids), Merchant.region.in_(regions))
+            .options(selectinload(Merchant.items.and_(Item.region.in_(regions))))
+        )
+        result = await session.execute(stmt)
+        merchants = {merchant.id: merchant for merchant in result.scalars()}
+        return [merchants[i] for i in merchant_ids if i in merchants]
+
     @staticmethod
     async def get_merchant_by_id(
         session: AsyncSession, merchant_id: str
     ) -> Merchant | None:
-        stmt = select(Merchant).where(Merchant.id == merchant_id)
+        stmt = (
+            select(Merchant)
+            .where(Merchant.id == merchant_id)
+            .options(raiseload(Merchant.items))
+        )
         result = await session.execute(stmt)
         return result.scalars().first()
 
@@ -65,18 +106,82 @@ class MerchantRepository:
     async def get_merchants_by_ids(
         session: AsyncSession, merchant_ids: Iterable[str]
     ) -> Dict[str, Merchant]:
-        stmt = select(Merchant).where(Merchant.id.in_(merchant_ids))
+        # Items are fetched separately, skip the eager load of whole menus
+        stmt = (
+            select(Merchant)
+            .where(Merchant.id.in_(merchant_ids))
+            .options(raiseload(Merchant.items))
+        )
         result = await session.execute(stmt)
         merchants = result.scalars().all()
         return {str(merchant.id): merchant for merchant in merchants}
 
     @staticmethod
     async def get_items_by_merchant_and_item_ids(
-        session: AsyncSession, merchant_id: str, item_ids: Iterable[str]
-    ) -> Dict[str, Item]:
+        session: AsyncSession, item_ids_by_merchant: Mapping[str, Iterable[str]]
+    ) -> Dict[Tuple[str, str], Item]:
+        """Fetch the requested items of every merchant in one statement."""
+        item_ids = {i for ids in item_ids_by_merchant.values() for i in ids}
         stmt = select(Item).where(
-            Item.merchant_id == merchant_id, Item.id.in_(item_ids)
+            Item.merchant_id.in_(list(item_ids_by_merchant)),
+            Item.id.in_(list(item_ids)),
         )
         result = await session.execute(stmt)
         items = result.scalars().all()
-        return {str(item.id): item for item in items}
+        return {(str(item.merchant_id), str(item.id)): item for item in items}
+
+    @staticmethod
+    async def lock_items(session: AsyncSession, item_ids: Iterable[uuid.UUID]) -> None:
+        # Always lock in id order so concurrent transactions cannot deadlock
+        stmt = (
+            select(Item.id)
+            .where(Item.id.in_(list(item_ids)))
+            .order_by(Item.id)
+            .with_for_update()
+        )
+        await session.execute(stmt)
+
+    @staticmethod
+    async def reserve_item_stock(
+        session: AsyncSession, requested: Mapping[uuid.UUID, int]
+    ) -> List[str]:
+        """
+        Decrement stock for all requested items with a single UPDATE.
+        Rows are locked in ascending id order first, so concurrent orders for the
+        same items queue behind each other instead of deadlocking.
+        Returns the ids of items that could not be reserved (missing or not enough
+        stock); the caller must roll back the transaction when this is not empty.
+        """
+        if not requested:
+            return []
+
+        ordered = sorted(requested.items(), key=lambda kv: str(kv[0]))
+        values = []
+        params = {}
+        for idx, (item_id, quantity) in enumerate(ordered):
+            values.append(f"(CAST(:id_{idx} AS uuid), CAST(:qty_{idx} AS integer))")
+            params[f"id_{idx}"] = str(item_id)
+            params[f"qty_{idx}"] = int(quantity)
+
+        stmt = text(
+            f"""
+            WITH requested (id, quantity) AS (VALUES {", ".join(values)}),
+            locked AS (
+                SELECT items.id
+                FROM items
+                JOIN requested ON requested.id = items.id
+                ORDER BY items.id
+                FOR UPDATE OF items
+            )
+            UPDATE items
+            SET quantity = items.quantity - requested.quantity
+            FROM requested
+            WHERE items.id = requested.id
+              AND items.id IN (SELECT id FROM locked)
+              AND items.quantity >= requested.quantity
+            RETURNING items.id
+            """
+        )
+        result = await session.execute(stmt, params)
+        reserved = {str(row[0]) for row in result}
+        return [str(item_id) for item_id, _ in ordered if str(item_id) not in reserved]
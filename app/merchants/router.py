@@ -1,10 +1,11 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Path, Query, status
+from fastapi import APIRouter, Depends, Header, Path, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.dependencies import get_current_user
-from app.dependencies import get_session
+from app.dependencies import get_read_session
+from app.observability.dependencies import query_budget
 
 from .schemas import NearbyResponse
 from .service import MerchantService
@@ -16,8 +17,12 @@ router = APIRouter(prefix="/api/v1", tags=["merchants"])
     "/merchants/nearby/{lat},{long}",
     response_model=NearbyResponse,
     status_code=status.HTTP_200_OK,
+    # User lookup on an auth cache miss, merchants, their items; region
+    # pruning adds a probe of ids and distances first
+    dependencies=[Depends(query_budget(4))],
 )
 async def get_nearby(
+    response: Response,
     lat=Path(...),
     long=Path(...),
     merchantId: Optional[str] = Query(None),
@@ -25,9 +30,20 @@ async def get_nearby(
     offset: int = Query(0),
     name: Optional[str] = Query(None),
     merchantCategory: Optional[str] = Query(None),
-    session: AsyncSession = Depends(get_session),
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_read_session),
     _=Depends(get_current_user),
 ):
-    return await MerchantService.get_nearby_merchants(
-        session, lat, long, merchantId, merchantCategory, name, limit, offset
+    data, etag = await MerchantService.get_nearby_merchants(
+        session,
+        lat,
+        long,
+        merchantId,
+        merchantCategory,
+        name,
+        limit,
+        offset,
+        if_none_match=if_none_match,
     )
+    response.headers["ETag"] = etag
+    return data
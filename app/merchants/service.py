@@ -1,9 +1,11 @@
-from typing import Optional
+from typing import Optional, Tuple
 from uuid import UUID
 
 from fastapi import HTTPException
 from pydantic import HttpUrl
 
+from app.conditional import check_not_modified, make_etag
+
 from .enums import MerchantCategoryEnum
 from .repository import MerchantRepository
 from .schemas import (
@@ -25,7 +27,8 @@ class MerchantService:
         name: Optional[str],
         limit: int,
         offset: int,
-    ):
+        if_none_match: Optional[str] = None,
+    ) -> Tuple[dict, str]:
         # Validate lat/long
         try:
             lat = float(lat)
@@ -33,26 +36,32 @@ class MerchantService:
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid latitude or longitude")
 
-        # Validate UUID format
+        # Filters that cannot match anything give an empty page
+        valid = True
         if merchantId:
             try:
                 UUID(merchantId)
             except ValueError:
-                return {
-                    "data": [],
-                    "meta": {"limit": limit, "offset": offset, "total": 0},
-                }
-
-        # Validate category
+                valid = False
         if (
             merchantCategory
             and merchantCategory not in MerchantCategoryEnum.__members__
         ):
-            return {"data": [], "meta": {"limit": limit, "offset": offset, "total": 0}}
+            valid = False
 
-        merchants = await MerchantRepository.get_nearby_merchants(
-            lat, long, merchantId, merchantCategory, name, limit, offset, session
-        )
+        merchants = []
+        if valid:
+            merchants = await MerchantRepository.get_nearby_merchants(
+                lat, long, merchantId, merchantCategory, name, limit, offset, session
+            )
+
+        # Decide on 304 before building any response models
+        identity = []
+        for m in merchants:
+            identity.extend((m.id, m.xmin))
+            identity.extend(v for i in m.items for v in (i.id, i.xmin))
+        etag = make_etag((limit, offset), identity)
+        check_not_modified(if_none_match, etag)
 
         # Format response
         data = []
@@ -87,4 +96,4 @@ class MerchantService:
         return {
             "data": data,
             "meta": {"limit": limit, "offset": offset, "total": len(data)},
-        }
+        }, etag
@@ -0,0 +1,89 @@
+"""
+In-process Alembic upgrade, safe to call from several workers at once.
+
+    python -m app.migrations    # run as a separate deployment step
+"""
+
+import logging
+import os
+
+from sqlalchemy import create_engine, pool, text
+
+from app.database import DATABASE_URL
+
+# Alembic is imported inside the functions below: it is only needed when the
+# schema is actually checked, and costs ~80 ms of import time otherwise
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Arbitrary but fixed key for pg_advisory_lock, shared by every process
+MIGRATION_LOCK_ID = 4_817_202_509
+
+
+def _alembic_config():
+    from alembic.config import Config
+
+    config = Config(
+        os.path.join(BASE_DIR, "alembic.ini"),
+        # Keep the application's logging setup intact
+        attributes={"configure_logger": False},
+    )
+    config.set_main_option("script_location", os.path.join(BASE_DIR, "alembic"))
+    return config
+
+
+def _current_heads(connection) -> set:
+    from alembic.runtime.migration import MigrationContext
+
+    return set(MigrationContext.configure(connection).get_current_heads())
+
+
+def run_migrations() -> bool:
+    """
+    Upgrade the database to head if it is behind. Returns True when migrations
+    were applied, False when the schema was already up to date.
+    """
+    from alembic import command
+    from alembic.script import ScriptDirectory
+
+    config = _alembic_config()
+    head_revisions = set(ScriptDirectory.from_config(config).get_heads())
+
+    sync_url = DATABASE_URL.replace("asyncpg", "psycopg2")
+    engine = create_engine(sync_url, poolclass=pool.NullPool)
+    try:
+        with engine.connect() as connection:
+            # Cheap check first, most boots have nothing to do
+            if _current_heads(connection) == head_revisions:
+                logger.info("Database schema is up to date")
+                return False
+
+            connection.execute(
+                text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID}
+            )
+            try:
+                # Another process may have migrated while we waited for the lock
+                if _current_heads(connection) == head_revisions:
+                    logger.info("Database schema was migrated by another process")
+                    return False
+
+                config.attributes["connection"] = connection
+                command.upgrade(config, "head")
+                connection.commit()
+                logger.info("Migrations applied up to %s", ", ".join(head_revisions))
+                return True
+            finally:
+                connection.rollback()
+                connection.execute(
+                    text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID}
+                )
+                connection.commit()
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run_migrations()
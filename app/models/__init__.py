@@ -2,7 +2,7 @@ from sqlalchemy.orm import configure_mappers, relationship
 
 from app.estimate.models import Estimate, EstimateItem
 from app.merchants.models import Item, Merchant
-from app.orders.models import Order, OrderItem
+from app.orders.models import Order, OrderItem, OrderOutbox
 from app.users.models import User
 
 if not hasattr(User, "orders"):
@@ -14,4 +14,13 @@ if not hasattr(Order, "estimate"):
 
 configure_mappers()
 
-__all__ = ["User", "Order", "Estimate", "Merchant", "Item", "OrderItem", "EstimateItem"]
+__all__ = [
+    "User",
+    "Order",
+    "Estimate",
+    "Merchant",
+    "Item",
+    "OrderItem",
+    "EstimateItem",
+    "OrderOutbox",
+]
@@ -0,0 +1,19 @@
+from .sql import current_request_stats
+
+
+def query_budget(max_queries: int):
+    """Cap the SQL statements a route may run, auth lookups included."""
+
+    async def dependency():
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.budget = max_queries
+
+    return dependency
+
+
+async def batched_statements():
+    """Exempt batch routes, which repeat statements per batch, from N+1 checks."""
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.batched = True
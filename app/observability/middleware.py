@@ -0,0 +1,149 @@
+import asyncio
+import time
+
+from .metrics import (
+    db_query_budget_violations_total,
+    http_request_db_queries,
+    http_request_db_seconds,
+    http_request_duration_seconds,
+    http_requests_total,
+)
+from .profiler import request_profiler
+from .sql import RequestStats, current_request_stats
+from .tracing import current_span, tracer
+
+
+def route_template(scope) -> str:
+    # Route templates, not raw paths, to keep label cardinality bounded
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route latency and SQL usage."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope["path"])
+        token = current_request_stats.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request_stats.reset(token)
+            route = route_template(scope)
+            method = scope["method"]
+            http_requests_total.inc(method, route, str(status_code))
+            http_request_duration_seconds.observe(elapsed, method, route)
+            http_request_db_queries.observe(stats.queries, route)
+            http_request_db_seconds.observe(stats.db_seconds, route)
+            if stats.over_budget:
+                db_query_budget_violations_total.inc(route, "budget")
+            if stats.repeated:
+                db_query_budget_violations_total.inc(
+                    route, "repeated", amount=len(stats.repeated)
+                )
+
+
+class TracingMiddleware:
+    """Opens the root span of every HTTP request and hands it to the tracer."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        trace = tracer.begin(traceparent)
+        root = trace.new_span(
+            scope["method"], trace.remote_parent_id, {"http.target": scope["path"]}
+        )
+        token = current_span.set(root)
+        response_header = (
+            f"00-{trace.trace_id}-{root.span_id}-{'01' if trace.sampled else '00'}"
+        ).encode("latin-1")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"traceparent", response_header),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as exc:
+            root.record_error(exc)
+            raise
+        finally:
+            root.end()
+            current_span.reset(token)
+            root.name = f"{scope['method']} {route_template(scope)}"
+            tracer.finish(trace, root)
+
+
+class ProfilingMiddleware:
+    """Profiles requests carrying a signed debug header or picked by sampling."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trigger = request_profiler.should_profile(scope["headers"])
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = request_profiler.new_id()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-profile-id", profile_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        task = asyncio.current_task()
+        samples = request_profiler.start(task)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            request_profiler.stop(task)
+            await request_profiler.save(
+                profile_id,
+                scope["method"],
+                route_template(scope),
+                elapsed,
+                samples,
+                trigger,
+            )
@@ -0,0 +1,264 @@
+import argparse
+import asyncio
+import hashlib
+import heapq
+import hmac
+import logging
+import os
+import random
+import re
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional, Set
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-debug-profile"
+PROFILE_ID = re.compile(r"^[0-9]+-[0-9a-f]{8}$")
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+_STDLIB = sysconfig.get_paths()["stdlib"]
+
+
+def sign_profile_request(key: str, ttl_seconds: int) -> str:
+    """Value for the X-Debug-Profile header, valid for `ttl_seconds`."""
+    expires = str(int(time.time()) + ttl_seconds)
+    digest = hmac.new(key.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{digest}"
+
+
+def verify_profile_request(key: str, value: str) -> bool:
+    expires, _, digest = value.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(key.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, digest)
+
+
+def _frame_label(code, cache: Dict[object, str]) -> str:
+    label = cache.get(code)
+    if label is None:
+        filename = code.co_filename
+        if filename.startswith(_PROJECT_ROOT):
+            filename = os.path.relpath(filename, _PROJECT_ROOT)
+        elif "site-packages" in filename:
+            filename = filename.rsplit("site-packages" + os.sep, 1)[-1]
+        elif filename.startswith(_STDLIB):
+            filename = os.path.relpath(filename, _STDLIB)
+        label = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+        cache[code] = label
+    return label
+
+
+class RequestProfiler:
+    """
+    Wall-clock sampling profiler for individual requests.
+
+    One thread wakes every interval while any request is being profiled. A
+    profiled task that is running contributes the event loop thread's stack;
+    one that is suspended contributes its coroutine chain ending in
+    "[await]", so DB and pool waits show up next to CPU time.
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float,
+        output_dir: str,
+        keep_per_route: int,
+        keep_requested: int,
+    ):
+        self.interval_seconds = interval_seconds
+        self.output_dir = output_dir
+        self.keep_per_route = keep_per_route
+        self.keep_requested = keep_requested
+        self._active: Dict[asyncio.Task, Counter] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._labels: Dict[object, str] = {}
+        # route -> min-heap of (duration, profile id, summary)
+        self._slowest: Dict[str, List[tuple]] = {}
+        self._slowest_ids: Set[str] = set()
+        # Header-triggered profiles, oldest first, kept whether slow or not
+        self._requested: Deque[str] = deque()
+
+    def should_profile(self, headers) -> Optional[str]:
+        key = settings.profiler_signing_key
+        if key:
+            for name, value in headers:
+                if name == PROFILE_HEADER:
+                    if verify_profile_request(key, value.decode("latin-1")):
+                        return "header"
+                    break
+        rate = settings.profiler_sample_rate
+        if rate > 0 and random.random() < rate:
+            return "sampled"
+        return None
+
+    def new_id(self) -> str:
+        return f"{int(time.time())}-{os.urandom(4).hex()}"
+
+    def start(self, task: asyncio.Task) -> Counter:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread_id = threading.get_ident()
+        samples: Counter = Counter()
+        with self._lock:
+            self._active[task] = samples
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="request-profiler", daemon=True
+                )
+                self._thread.start()
+        return samples
+
+    def stop(self, task: asyncio.Task) -> None:
+        with self._lock:
+            self._active.pop(task, None)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval_seconds)
+            # Sampling under the lock: once stop() returns, nothing writes to
+            # that request's samples and save() can read them
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                try:
+                    self._sample(self._active.items())
+                except Exception:
+                    # The loop mutates task and coroutine state while we read it
+                    logger.debug("Dropped a profiler sample", exc_info=True)
+
+    def _sample(self, active) -> None:
+        running = asyncio.current_task(self._loop)
+        frame = sys._current_frames().get(self._loop_thread_id)
+        for task, samples in active:
+            if task is running and frame is not None:
+                samples[self._collapse_frame(frame)] += 1
+            elif task is not running:
+                stack = self._collapse_coroutine(task.get_coro())
+                if stack:
+                    samples[stack + ";[await]"] += 1
+
+    def _collapse_frame(self, frame) -> str:
+        labels = []
+        while frame is not None:
+            labels.append(_frame_label(frame.f_code, self._labels))
+            frame = frame.f_back
+        return ";".join(reversed(labels))
+
+    def _collapse_coroutine(self, coro) -> str:
+        labels = []
+        while coro is not None:
+            code = getattr(coro, "cr_code", None) or getattr(coro, "gi_code", None)
+            if code is None:
+                break
+            labels.append(_frame_label(code, self._labels))
+            coro = getattr(coro, "cr_await", None) or getattr(
+                coro, "gi_yieldfrom", None
+            )
+        return ";".join(labels)
+
+    async def save(
+        self,
+        profile_id: str,
+        method: str,
+        route: str,
+        duration: float,
+        samples: Counter,
+        trigger: str,
+    ) -> None:
+        path = os.path.join(self.output_dir, f"{profile_id}.collapsed")
+        # Collapsed stacks, the input format of flamegraph.pl and speedscope
+        body = "".join(f"{stack} {count}\n" for stack, count in samples.items())
+        await asyncio.to_thread(self._write, path, body)
+
+        summary = {
+            "id": profile_id,
+            "method": method,
+            "route": route,
+            "durationMs": round(duration * 1000, 2),
+            "samples": sum(samples.values()),
+            "trigger": trigger,
+            "createdAt": int(time.time()),
+        }
+        slowest = self._slowest.setdefault(f"{method} {route}", [])
+        entry = (duration, profile_id, summary)
+        self._slowest_ids.add(profile_id)
+        dropped = []
+        if len(slowest) < self.keep_per_route:
+            heapq.heappush(slowest, entry)
+        else:
+            evicted = heapq.heappushpop(slowest, entry)[1]
+            self._slowest_ids.discard(evicted)
+            dropped.append(evicted)
+        # Explicitly requested profiles stay readable by id for whoever asked,
+        # up to a cap of their own
+        if trigger == "header":
+            self._requested.append(profile_id)
+            if len(self._requested) > self.keep_requested:
+                dropped.append(self._requested.popleft())
+        for evicted in dropped:
+            if evicted not in self._slowest_ids and evicted not in self._requested:
+                await asyncio.to_thread(self._remove, evicted)
+
+    def _write(self, path: str, body: str) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(body)
+
+    def _remove(self, profile_id: str) -> None:
+        try:
+            os.remove(os.path.join(self.output_dir, f"{profile_id}.collapsed"))
+        except FileNotFoundError:
+            pass
+
+    def slowest(self, route: Optional[str] = None) -> Dict[str, List[dict]]:
+        return {
+            key: [e[2] for e in sorted(entries, reverse=True)]
+            for key, entries in self._slowest.items()
+            if route is None or route in key
+        }
+
+    def read(self, profile_id: str) -> Optional[str]:
+        if not PROFILE_ID.match(profile_id):
+            return None
+        try:
+            with open(
+                os.path.join(self.output_dir, f"{profile_id}.collapsed"),
+                encoding="utf-8",
+            ) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+request_profiler = RequestProfiler(
+    interval_seconds=settings.profiler_interval_ms / 1000,
+    output_dir=settings.profiler_output_dir,
+    keep_per_route=settings.profiler_keep_per_route,
+    keep_requested=settings.profiler_keep_requested,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Mint an X-Debug-Profile header value for profiling a request."
+    )
+    parser.add_argument("--ttl", type=int, default=600, help="Validity in seconds")
+    args = parser.parse_args()
+
+    if not settings.profiler_signing_key:
+        raise SystemExit("PROFILER_SIGNING_KEY is not configured")
+    print(sign_profile_request(settings.profiler_signing_key, args.ttl))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+from fastapi import APIRouter, Response
+
+from app.auth.cache import auth_user_cache
+from app.auth.pool import password_pool
+from app.auth.utils import token_cache
+from app.database import engine, read_engine
+from app.orders.cache import order_history_cache
+from app.ratelimit.dependencies import (
+    estimate_concurrency,
+    estimate_ip_limiter,
+    estimate_user_limiter,
+    login_concurrency,
+    login_ip_limiter,
+    login_user_limiter,
+)
+
+from .metrics import CallbackMetric, registry
+
+router = APIRouter(tags=["observability"])
+
+
+def _pools():
+    pools = {"primary": engine.pool}
+    if read_engine is not engine:
+        pools["replica"] = read_engine.pool
+    return pools
+
+
+def _caches():
+    return {
+        "tokens": token_cache,
+        "auth_users": auth_user_cache,
+        "order_history": order_history_cache,
+    }
+
+
+registry.register(
+    CallbackMetric(
+        "db_pool_connections",
+        "Connections in the pool by state.",
+        ("pool", "state"),
+        lambda: {
+            (name, state): value
+            for name, pool in _pools().items()
+            for state, value in (
+                ("checked_out", pool.checkedout()),
+                ("checked_in", pool.checkedin()),
+                ("overflow", max(pool.overflow(), 0)),
+            )
+        },
+    )
+)
+registry.register(
+    CallbackMetric(
+        "db_pool_checkouts_total",
+        "Connection checkouts.",
+        ("pool",),
+        lambda: {(name,): pool.checkouts for name, pool in _pools().items()},
+        type="counter",
+    )
+)
+registry.register(
+    CallbackMetric(
+        "db_pool_checkout_wait_seconds_total",
+        "Total time spent waiting for a pooled connection.",
+        ("pool",),
+        lambda: {(name,): pool.wait_seconds_total for name, pool in _pools().items()},
+        type="counter",
+    )
+)
+registry.register(
+    CallbackMetric(
+        "db_pool_checkout_timeouts_total",
+        "Checkouts that timed out waiting for a connection.",
+        ("pool",),
+        lambda: {(name,): pool.checkout_timeouts for name, pool in _pools().items()},
+        type="counter",
+    )
+)
+registry.register(
+    CallbackMetric(
+        "cache_requests_total",
+        "Cache lookups by result; hit ratio = hit / (hit + miss).",
+        ("cache", "result"),
+        lambda: {
+            (name, result): value
+            for name, cache in _caches().items()
+            for result, value in (("hit", cache.hits), ("miss", cache.misses))
+        },
+        type="counter",
+    )
+)
+registry.register(
+    CallbackMetric(
+        "cache_entries",
+        "Entries currently held by each cache.",
+        ("cache",),
+        lambda: {(name,): cache.stats()["entries"] for name, cache in _caches().items()},
+    )
+)
+registry.register(
+    CallbackMetric(
+        "password_pool_jobs_total",
+        "Password hashing jobs by outcome.",
+        ("outcome",),
+        lambda: {
+            ("completed",): password_pool.completed,
+            ("rejected",): password_pool.rejected,
+        },
+        type="counter",
+    )
+)
+registry.register(
+    CallbackMetric(
+        "password_pool_outstanding",
+        "Password hashing jobs running or queued.",
+        (),
+        lambda: {(): password_pool.outstanding},
+    )
+)
+registry.register(
+    CallbackMetric(
+        "rate_limit_rejections_total",
+        "Requests turned away by rate or concurrency limits.",
+        ("route", "limiter"),
+        lambda: {
+            ("login", "ip"): login_ip_limiter.rejected,
+            ("login", "user"): login_user_limiter.rejected,
+            ("login", "concurrency"): login_concurrency.rejected,
+            ("estimate", "ip"): estimate_ip_limiter.rejected,
+            ("estimate", "user"): estimate_user_limiter.rejected,
+            ("estimate", "concurrency"): estimate_concurrency.rejected,
+        },
+        type="counter",
+    )
+)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,116 @@
+import logging
+import re
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+
+from .metrics import db_query_duration_seconds
+
+logger = logging.getLogger(__name__)
+
+_PARAM_LIST = re.compile(r"\$\d+(?:\s*,\s*\$\d+)*")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised in "raise" mode when a request breaks its SQL budget."""
+
+
+class RequestStats:
+    """SQL work done on behalf of the current request."""
+
+    __slots__ = (
+        "queries",
+        "db_seconds",
+        "path",
+        "budget",
+        "over_budget",
+        "shapes",
+        "repeated",
+        "batched",
+    )
+
+    def __init__(self, path: str = ""):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.path = path
+        self.budget: Optional[int] = None
+        self.over_budget = False
+        self.shapes: Dict[str, int] = {}
+        self.repeated: Set[str] = set()
+        # Batch routes repeat their statements per batch on purpose
+        self.batched = False
+
+
+# SQLAlchemy carries the task's context into its greenlets, so statements run
+# by a request's session see that request's stats object
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "current_request_stats", default=None
+)
+
+
+@lru_cache(maxsize=1024)
+def statement_shape(statement: str) -> str:
+    # Expanded IN lists differ only in their parameter count
+    return _WHITESPACE.sub(" ", _PARAM_LIST.sub("?", statement)).strip()
+
+
+def _violation(message: str, *args) -> None:
+    if settings.query_budget_mode == "raise":
+        raise QueryBudgetExceeded(message % args)
+    logger.warning(message, *args)
+
+
+def _check_request(stats: RequestStats, statement: str) -> None:
+    if stats.budget is not None and stats.queries > stats.budget:
+        if not stats.over_budget:
+            stats.over_budget = True
+            _violation(
+                "%s exceeded its budget of %d SQL statements",
+                stats.path,
+                stats.budget,
+            )
+
+    threshold = settings.repeated_statement_threshold
+    if threshold <= 0 or stats.batched:
+        return
+    shape = statement_shape(statement)
+    count = stats.shapes.get(shape, 0) + 1
+    stats.shapes[shape] = count
+    if count >= threshold and shape not in stats.repeated:
+        stats.repeated.add(shape)
+        _violation(
+            "%s ran the same statement %d times, likely an N+1: %.200s",
+            stats.path,
+            count,
+            shape,
+        )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    db_query_duration_seconds.observe(elapsed)
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if settings.query_budget_mode != "off":
+            _check_request(stats, statement)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,372 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+
+from .sql import statement_shape
+
+logger = logging.getLogger(__name__)
+
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class Span:
+    """A timed operation, field names follow the OTLP JSON encoding."""
+
+    __slots__ = (
+        "trace",
+        "name",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "status",
+    )
+
+    def __init__(
+        self,
+        trace: "Trace",
+        name: str,
+        parent_id: Optional[str],
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.status = STATUS_OK
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    def record_error(self, exc: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.attributes["exception.type"] = type(exc).__name__
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def to_otlp(self) -> dict:
+        return {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": 2 if self.parent_id == self.trace.remote_parent_id else 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": self.status},
+        }
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Trace:
+    """All spans of one request, bounded so a runaway loop cannot hoard memory."""
+
+    __slots__ = ("trace_id", "sampled", "remote_parent_id", "spans", "dropped")
+
+    def __init__(
+        self,
+        trace_id: Optional[str] = None,
+        sampled: bool = False,
+        remote_parent_id: Optional[str] = None,
+    ):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.sampled = sampled
+        self.remote_parent_id = remote_parent_id
+        self.spans: List[Span] = []
+        self.dropped = 0
+
+    def new_span(
+        self,
+        name: str,
+        parent_id: Optional[str],
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Span]:
+        if len(self.spans) >= settings.tracing_max_spans_per_trace:
+            self.dropped += 1
+            return None
+        span = Span(self, name, parent_id, attributes)
+        self.spans.append(span)
+        return span
+
+    def to_otlp(self) -> dict:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": settings.app_name},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [span.to_otlp() for span in self.spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def render_tree(self) -> str:
+        children: Dict[Optional[str], List[Span]] = {}
+        for span in self.spans:
+            children.setdefault(span.parent_id, []).append(span)
+
+        lines = []
+
+        def walk(parent_id: Optional[str], depth: int) -> None:
+            for span in children.get(parent_id, []):
+                detail = span.attributes.get("db.statement", "")
+                lines.append(
+                    f"{'  ' * depth}{span.name} {span.duration_ms:.1f}ms"
+                    + (f" {detail:.120}" if detail else "")
+                )
+                walk(span.span_id, depth + 1)
+
+        walk(self.remote_parent_id, 0)
+        if self.dropped:
+            lines.append(f"... {self.dropped} spans dropped")
+        return "\n".join(lines)
+
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def start_span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """Child span of the active one; a no-op outside a traced request."""
+    parent = current_span.get()
+    span = None
+    if parent is not None:
+        span = parent.trace.new_span(name, parent.span_id, attributes)
+    if span is None:
+        yield None
+        return
+
+    token = current_span.set(span)
+    try:
+        yield span
+    except BaseException as exc:
+        span.record_error(exc)
+        raise
+    finally:
+        span.end()
+        current_span.reset(token)
+
+
+class InMemorySpanExporter:
+    def __init__(self, max_traces: int):
+        self._traces = deque(maxlen=max_traces)
+
+    def export(self, trace: Trace) -> None:
+        self._traces.append(trace.to_otlp())
+
+    def recent(self, limit: int) -> List[dict]:
+        return list(self._traces)[-limit:][::-1]
+
+
+class FileSpanExporter:
+    """One OTLP JSON document per line, readable by an otlpjsonfile receiver."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace) -> None:
+        line = json.dumps(trace.to_otlp(), separators=(",", ":")) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class Tracer:
+    """
+    Records spans for every request but only exports the sampled ones,
+    plus any request slower than the threshold so tail latency is never lost.
+    """
+
+    def __init__(self, sample_rate: float, slow_seconds: float, exporter):
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.exporter = exporter
+
+    def begin(self, traceparent: Optional[str] = None) -> Trace:
+        # W3C trace context: version-traceid-parentid-flags
+        if traceparent:
+            parts = traceparent.strip().split("-")
+            if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+                try:
+                    sampled = bool(int(parts[3], 16) & 1)
+                except ValueError:
+                    sampled = False
+                return Trace(parts[1], sampled, parts[2])
+        return Trace(sampled=random.random() < self.sample_rate)
+
+    def finish(self, trace: Trace, root: Span) -> None:
+        slow = root.duration_ms / 1000 >= self.slow_seconds
+        if slow:
+            logger.warning(
+                "Slow request trace=%s\n%s", trace.trace_id, trace.render_tree()
+            )
+        if trace.sampled or slow:
+            try:
+                self.exporter.export(trace)
+            except OSError:
+                logger.exception("Failed to export trace %s", trace.trace_id)
+
+
+def build_exporter():
+    if settings.tracing_exporter == "file":
+        return FileSpanExporter(settings.tracing_file)
+    return InMemorySpanExporter(settings.tracing_memory_max_traces)
+
+
+tracer = Tracer(
+    sample_rate=settings.tracing_sample_rate,
+    slow_seconds=settings.tracing_slow_request_seconds,
+    exporter=build_exporter(),
+)
+
+
+def traced(name: str, func):
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with start_span(name):
+                return await func(*args, **kwargs)
+
+    else:
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(name):
+                return func(*args, **kwargs)
+
+    wrapper.__traced__ = True
+    return wrapper
+
+
+def _wrap(owner, attr: str, name: str) -> None:
+    raw = inspect.getattr_static(owner, attr)
+    is_static = isinstance(raw, staticmethod)
+    func = raw.__func__ if is_static else raw
+    if getattr(func, "__traced__", False):
+        return
+    wrapper = traced(name, func)
+    setattr(owner, attr, staticmethod(wrapper) if is_static else wrapper)
+
+
+def instrument_class(cls) -> None:
+    """Wrap the public async static methods of a service or repository."""
+    for attr, raw in list(vars(cls).items()):
+        if attr.startswith("_") or not isinstance(raw, staticmethod):
+            continue
+        if inspect.iscoroutinefunction(raw.__func__):
+            _wrap(cls, attr, f"{cls.__name__}.{attr}")
+
+
+def instrument_layers() -> None:
+    # Imported lazily so the observability package never pulls in the domain
+    from app.auth.repository import AuthRepository
+    from app.auth.service import AuthService
+    from app.estimate.repository import EstimateRepository
+    from app.estimate.service import EstimateService
+    from app.merchants.repository import MerchantRepository
+    from app.merchants.service import MerchantService
+    from app.orders.repository import OrderRepository
+    from app.orders.service import OrderService
+
+    for cls in (
+        MerchantService,
+        EstimateService,
+        OrderService,
+        AuthService,
+        MerchantRepository,
+        EstimateRepository,
+        OrderRepository,
+        AuthRepository,
+    ):
+        instrument_class(cls)
+
+    # The route solver is sync but worth seeing. Token checks have spans at
+    # their call sites: callers import decode_access_token by name, so no
+    # single module attribute reaches them all.
+    _wrap(
+        EstimateService,
+        "_nearest_neighbor_route_km",
+        "EstimateService.nearest_neighbor_route",
+    )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = current_span.get()
+    if parent is None:
+        context._trace_span = None
+        return
+    context._trace_span = parent.trace.new_span(
+        "db.query",
+        parent.span_id,
+        {"db.system": "postgresql", "db.statement": statement_shape(statement)},
+    )
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = getattr(context, "_trace_span", None)
+    if span is not None:
+        span.end()
+
+
+def _handle_error(exception_context):
+    context = exception_context.execution_context
+    span = getattr(context, "_trace_span", None)
+    if span is not None:
+        span.record_error(exception_context.original_exception)
+        span.end()
+
+
+def instrument_engine_tracing(engine: AsyncEngine) -> None:
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
@@ -0,0 +1,134 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.invalidation import change_listener
+
+from .schemas import OrderHistoryResponse
+
+CacheKey = Tuple[Hashable, ...]
+CachedPage = List[OrderHistoryResponse]
+# A user's order count and latest created_at, see OrderRepository
+HistoryVersion = Tuple[int, Optional[datetime]]
+
+
+class OrderHistoryCache:
+    """
+    In-process LRU cache of formatted order history pages and their ETags.
+    Only the first `max_pages` pages of each user/filter combination are kept,
+    and the total (serialized) size is bounded by `max_bytes`. Pages carry the
+    version of the user's history they were built from; orders placed through
+    another worker change it, and a page of an older version is not served.
+    """
+
+    def __init__(self, max_pages: int, max_bytes: int):
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self._entries: (
+            "OrderedDict[CacheKey, Tuple[CachedPage, str, HistoryVersion, int]]"
+        ) = OrderedDict()
+        self._keys_by_user: Dict[str, Set[CacheKey]] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def is_cacheable(self, limit: int, offset: int) -> bool:
+        return self.max_pages > 0 and limit > 0 and offset < limit * self.max_pages
+
+    @staticmethod
+    def make_key(
+        user_id: str,
+        merchant_id: Optional[str],
+        name: Optional[str],
+        merchant_category: Optional[str],
+        limit: int,
+        offset: int,
+    ) -> CacheKey:
+        return (user_id, merchant_id, name, merchant_category, limit, offset)
+
+    def get(
+        self, key: CacheKey, version: HistoryVersion
+    ) -> Optional[Tuple[CachedPage, str]]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[2] != version:
+            # Every cached page of this user predates the change
+            self.invalidate_user(key[0])
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0], entry[1]
+
+    def put(
+        self, key: CacheKey, data: CachedPage, etag: str, version: HistoryVersion
+    ) -> None:
+        size = sum(len(page.model_dump_json()) for page in data) + 64
+        if size > self.max_bytes:
+            return
+
+        self._discard(key)
+        self._entries[key] = (data, etag, version, size)
+        self._keys_by_user.setdefault(key[0], set()).add(key)
+        self._bytes += size
+
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.evictions += 1
+
+    def invalidate_user(self, user_id: str) -> None:
+        keys = self._keys_by_user.pop(user_id, None)
+        if not keys:
+            return
+        for key in keys:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[3]
+        self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_user.clear()
+        self._bytes = 0
+        self.invalidations += 1
+
+    def _discard(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry[3]
+        user_keys = self._keys_by_user.get(key[0])
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._keys_by_user[key[0]]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "maxBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+order_history_cache = OrderHistoryCache(
+    max_pages=settings.order_history_cache_pages,
+    max_bytes=settings.order_history_cache_max_bytes,
+)
+
+
+# Cached pages embed merchant and item details, changed through any worker.
+# Item notifications only come for the fields pages show (not price or stock).
+change_listener.register("merchants", lambda ids: order_history_cache.clear())
+change_listener.register("items", lambda ids: order_history_cache.clear())
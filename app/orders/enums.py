@@ -0,0 +1,9 @@
+import enum
+
+
+class OrderIntakeStatusEnum(str, enum.Enum):
+    Pending = "pending"
+    Completed = "completed"
+    Rejected = "rejected"
+
+    __pg_name__ = "order_intake_status_enum"
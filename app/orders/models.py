@@ -4,12 +4,14 @@ import uuid
 from datetime import datetime
 from typing import TYPE_CHECKING, List
 
-from sqlalchemy import DateTime, ForeignKey, Integer, func
+from sqlalchemy import DateTime, Enum, ForeignKey, Index, Integer, String, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
 
+from .enums import OrderIntakeStatusEnum
+
 if TYPE_CHECKING:
     from app.estimate.models import Estimate
     from app.merchants.models import Item
@@ -17,6 +19,9 @@ if TYPE_CHECKING:
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_user_id_created_at", "user_id", text("created_at DESC")),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -50,7 +55,10 @@ class OrderItem(Base):
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
     )
     order_id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), ForeignKey("orders.id", ondelete="CASCADE"), nullable=False
+        UUID(as_uuid=True),
+        ForeignKey("orders.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
     )
     item_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), ForeignKey("items.id", ondelete="CASCADE"), nullable=False
@@ -65,3 +73,41 @@ class OrderItem(Base):
         "Order", back_populates="order_items", lazy="joined"
     )
     item: Mapped["Item"] = relationship("Item", lazy="joined")
+
+
+# orders accepted by the asynchronous intake, materialized later by the worker
+class OrderOutbox(Base):
+    __tablename__ = "order_outbox"
+    __table_args__ = (
+        Index(
+            "ix_order_outbox_pending",
+            "created_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+
+    order_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    estimate_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("estimates.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    status: Mapped[OrderIntakeStatusEnum] = mapped_column(
+        Enum(
+            OrderIntakeStatusEnum,
+            name=OrderIntakeStatusEnum.__pg_name__,
+            values_callable=lambda e: [m.value for m in e],
+        ),
+        nullable=False,
+        default=OrderIntakeStatusEnum.Pending,
+    )
+    error: Mapped[str | None] = mapped_column(String(1024), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    processed_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
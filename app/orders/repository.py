@@ -1,16 +1,19 @@
-from collections.abc import Sequence
-from typing import Optional
+import uuid
+from collections.abc import Iterable, Sequence
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import func, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import raiseload, selectinload
 from sqlalchemy.sql import or_
 
 from app.estimate.models import EstimateItem
 from app.merchants.enums import MerchantCategoryEnum
 from app.merchants.models import Item, Merchant
 
-from .models import Order, OrderItem
+from .enums import OrderIntakeStatusEnum
+from .models import Order, OrderItem, OrderOutbox
 
 
 class OrderRepository:
@@ -59,6 +62,9 @@ class OrderRepository:
                 selectinload(Order.order_items)
                 .selectinload(OrderItem.item)
                 .selectinload(Item.merchant)
+                .raiseload(Merchant.items),
+                # History never reads the estimate, skip its eager loads
+                raiseload(Order.estimate),
             )
             .order_by(Order.created_at.desc())
         )
@@ -90,3 +96,78 @@ class OrderRepository:
         result = await session.execute(stmt)
         orders = result.scalars().unique().all()
         return orders
+
+    @staticmethod
+    async def get_history_version(
+        session: AsyncSession, user_id: str
+    ) -> Tuple[int, Optional[datetime]]:
+        """Order count and latest created_at, off ix_orders_user_id_created_at."""
+        stmt = select(func.count(), func.max(Order.created_at)).where(
+            Order.user_id == user_id
+        )
+        result = await session.execute(stmt)
+        count, latest = result.one()
+        return count, latest
+
+    @staticmethod
+    async def enqueue_order(
+        session: AsyncSession, order_id: uuid.UUID, user_id: str, estimate_id: str
+    ) -> None:
+        session.add(
+            OrderOutbox(order_id=order_id, user_id=user_id, estimate_id=estimate_id)
+        )
+
+    @staticmethod
+    async def claim_pending_outbox(
+        session: AsyncSession, limit: int
+    ) -> Sequence[OrderOutbox]:
+        # SKIP LOCKED lets several workers drain the outbox without blocking
+        stmt = (
+            select(OrderOutbox)
+            .where(OrderOutbox.status == OrderIntakeStatusEnum.Pending)
+            .order_by(OrderOutbox.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await session.execute(stmt)
+        return result.scalars().all()
+
+    @staticmethod
+    async def bulk_insert_orders(session: AsyncSession, rows: List[Dict]) -> None:
+        await session.execute(insert(Order), rows)
+
+    @staticmethod
+    async def bulk_insert_order_items(session: AsyncSession, rows: List[Dict]) -> None:
+        await session.execute(insert(OrderItem), rows)
+
+    @staticmethod
+    async def mark_outbox(
+        session: AsyncSession,
+        order_ids: Iterable[uuid.UUID],
+        status: OrderIntakeStatusEnum,
+        error: Optional[str] = None,
+    ) -> None:
+        stmt = (
+            update(OrderOutbox)
+            .where(OrderOutbox.order_id.in_(list(order_ids)))
+            .values(status=status, error=error, processed_at=func.now())
+        )
+        await session.execute(stmt)
+
+    @staticmethod
+    async def get_outbox_entry(
+        session: AsyncSession, order_id: str, user_id: str
+    ) -> OrderOutbox | None:
+        stmt = select(OrderOutbox).where(
+            OrderOutbox.order_id == order_id, OrderOutbox.user_id == user_id
+        )
+        result = await session.execute(stmt)
+        return result.scalars().first()
+
+    @staticmethod
+    async def order_exists_for_user(
+        session: AsyncSession, order_id: str, user_id: str
+    ) -> bool:
+        stmt = select(Order.id).where(Order.id == order_id, Order.user_id == user_id)
+        result = await session.execute(stmt)
+        return result.scalar_one_or_none() is not None
@@ -1,9 +1,11 @@
-from typing import List
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
 from app.merchants.schemas import MerchantResponse
 
+from .enums import OrderIntakeStatusEnum
+
 
 class PlaceOrderRequest(BaseModel):
     calculatedEstimateId: str = Field(...)
@@ -16,3 +18,9 @@ class PlaceOrderResponse(BaseModel):
 class OrderHistoryResponse(BaseModel):
     orderId: str
     orders: List[MerchantResponse]
+
+
+class OrderStatusResponse(BaseModel):
+    orderId: str
+    status: OrderIntakeStatusEnum
+    detail: Optional[str] = None
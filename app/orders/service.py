@@ -1,11 +1,13 @@
 from collections.abc import Sequence
-from typing import Optional
-from uuid import UUID
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
 
 from fastapi import HTTPException, status
 from pydantic import HttpUrl
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.auth.schemas import CurrentUser
+from app.conditional import check_not_modified, make_etag
 from app.estimate.repository import EstimateRepository
 from app.merchants.enums import MerchantCategoryEnum
 from app.merchants.repository import MerchantRepository
@@ -15,17 +17,18 @@ from app.merchants.schemas import (
     LocationSchema,
     MerchantResponse,
 )
-from app.users.models import User
 
+from .cache import order_history_cache
+from .enums import OrderIntakeStatusEnum
 from .models import Order
 from .repository import OrderRepository
-from .schemas import OrderHistoryResponse
+from .schemas import OrderHistoryResponse, OrderStatusResponse
 
 
 class OrderService:
     @staticmethod
     async def place_order_from_estimate(
-        session: AsyncSession, estimate_id: str, user: User
+        session: AsyncSession, estimate_id: str, user: CurrentUser
     ) -> str:
         # Check estimate id exist or not
         estimate = await EstimateRepository.get_estimate_with_items(
@@ -37,51 +40,249 @@ class OrderService:
                 detail="Estimate id not found",
             )
 
+        # Reserve stock for every estimated item in one statement
+        requested = {}
+        for ei in estimate.items:
+            requested[ei.item_id] = requested.get(ei.item_id, 0) + ei.quantity
+        failed_items = await MerchantRepository.reserve_item_stock(session, requested)
+        if failed_items:
+            await session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Insufficient stock for items: {', '.join(failed_items)}",
+            )
+
         order_id = await OrderRepository.create_order_from_estimate(
             session, str(user.id), str(estimate.id)
         )
         await session.commit()
+        order_history_cache.invalidate_user(str(user.id))
         return order_id
 
+    @staticmethod
+    async def enqueue_order_from_estimate(
+        session: AsyncSession, estimate_id: str, user: CurrentUser
+    ) -> str:
+        # Only validate here, the order itself is materialized by the outbox worker
+        try:
+            UUID(estimate_id)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Estimate id not found",
+            )
+        if not await EstimateRepository.estimate_exists(session, estimate_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Estimate id not found",
+            )
+
+        order_id = uuid4()
+        await OrderRepository.enqueue_order(
+            session, order_id, str(user.id), estimate_id
+        )
+        await session.commit()
+        return str(order_id)
+
+    @staticmethod
+    async def get_order_status(
+        session: AsyncSession, order_id: str, user: CurrentUser
+    ) -> OrderStatusResponse:
+        try:
+            UUID(order_id)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Order not found"
+            )
+
+        entry = await OrderRepository.get_outbox_entry(session, order_id, str(user.id))
+        if entry:
+            return OrderStatusResponse(
+                orderId=order_id, status=entry.status, detail=entry.error
+            )
+
+        # Orders placed synchronously never go through the outbox
+        if await OrderRepository.order_exists_for_user(session, order_id, str(user.id)):
+            return OrderStatusResponse(
+                orderId=order_id, status=OrderIntakeStatusEnum.Completed
+            )
+
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Order not found"
+        )
+
+    @staticmethod
+    async def process_outbox_batch(session: AsyncSession, limit: int) -> int:
+        """
+        Materialize up to `limit` pending outbox entries into orders/order_items.
+        Claimed rows stay locked until commit, so a crash simply leaves them pending.
+        Returns the number of outbox entries handled.
+        """
+        entries = await OrderRepository.claim_pending_outbox(session, limit)
+        if not entries:
+            return 0
+
+        rows_by_estimate = await EstimateRepository.get_item_rows_for_estimates(
+            session, list({e.estimate_id for e in entries})
+        )
+
+        # Lock every item of the batch up front, in id order
+        await MerchantRepository.lock_items(
+            session,
+            {row.item_id for rows in rows_by_estimate.values() for row in rows},
+        )
+
+        order_rows = []
+        order_item_rows = []
+        users = set()
+        completed = []
+        rejected: Dict[str, list] = {}
+        for entry in entries:
+            est_rows = rows_by_estimate.get(entry.estimate_id, [])
+            requested: Dict[UUID, int] = {}
+            for row in est_rows:
+                requested[row.item_id] = requested.get(row.item_id, 0) + row.quantity
+
+            savepoint = await session.begin_nested()
+            failed_items = await MerchantRepository.reserve_item_stock(
+                session, requested
+            )
+            if failed_items:
+                await savepoint.rollback()
+                detail = f"Insufficient stock for items: {', '.join(failed_items)}"
+                rejected.setdefault(detail, []).append(entry.order_id)
+                continue
+            await savepoint.commit()
+
+            completed.append(entry.order_id)
+            users.add(str(entry.user_id))
+            order_rows.append(
+                {
+                    "id": entry.order_id,
+                    "user_id": entry.user_id,
+                    "estimate_id": entry.estimate_id,
+                }
+            )
+            for row in est_rows:
+                order_item_rows.append(
+                    {
+                        "order_id": entry.order_id,
+                        "item_id": row.item_id,
+                        "quantity": row.quantity,
+                        "price": row.unit_price,
+                    }
+                )
+
+        if order_rows:
+            await OrderRepository.bulk_insert_orders(session, order_rows)
+        if order_item_rows:
+            await OrderRepository.bulk_insert_order_items(session, order_item_rows)
+        if completed:
+            await OrderRepository.mark_outbox(
+                session, completed, OrderIntakeStatusEnum.Completed
+            )
+        for detail, order_ids in rejected.items():
+            await OrderRepository.mark_outbox(
+                session, order_ids, OrderIntakeStatusEnum.Rejected, detail
+            )
+        await session.commit()
+        for user_id in users:
+            order_history_cache.invalidate_user(user_id)
+        return len(entries)
+
     @staticmethod
     async def list_user_orders(
         session: AsyncSession,
-        user: User,
+        user: CurrentUser,
         merchantId: Optional[str] = None,
         name: Optional[str] = None,
         merchantCategory: Optional[MerchantCategoryEnum] = None,
         limit: int = 5,
         offset: int = 0,
-    ):
+        if_none_match: Optional[str] = None,
+    ) -> Tuple[List[OrderHistoryResponse], str]:
+        cache_key = None
+        if order_history_cache.is_cacheable(limit, offset):
+            cache_key = order_history_cache.make_key(
+                str(user.id),
+                merchantId,
+                name,
+                merchantCategory.value if merchantCategory else None,
+                limit,
+                offset,
+            )
+            # One index lookup; taken before the page is read, so an order
+            # placed in between leaves the cached page outdated, not wrong
+            version = await OrderRepository.get_history_version(
+                session, str(user.id)
+            )
+            cached = order_history_cache.get(cache_key, version)
+            if cached is not None:
+                data, etag = cached
+                check_not_modified(if_none_match, etag)
+                return data, etag
+
+        valid = True
         if merchantId:
             # Validate UUID format
             try:
                 UUID(merchantId)
             except ValueError:
-                return []
+                valid = False
 
-            m = await MerchantRepository.get_merchant_by_id(session, merchantId)
             # Validate merchantId
-            if not m:
-                return []
+            if valid and not await MerchantRepository.get_merchant_by_id(
+                session, merchantId
+            ):
+                valid = False
 
             # Validate category
             if (
                 merchantCategory
                 and merchantCategory not in MerchantCategoryEnum.__members__
             ):
-                return []
+                valid = False
 
         # Fetch orders
-        orders: Sequence[Order] = await OrderRepository.fetch_orders_for_user(
-            session=session,
-            user_id=str(user.id),
-            merchant_id=merchantId,
-            name=name,
-            merchant_category=merchantCategory,
-            limit=limit,
-            offset=offset,
+        orders: Sequence[Order] = []
+        if valid:
+            orders = await OrderRepository.fetch_orders_for_user(
+                session=session,
+                user_id=str(user.id),
+                merchant_id=merchantId,
+                name=name,
+                merchant_category=merchantCategory,
+                limit=limit,
+                offset=offset,
+            )
+
+        # Orders are immutable; the items and merchants they show are not.
+        # Items by the fields shown rather than xmin, which every stock
+        # reservation moves; price and quantity come from the order itself.
+        identity = []
+        for ord in orders:
+            identity.append(ord.id)
+            for oi in ord.order_items:
+                item = oi.item
+                # Partitioned catalogs keep no foreign key on item_id; should an
+                # item go missing anyway, leave it out rather than fail the page
+                if item is None:
+                    continue
+                identity.extend(
+                    (
+                        oi.id,
+                        item.id,
+                        item.name,
+                        item.product_category.value,
+                        item.image_url,
+                        item.merchant.id,
+                        item.merchant.xmin,
+                    )
+                )
+        etag = make_etag(
+            (user.id, merchantId, name, merchantCategory, limit, offset), identity
         )
+        check_not_modified(if_none_match, etag)
 
         pattern_lower = name.casefold() if name else None
 
@@ -92,6 +293,8 @@ class OrderService:
             merchant_map = {}  # merchant_id -> {"merchant":..., "items":[...]}
             for oi in ord.order_items:
                 item = oi.item
+                if item is None:
+                    continue
                 merchant = item.merchant
 
                 # Filter by merchantId
@@ -144,4 +347,6 @@ class OrderService:
                 OrderHistoryResponse(orderId=str(ord.id), orders=merchant_entries)
             )
 
-        return data
+        if cache_key is not None:
+            order_history_cache.put(cache_key, data, etag, version)
+        return data, etag
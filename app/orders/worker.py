@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.database import asyncSessionLocal
+
+from .service import OrderService
+
+logger = logging.getLogger(__name__)
+
+
+class OrderOutboxWorker:
+    """
+    Background task that turns pending `order_outbox` rows into orders.
+    The outbox table is the source of truth, so entries accepted before a
+    restart are picked up again on the next boot.
+    """
+
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker[AsyncSession],
+        batch_size: int,
+        poll_interval: float,
+    ):
+        self._sessionmaker = sessionmaker
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def notify(self) -> None:
+        """Wake the worker up right away instead of waiting for the next poll."""
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="order-outbox-worker")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def drain_once(self) -> int:
+        async with self._sessionmaker() as session:
+            return await OrderService.process_outbox_batch(session, self._batch_size)
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                processed = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Order outbox batch failed, retrying")
+                processed = 0
+
+            # A full batch means there is probably more work queued up
+            if processed >= self._batch_size:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+outbox_worker = OrderOutboxWorker(
+    asyncSessionLocal,
+    batch_size=settings.order_outbox_batch_size,
+    poll_interval=settings.order_outbox_poll_interval_seconds,
+)
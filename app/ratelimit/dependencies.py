@@ -0,0 +1,88 @@
+from fastapi import Depends, Request
+
+from app.auth.dependencies import get_current_user
+from app.auth.schemas import CurrentUser
+from app.config import settings
+
+from .limiter import ConcurrencyLimiter, TokenBucketLimiter
+
+login_ip_limiter = TokenBucketLimiter(
+    settings.login_rate_per_ip_per_minute,
+    settings.login_burst_per_ip,
+    settings.rate_limit_cleanup_interval_seconds,
+)
+login_user_limiter = TokenBucketLimiter(
+    settings.login_rate_per_user_per_minute,
+    settings.login_burst_per_user,
+    settings.rate_limit_cleanup_interval_seconds,
+)
+estimate_ip_limiter = TokenBucketLimiter(
+    settings.estimate_rate_per_ip_per_minute,
+    settings.estimate_burst_per_ip,
+    settings.rate_limit_cleanup_interval_seconds,
+)
+estimate_user_limiter = TokenBucketLimiter(
+    settings.estimate_rate_per_user_per_minute,
+    settings.estimate_burst_per_user,
+    settings.rate_limit_cleanup_interval_seconds,
+)
+
+login_concurrency = ConcurrencyLimiter(
+    settings.login_max_concurrent,
+    settings.login_max_waiting,
+    settings.concurrency_wait_timeout_seconds,
+)
+estimate_concurrency = ConcurrencyLimiter(
+    settings.estimate_max_concurrent,
+    settings.estimate_max_waiting,
+    settings.concurrency_wait_timeout_seconds,
+)
+
+
+def client_ip(request: Request) -> str:
+    if settings.trust_forwarded_for:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",", 1)[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def check_login_user_rate(username: str) -> None:
+    # Called from the route, the username is only known once the body is parsed
+    if settings.rate_limit_enabled:
+        login_user_limiter.check(username)
+
+
+async def limit_login_rate(request: Request):
+    if settings.rate_limit_enabled:
+        login_ip_limiter.check(client_ip(request))
+
+
+async def limit_estimate_rate(
+    request: Request, user: CurrentUser = Depends(get_current_user)
+):
+    if settings.rate_limit_enabled:
+        estimate_ip_limiter.check(client_ip(request))
+        estimate_user_limiter.check(str(user.id))
+
+
+async def login_slot():
+    if not login_concurrency.enabled:
+        yield
+        return
+    await login_concurrency.acquire()
+    try:
+        yield
+    finally:
+        login_concurrency.release()
+
+
+async def estimate_slot():
+    if not estimate_concurrency.enabled:
+        yield
+        return
+    await estimate_concurrency.acquire()
+    try:
+        yield
+    finally:
+        estimate_concurrency.release()
@@ -0,0 +1,126 @@
+import asyncio
+import math
+import time
+from typing import Dict, List
+
+from fastapi import HTTPException, status
+
+
+class TokenBucketLimiter:
+    """
+    Per-key token buckets kept in a plain dict. Buckets that have been idle long
+    enough to refill completely carry no state worth keeping, so they are
+    dropped by a periodic sweep.
+    """
+
+    def __init__(
+        self, rate_per_minute: float, burst: int, cleanup_interval: float = 60.0
+    ):
+        self.rate = rate_per_minute / 60.0
+        self.burst = float(burst)
+        self.cleanup_interval = cleanup_interval
+        self._buckets: Dict[str, List[float]] = {}  # key -> [tokens, last_refill]
+        self._next_cleanup = time.monotonic() + cleanup_interval
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 and self.burst > 0
+
+    def acquire(self, key: str) -> float:
+        """Take one token; returns 0 when allowed, else seconds until a retry can succeed."""
+        now = time.monotonic()
+        if now >= self._next_cleanup:
+            self._cleanup(now)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._buckets[key] = [self.burst - 1.0, now]
+            return 0.0
+
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens >= 1.0:
+            bucket[0] = tokens - 1.0
+            return 0.0
+
+        bucket[0] = tokens
+        self.rejected += 1
+        return (1.0 - tokens) / self.rate
+
+    def _cleanup(self, now: float) -> None:
+        full_after = self.burst / self.rate
+        self._buckets = {
+            key: bucket
+            for key, bucket in self._buckets.items()
+            if now - bucket[1] < full_after
+        }
+        self._next_cleanup = now + self.cleanup_interval
+
+    def check(self, key: str) -> None:
+        if not self.enabled:
+            return
+        retry_after = self.acquire(key)
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+    def stats(self) -> dict:
+        return {"buckets": len(self._buckets), "rejected": self.rejected}
+
+
+class ConcurrencyLimiter:
+    """
+    Caps in-flight requests for a route. A bounded number of requests may wait
+    briefly for a slot; anything beyond that is turned away with 503 at once.
+    """
+
+    def __init__(self, max_concurrent: int, max_waiting: int, wait_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self._semaphore = asyncio.Semaphore(max(max_concurrent, 1))
+        self._waiting = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrent > 0
+
+    def _reject(self) -> HTTPException:
+        self.rejected += 1
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+
+    async def acquire(self) -> None:
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return
+        if self._waiting >= self.max_waiting:
+            raise self._reject()
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.wait_timeout)
+        except asyncio.TimeoutError:
+            raise self._reject()
+        finally:
+            self._waiting -= 1
+
+    def release(self) -> None:
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        in_flight = self.max_concurrent - self._semaphore._value
+        return {
+            "maxConcurrent": self.max_concurrent,
+            "inFlight": max(in_flight, 0),
+            "waiting": self._waiting,
+            "rejected": self.rejected,
+        }
@@ -4,17 +4,16 @@ import uuid
 from dotenv import load_dotenv
 from geoalchemy2 import WKTElement
 from sqlalchemy import text
-from passlib.context import CryptContext
 
+from app.auth.hashing import password_hasher
 from app.database import asyncSessionLocal
 from app.merchants.enums import MerchantCategoryEnum
 from app.merchants.models import Item, Merchant
+from app.merchants.regions import region_of
 from app.users.models import User
 
 load_dotenv()
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
-
 # ===========================
 # USERS
 # ===========================
@@ -241,7 +240,7 @@ async def seed():
 
         # Insert users
         for u in USERS:
-            hashed_pw = pwd_context.hash(u["password"])
+            hashed_pw = password_hasher.hash(u["password"])
             user = User(
                 id=uuid.UUID(u["id"]),
                 username=u["username"],
@@ -265,12 +264,14 @@ async def seed():
             session.add(m)
         await session.commit()
 
-        # Insert items
+        # Insert items, in their merchant's region
+        regions = {id: region_of(lat, lon) for id, _, _, _, lat, lon in MERCHANTS}
         for mid, arr in ITEMS.items():
             for name, pc_enum, price, image_url in arr:
                 it = Item(
                     id=uuid.uuid4(),
                     merchant_id=uuid.UUID(mid),
+                    region=regions[mid],
                     name=name,
                     product_category=pc_enum,
                     price=price,
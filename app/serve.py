@@ -0,0 +1,285 @@
+"""
+Pre-forking production server.
+
+The master imports the application once, runs migrations, binds the listening
+socket and forks SERVE_WORKERS uvicorn workers that share both. Each worker
+drops the connections it inherited, reloads the signing keys, warms its own
+DB pool and then serves.
+
+    python -m app.serve --workers 4
+
+SIGTERM/SIGINT drain every worker (in-flight requests finish, up to
+SERVE_GRACEFUL_TIMEOUT_SECONDS) and exit. SIGHUP replaces workers one at a
+time, and workers that die or hit SERVE_MAX_REQUESTS are replaced as well.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Set
+
+from app.config import settings
+
+logger = logging.getLogger("app.serve")
+
+# Workers that die this soon after starting count as crashing
+MIN_WORKER_UPTIME_SECONDS = 5.0
+MAX_RESPAWN_BACKOFF_SECONDS = 30.0
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload() -> None:
+    """Import everything once in the master so workers share the pages."""
+    import app.main  # noqa: F401
+    from app.auth.hashing import password_hasher
+
+    # argon2 is loaded lazily, pull it in before forking
+    password_hasher.hasher
+
+
+def warm_up_auth() -> None:
+    from jose import jwt
+
+    from app.auth import utils
+
+    try:
+        # Re-read the keyset: workers replaced on SIGHUP pick up rotated keys
+        # without restarting the master
+        utils.reload_signing_keys()
+    except (OSError, ValueError, KeyError):
+        logger.exception("Worker %s kept the master's signing keys", os.getpid())
+    # One sign/verify round trip pays jose's first-use costs before a request
+    # does; straight through jwt, so the token cache and its stats stay empty
+    token = utils.create_access_token("warm-up", expires_minutes=1)
+    jwt.decode(token, utils.signing_keys.active_key, algorithms=[utils.ALGORITHM])
+
+
+async def warm_up() -> None:
+    from sqlalchemy import text
+
+    from app.database import engine, read_engine
+
+    async def open_connection(target):
+        async with target.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    count = min(settings.serve_warmup_connections, settings.db_pool_size)
+    engines = [engine] if read_engine is engine else [engine, read_engine]
+    started = time.perf_counter()
+    try:
+        # Held concurrently so the pool really opens `count` connections
+        await asyncio.gather(
+            *(open_connection(target) for target in engines for _ in range(count))
+        )
+    except Exception:
+        # The pool will connect on demand; do not keep the worker from serving
+        logger.exception("Worker %s could not warm its DB pool", os.getpid())
+        return
+    logger.info(
+        "Worker %s opened %d DB connections in %.0fms",
+        os.getpid(),
+        count * len(engines),
+        (time.perf_counter() - started) * 1000,
+    )
+
+
+def run_worker(sock: socket.socket) -> None:
+    import uvicorn
+
+    from app.database import engine, read_engine
+    from app.main import app
+
+    # Connections opened before the fork belong to the master
+    engine.sync_engine.dispose(close=False)
+    if read_engine is not engine:
+        read_engine.sync_engine.dispose(close=False)
+
+    # Own process group, so a terminal Ctrl+C reaches only the master, which
+    # then drains workers with a single SIGTERM (a second one forces exit)
+    os.setpgid(0, 0)
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(sig, signal.SIG_DFL)
+
+    config = uvicorn.Config(
+        app,
+        backlog=settings.serve_backlog,
+        timeout_keep_alive=settings.serve_keepalive_seconds,
+        timeout_graceful_shutdown=settings.serve_graceful_timeout_seconds,
+        limit_concurrency=settings.serve_limit_concurrency,
+        limit_max_requests=settings.serve_max_requests,
+        limit_max_requests_jitter=settings.serve_max_requests_jitter,
+        access_log=settings.serve_access_log,
+        log_level="debug" if settings.debug else "info",
+        proxy_headers=settings.trust_forwarded_for,
+    )
+    server = uvicorn.Server(config)
+
+    async def serve():
+        # The auth user, token and order history caches are keyed by user or
+        # token and fill from traffic; there is nothing to load ahead of it
+        warm_up_auth()
+        await warm_up()
+        await server.serve(sockets=[sock])
+
+    asyncio.run(serve())
+
+
+class Master:
+    def __init__(self, sock: socket.socket, workers: int):
+        self.sock = sock
+        self.workers = workers
+        self.children: Dict[int, float] = {}
+        self.retiring: Set[int] = set()
+        self.stopping = False
+        self.reload_requested = False
+        self.crashes = 0
+
+    def spawn(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                run_worker(self.sock)
+            except BaseException:
+                logger.exception("Worker %s failed", os.getpid())
+                status = 1
+            finally:
+                os._exit(status)
+        self.children[pid] = time.monotonic()
+        return pid
+
+    def reap(self) -> List[int]:
+        exited = []
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            started = self.children.pop(pid, None)
+            if started is None:
+                continue
+            exited.append(pid)
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+            elif not self.stopping:
+                code = os.waitstatus_to_exitcode(status)
+                if time.monotonic() - started < MIN_WORKER_UPTIME_SECONDS:
+                    self.crashes += 1
+                else:
+                    self.crashes = 0
+                logger.warning("Worker %s exited with %s, replacing it", pid, code)
+        return exited
+
+    def stop(self, *_) -> None:
+        self.stopping = True
+
+    def request_reload(self, *_) -> None:
+        self.reload_requested = True
+
+    def rolling_restart(self) -> None:
+        logger.info("Replacing %d workers", len(self.children))
+        for old in list(self.children):
+            if self.stopping:
+                return
+            self.spawn()
+            self.retiring.add(old)
+            os.kill(old, signal.SIGTERM)
+            deadline = time.monotonic() + settings.serve_graceful_timeout_seconds + 5
+            while old in self.children and time.monotonic() < deadline:
+                self.reap()
+                time.sleep(0.1)
+
+    def shutdown(self) -> None:
+        logger.info("Draining %d workers", len(self.children))
+        for pid in self.children:
+            os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + settings.serve_graceful_timeout_seconds + 5
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in self.children:
+            logger.warning("Worker %s did not drain in time, killing it", pid)
+            os.kill(pid, signal.SIGKILL)
+        while self.children:
+            pid, _ = os.waitpid(-1, 0)
+            self.children.pop(pid, None)
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGHUP, self.request_reload)
+
+        for _ in range(self.workers):
+            self.spawn()
+        logger.info(
+            "Serving on %s with %d workers (master %s)",
+            self.sock.getsockname(),
+            self.workers,
+            os.getpid(),
+        )
+
+        while not self.stopping:
+            self.reap()
+            if self.reload_requested:
+                self.reload_requested = False
+                self.rolling_restart()
+                continue
+            missing = self.workers - len(self.children)
+            if missing > 0 and not self.stopping:
+                if self.crashes:
+                    time.sleep(min(2**self.crashes, MAX_RESPAWN_BACKOFF_SECONDS))
+                for _ in range(missing):
+                    self.spawn()
+            time.sleep(0.2)
+
+        self.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the API with N workers.")
+    parser.add_argument("--host", default=settings.serve_host)
+    parser.add_argument("--port", type=int, default=settings.serve_port)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.serve_workers,
+        help="Worker processes, 0 means one per CPU",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(process)d %(levelname)s %(message)s"
+    )
+    workers = args.workers or os.cpu_count() or 1
+
+    if settings.run_migrations_on_startup:
+        from app.migrations import run_migrations
+
+        run_migrations()
+        # Done once here, not again in every worker's lifespan
+        settings.run_migrations_on_startup = False
+
+    preload()
+    sock = bind_socket(args.host, args.port, settings.serve_backlog)
+    Master(sock, workers).run()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,38 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, Header, Path, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.dependencies import get_current_user
-from app.dependencies import get_session
+from app.config import settings
+from app.database import primary_pins
+from app.dependencies import get_read_session, get_session
 from app.estimate.schemas import EstimateRequest, EstimateResponse
 from app.estimate.service import EstimateService
 from app.merchants.enums import MerchantCategoryEnum
+from app.observability.dependencies import query_budget
 from app.orders.schemas import (
     OrderHistoryResponse,
+    OrderStatusResponse,
     PlaceOrderRequest,
     PlaceOrderResponse,
 )
 from app.orders.service import OrderService
+from app.orders.worker import outbox_worker
+from app.ratelimit.dependencies import estimate_slot, limit_estimate_rate
 
 router = APIRouter(prefix="/api/v1", tags=["users"])
 
 
 @router.post(
-    "/users/estimate", response_model=EstimateResponse, status_code=status.HTTP_200_OK
+    "/users/estimate",
+    response_model=EstimateResponse,
+    status_code=status.HTTP_200_OK,
+    dependencies=[
+        Depends(limit_estimate_rate),
+        Depends(estimate_slot),
+        Depends(query_budget(5)),
+    ],
 )
 async def post_users_estimate(
     body: EstimateRequest,
@@ -33,15 +46,29 @@ async def post_users_estimate(
     "/users/orders",
     response_model=PlaceOrderResponse,
     status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_202_ACCEPTED: {"model": PlaceOrderResponse}},
+    dependencies=[Depends(query_budget(7))],
 )
 async def place_order(
     body: PlaceOrderRequest,
+    response: Response,
     session: AsyncSession = Depends(get_session),
     user=Depends(get_current_user),
 ):
+    if settings.order_intake_async:
+        order_id = await OrderService.enqueue_order_from_estimate(
+            session, body.calculatedEstimateId, user
+        )
+        outbox_worker.notify()
+        primary_pins.pin(str(user.id))
+        response.status_code = status.HTTP_202_ACCEPTED
+        return PlaceOrderResponse(orderId=order_id)
+
     order_id = await OrderService.place_order_from_estimate(
         session, body.calculatedEstimateId, user
     )
+    # Keep this user's history reads on the primary until the replica catches up
+    primary_pins.pin(str(user.id))
     return PlaceOrderResponse(orderId=order_id)
 
 
@@ -49,17 +76,22 @@ async def place_order(
     "/users/orders",
     response_model=List[OrderHistoryResponse],
     status_code=status.HTTP_200_OK,
+    # User, history version, merchant check, then orders, their order items,
+    # items and merchants; a cached page stops after the version
+    dependencies=[Depends(query_budget(7))],
 )
 async def get_user_orders(
+    response: Response,
     merchantId: Optional[str] = Query(None),
     limit: int = Query(5, ge=0),
     offset: int = Query(0, ge=0),
     name: Optional[str] = Query(None),
     merchantCategory: Optional[MerchantCategoryEnum] = Query(None),
-    session: AsyncSession = Depends(get_session),
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_read_session),
     user=Depends(get_current_user),
 ):
-    results = await OrderService.list_user_orders(
+    results, etag = await OrderService.list_user_orders(
         session=session,
         user=user,
         merchantId=merchantId,
@@ -67,5 +99,21 @@ async def get_user_orders(
         merchantCategory=merchantCategory,
         limit=limit,
         offset=offset,
+        if_none_match=if_none_match,
     )
+    response.headers["ETag"] = etag
     return results
+
+
+@router.get(
+    "/users/orders/{orderId}/status",
+    response_model=OrderStatusResponse,
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(3))],
+)
+async def get_order_status(
+    orderId: str = Path(...),
+    session: AsyncSession = Depends(get_read_session),
+    user=Depends(get_current_user),
+):
+    return await OrderService.get_order_status(session, orderId, user)
@@ -0,0 +1,61 @@
+"""
+Per-request authentication overhead with and without the token cache.
+
+Measures decode_access_token on a warm token (the common case: one app
+session sending the same bearer token over and over) and the full
+get_current_user dependency in trusted-claims mode, which is pure CPU.
+
+    python -m bench.auth_overhead --iterations 20000
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.auth.dependencies import get_current_user
+from app.auth.utils import create_access_token, decode_access_token, token_cache
+from app.config import settings
+
+
+def per_call_us(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def run(iterations: int) -> None:
+    token = create_access_token(str(uuid.uuid4()), claims={"username": "bench"})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    settings.auth_trust_token_claims = True
+    loop = asyncio.new_event_loop()
+
+    def dependency():
+        loop.run_until_complete(get_current_user(credentials, None))
+
+    results = {}
+    for label, max_entries in (("uncached", 0), ("cached", token_cache.max_entries)):
+        token_cache.max_entries = max_entries
+        token_cache.clear()
+        decode_access_token(token)  # warm up
+        results[label] = (
+            per_call_us(lambda: decode_access_token(token), iterations),
+            per_call_us(dependency, iterations),
+        )
+    loop.close()
+
+    print(f"{'mode':<10}{'decode (us)':>14}{'get_current_user (us)':>24}")
+    for label, (decode_us, dep_us) in results.items():
+        print(f"{label:<10}{decode_us:>14.2f}{dep_us:>24.2f}")
+    speedup = results["uncached"][0] / results["cached"][0]
+    print(f"decode speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+    run(args.iterations)
@@ -0,0 +1,143 @@
+"""
+Bytes on the wire and CPU cost of response compression and 304s.
+
+Builds nearby pages from `app.datagen` merchants, serializes them the way the
+route does and reports, per page size and codec, the encoded size and the
+time to compress one response. The last columns compare a full 200 (ETag,
+serialization, compression) with a 304 revalidation (ETag only).
+
+    python -m bench.compression --limits 5 20 100
+"""
+
+import argparse
+import gzip
+import time
+from datetime import datetime, timezone
+
+from pydantic import HttpUrl
+
+from app.conditional import make_etag
+from app.datagen import DEFAULT_CITIES, Params, _hotspots, merchant_rows
+from app.merchants.schemas import (
+    DetailMerchantResponse,
+    ItemResponse,
+    LocationSchema,
+    MerchantResponse,
+    NearbyResponse,
+)
+
+
+def nearby_page(limit: int, seed: int):
+    params = Params(
+        seed=seed,
+        cities=DEFAULT_CITIES,
+        merchants=limit,
+        users=0,
+        estimates=0,
+        items_min=3,
+        items_max=12,
+        password_hash="",
+        anchor=datetime(2025, 1, 1, tzinfo=timezone.utc),
+    )
+    hotspots = [_hotspots(seed, city) for city in DEFAULT_CITIES]
+    return [merchant_rows(params, i, hotspots) for i in range(limit)]
+
+
+def serialize(rows, limit: int) -> bytes:
+    data = [
+        MerchantResponse(
+            merchant=DetailMerchantResponse(
+                merchantId=str(m[0]),
+                name=m[1],
+                merchantCategory=m[2],
+                imageUrl=HttpUrl(m[3]),
+                location=LocationSchema(lat=m[4], long=m[5]),
+                createdAt=m[7],
+            ),
+            items=[
+                ItemResponse(
+                    itemId=str(i[0]),
+                    name=i[2],
+                    productCategory=i[3],
+                    imageUrl=HttpUrl(i[6]),
+                    price=i[4],
+                    quantity=i[5],
+                    createdAt=i[7],
+                )
+                for i in items
+            ],
+        )
+        for m, items in rows
+    ]
+    page = NearbyResponse(
+        data=data, meta={"limit": limit, "offset": 0, "total": len(data)}
+    )
+    return page.model_dump_json().encode()
+
+
+def identity(rows):
+    # Stand-in xmin values; the cost is the same as with real ones
+    parts = []
+    for m, items in rows:
+        parts.extend((m[0], 1))
+        parts.extend(v for i in items for v in (i[0], 1))
+    return parts
+
+
+def per_call_us(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def codecs():
+    found = [
+        (f"gzip-{level}", lambda b, level=level: gzip.compress(b, level, mtime=0))
+        for level in (1, 6, 9)
+    ]
+    try:
+        import brotli
+    except ImportError:
+        print("brotli not installed, skipping br")
+        return found
+    return found + [
+        (f"br-{quality}", lambda b, q=quality: brotli.compress(b, quality=q))
+        for quality in (1, 4, 11)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--limits", type=int, nargs="+", default=[5, 20, 100])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    available = codecs()
+    print(
+        f"{'limit':>6} {'codec':>8} {'bytes':>9} {'ratio':>6} {'us':>9} "
+        f"{'200 us':>9} {'304 us':>8}"
+    )
+    for limit in args.limits:
+        rows = nearby_page(limit, args.seed)
+        body = serialize(rows, limit)
+        parts = identity(rows)
+        etag_us = per_call_us(lambda: make_etag((limit, 0), parts), args.iterations)
+        serialize_us = per_call_us(lambda: serialize(rows, limit), args.iterations)
+        print(
+            f"{limit:>6} {'none':>8} {len(body):>9} {1:>6.2f} {0:>9.1f} "
+            f"{etag_us + serialize_us:>9.1f} {etag_us:>8.1f}"
+        )
+        for name, fn in available:
+            encoded = fn(body)
+            compress_us = per_call_us(lambda: fn(body), args.iterations)
+            print(
+                f"{limit:>6} {name:>8} {len(encoded):>9} "
+                f"{len(body) / len(encoded):>6.2f} {compress_us:>9.1f} "
+                f"{etag_us + serialize_us + compress_us:>9.1f} {etag_us:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
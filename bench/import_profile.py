@@ -0,0 +1,81 @@
+"""
+Import-time profile of the application, built on `python -X importtime`.
+
+Reports the total import cost of a module, the heaviest top-level packages
+(by self time) and the slowest application modules (cumulative). Exits with
+status 1 when the median total exceeds --budget-ms, so CI can gate on it.
+
+    python -m bench.import_profile --module app.main --budget-ms 1500
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import List, Tuple
+
+Entry = Tuple[str, int, int]  # module, self_us, cumulative_us
+
+
+def profile(module: str) -> List[Entry]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def report(entries: List[Entry], module: str, top: int) -> int:
+    total_us = next(cum for name, _, cum in entries if name == module)
+
+    by_package = defaultdict(int)
+    for name, self_us, _ in entries:
+        by_package[name.split(".")[0]] += self_us
+
+    print(f"\n{module}: {total_us / 1000:.1f} ms total import time")
+    print("\nTop packages by self time:")
+    for package, self_us in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+    print("\nApplication modules by cumulative time:")
+    app_modules = [e for e in entries if e[0].split(".")[0] == module.split(".")[0]]
+    for name, _, cumulative_us in sorted(app_modules, key=lambda e: -e[2])[:top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+    return total_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    totals = []
+    for run in range(args.runs):
+        entries = profile(args.module)
+        # Only print the breakdown once, the runs are for a stable median
+        if run == args.runs - 1:
+            totals.append(report(entries, args.module, args.top))
+        else:
+            totals.append(next(c for n, _, c in entries if n == args.module))
+
+    median_ms = statistics.median(totals) / 1000
+    print(f"\nMedian over {args.runs} runs: {median_ms:.1f} ms")
+    if args.budget_ms is not None and median_ms > args.budget_ms:
+        print(f"FAIL: import time exceeds budget of {args.budget_ms:.0f} ms")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
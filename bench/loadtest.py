@@ -0,0 +1,314 @@
+"""
+End-to-end load test with latency regression checks.
+
+Every virtual user logs in, then loops through a realistic session: a few
+nearby searches while moving around a city, an estimate over 1-6 of the
+merchants it just saw, sometimes an order for that estimate, and a look at
+its order history. Users and cities default to what `python -m app.datagen`
+creates (user0..userN, password "password").
+
+Throughput and p50/p95/p99 latency are reported per endpoint and can be
+saved as a JSON baseline; later runs compared against it exit with status 1
+when latency, throughput or the error rate regress past --tolerance.
+
+    python -m app.datagen --merchants 200000 --users 5000 --truncate
+    RATE_LIMIT_ENABLED=false python -m app.serve --workers 4 &
+    python -m bench.loadtest --vus 64 --save-baseline bench/baselines/main.json
+    python -m bench.loadtest --vus 64 --baseline bench/baselines/main.json
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from app.datagen import DEFAULT_CITIES, parse_city
+
+ENDPOINTS = ("login", "nearby", "estimate", "order", "history")
+KM_PER_DEG = 111.0
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, status: int, seconds: float) -> None:
+        if not self.recording:
+            return
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, index: int, args, recorder: Recorder, stop_at: float):
+        super().__init__(name=f"vu-{index}", daemon=True)
+        self.args = args
+        self.recorder = recorder
+        self.stop_at = stop_at
+        self.rng = random.Random(f"{args.seed}:{index}")
+        self.username = f"{args.user_prefix}{self.rng.randrange(args.user_count)}"
+        target = urlsplit(args.url)
+        self.host, self.port = target.hostname, target.port or 80
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        self.token: Optional[str] = None
+        city = self.rng.choices(args.cities, weights=[c.weight for c in args.cities])[0]
+        self.lat = city.lat + self.rng.gauss(0, city.spread_km / 2) / KM_PER_DEG
+        self.long = city.long + self.rng.gauss(0, city.spread_km / 2) / KM_PER_DEG
+        self.heading = self.rng.uniform(0, 2 * math.pi)
+
+    def request(self, endpoint: str, method: str, path: str, body=None):
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        payload = json.dumps(body) if body is not None else None
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            resp = self.conn.getresponse()
+            data = resp.read()
+            status = resp.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            data, status = b"", 0
+        self.recorder.record(endpoint, status, time.perf_counter() - started)
+        if 200 <= status < 300 and data:
+            return json.loads(data)
+        return None
+
+    def think(self) -> None:
+        if self.args.think_ms:
+            time.sleep(self.rng.expovariate(1000 / self.args.think_ms))
+
+    def move(self) -> None:
+        # Wander 50-300 m, mostly keeping the current heading
+        self.heading += self.rng.gauss(0, 0.5)
+        step_km = self.rng.uniform(0.05, 0.3)
+        self.lat += step_km * math.cos(self.heading) / KM_PER_DEG
+        self.long += step_km * math.sin(self.heading) / KM_PER_DEG
+
+    def login(self) -> bool:
+        body = {"username": self.username, "password": self.args.password}
+        result = self.request("login", "POST", "/api/v1/login", body)
+        self.token = result["access_token"] if result else None
+        return self.token is not None
+
+    def session(self) -> None:
+        merchants = []
+        for _ in range(self.rng.randint(2, 4)):
+            self.move()
+            result = self.request(
+                "nearby",
+                "GET",
+                f"/api/v1/merchants/nearby/{self.lat:.6f},{self.long:.6f}?limit=10",
+            )
+            if result:
+                merchants = [m for m in result["data"] if m["items"]] or merchants
+            self.think()
+
+        if merchants:
+            count = min(self.rng.randint(1, 6), len(merchants))
+            picked = self.rng.sample(merchants, count)
+            body = {
+                "userLocation": {"lat": str(self.lat), "long": str(self.long)},
+                "orders": [
+                    {
+                        "merchantId": m["merchant"]["merchantId"],
+                        "isStartingPoint": i == 0,
+                        "items": [
+                            {"itemId": it["itemId"], "quantity": self.rng.randint(1, 3)}
+                            for it in self.rng.sample(
+                                m["items"], min(self.rng.randint(1, 3), len(m["items"]))
+                            )
+                        ],
+                    }
+                    for i, m in enumerate(picked)
+                ],
+            }
+            estimate = self.request("estimate", "POST", "/api/v1/users/estimate", body)
+            self.think()
+            if estimate and self.rng.random() < self.args.order_ratio:
+                self.request(
+                    "order",
+                    "POST",
+                    "/api/v1/users/orders",
+                    {"calculatedEstimateId": estimate["calculatedEstimateId"]},
+                )
+                self.think()
+
+        offset = self.rng.choice((0, 0, 0, 5, 10))
+        self.request("history", "GET", f"/api/v1/users/orders?limit=5&offset={offset}")
+        self.think()
+
+    def run(self) -> None:
+        if not self.login():
+            return
+        while time.perf_counter() < self.stop_at:
+            self.session()
+            # Tokens are long-lived, but real clients do log in again now and then
+            if self.rng.random() < self.args.relogin_ratio:
+                self.login()
+        self.conn.close()
+
+
+def summarize(recorder: Recorder, seconds: float) -> Dict[str, dict]:
+    endpoints = {}
+    for endpoint in ENDPOINTS:
+        values = sorted(recorder.latencies.get(endpoint, []))
+        statuses = recorder.statuses.get(endpoint, {})
+        total = len(values)
+        if not total:
+            continue
+        errors = sum(n for s, n in statuses.items() if s == 0 or s >= 500)
+        client_errors = sum(n for s, n in statuses.items() if 400 <= s < 500)
+        endpoints[endpoint] = {
+            "requests": total,
+            "throughput": round(total / seconds, 2),
+            "errorRate": round(errors / total, 4),
+            "clientErrorRate": round(client_errors / total, 4),
+            "p50Ms": round(percentile(values, 50) * 1000, 2),
+            "p95Ms": round(percentile(values, 95) * 1000, 2),
+            "p99Ms": round(percentile(values, 99) * 1000, 2),
+            "maxMs": round(values[-1] * 1000, 2),
+            "statuses": {str(s): n for s, n in sorted(statuses.items())},
+        }
+    return endpoints
+
+
+def find_regressions(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    problems = []
+    for endpoint, base in baseline["endpoints"].items():
+        now = current["endpoints"].get(endpoint)
+        if now is None:
+            problems.append(f"{endpoint}: no requests in this run")
+            continue
+        for key in ("p50Ms", "p95Ms", "p99Ms"):
+            # Sub-millisecond noise is not a regression
+            if now[key] > base[key] * (1 + tolerance) and now[key] - base[key] > 1:
+                problems.append(
+                    f"{endpoint}: {key} {base[key]:.1f} -> {now[key]:.1f}"
+                )
+        if now["throughput"] < base["throughput"] * (1 - tolerance):
+            problems.append(
+                f"{endpoint}: throughput {base['throughput']:.1f} -> "
+                f"{now['throughput']:.1f} req/s"
+            )
+        if now["errorRate"] > base["errorRate"] + 0.01:
+            problems.append(
+                f"{endpoint}: error rate {base['errorRate']:.2%} -> "
+                f"{now['errorRate']:.2%}"
+            )
+    return problems
+
+
+def print_report(result: dict) -> None:
+    print(
+        f"{'endpoint':<10} {'req':>8} {'req/s':>8} {'err':>7} {'4xx':>7} "
+        f"{'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    )
+    for endpoint, s in result["endpoints"].items():
+        print(
+            f"{endpoint:<10} {s['requests']:>8} {s['throughput']:>8.1f} "
+            f"{s['errorRate']:>7.2%} {s['clientErrorRate']:>7.2%} "
+            f"{s['p50Ms']:>8.1f} {s['p95Ms']:>8.1f} {s['p99Ms']:>8.1f} "
+            f"{s['maxMs']:>8.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--vus", type=int, default=32, help="Virtual users")
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--warmup", type=float, default=10.0)
+    parser.add_argument("--ramp-up", type=float, default=5.0)
+    parser.add_argument("--think-ms", type=float, default=0.0)
+    parser.add_argument("--order-ratio", type=float, default=0.3)
+    parser.add_argument("--relogin-ratio", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--user-prefix", default="user")
+    parser.add_argument("--user-count", type=int, default=1000)
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--city", type=parse_city, action="append")
+    parser.add_argument("--output", help="Write this run's results as JSON")
+    parser.add_argument("--save-baseline", help="Write results as the new baseline")
+    parser.add_argument("--baseline", help="Compare against this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+    args.cities = args.city or list(DEFAULT_CITIES)
+
+    recorder = Recorder()
+    stop_at = time.perf_counter() + args.warmup + args.duration
+    users = [VirtualUser(i, args, recorder, stop_at) for i in range(args.vus)]
+    for user in users:
+        user.start()
+        time.sleep(args.ramp_up / max(1, args.vus))
+
+    time.sleep(max(0.0, stop_at - args.duration - time.perf_counter()))
+    recorder.recording = True
+    started = time.perf_counter()
+    for user in users:
+        user.join()
+    measured = time.perf_counter() - started
+    recorder.recording = False
+
+    result = {
+        "createdAt": int(time.time()),
+        "host": platform.node(),
+        "cpus": os.cpu_count(),
+        "config": {
+            "url": args.url,
+            "vus": args.vus,
+            "duration": args.duration,
+            "thinkMs": args.think_ms,
+            "orderRatio": args.order_ratio,
+            "seed": args.seed,
+        },
+        "endpoints": summarize(recorder, measured),
+    }
+    print_report(result)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config") != result["config"]:
+            print("warning: baseline was recorded with a different configuration")
+        problems = find_regressions(result, baseline, args.tolerance)
+        if problems:
+            print("Regressions against", args.baseline)
+            for problem in problems:
+                print("  " + problem)
+            sys.exit(1)
+        print("No regressions against", args.baseline)
+
+
+if __name__ == "__main__":
+    main()
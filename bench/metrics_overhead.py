@@ -0,0 +1,72 @@
+"""
+Per-request cost of the metrics instrumentation.
+
+Drives a trivial ASGI app directly (no network, no framework) with and without
+MetricsMiddleware, and times the SQL cursor hooks in isolation, so the numbers
+are the instrumentation overhead alone.
+
+    python -m bench.metrics_overhead --iterations 50000
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.observability.middleware import MetricsMiddleware
+from app.observability.sql import _after_cursor_execute, _before_cursor_execute
+
+SCOPE = {"type": "http", "method": "GET", "path": "/bench", "headers": []}
+
+
+class Route:
+    path = "/bench"
+
+
+async def plain_app(scope, receive, send):
+    scope["route"] = Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+async def per_request_us(app, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await app(dict(SCOPE), receive, send)
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+class Context:
+    pass
+
+
+def per_query_us(iterations: int) -> float:
+    context = Context()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        _before_cursor_execute(None, None, "SELECT 1", None, context, False)
+        _after_cursor_execute(None, None, "SELECT 1", None, context, False)
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+async def main(iterations: int) -> None:
+    baseline = await per_request_us(plain_app, iterations)
+    instrumented = await per_request_us(MetricsMiddleware(plain_app), iterations)
+    print(f"request without middleware: {baseline:7.2f} us")
+    print(f"request with middleware:    {instrumented:7.2f} us")
+    print(f"middleware overhead:        {instrumented - baseline:7.2f} us/request")
+    print(f"SQL hook overhead:          {per_query_us(iterations):7.2f} us/statement")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
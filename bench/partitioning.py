@@ -0,0 +1,290 @@
+"""
+Nearby search on the plain merchants table vs one partitioned by region.
+
+Copies merchants and items into scratch schemas, one plain and one laid out
+by app.merchants.partitioning, then runs the same searches through
+MerchantRepository.get_nearby_merchants against each (search_path picks the
+copy): plain as production searches today, plain with region pruning, and
+partitioned with region pruning. Search points are sampled around existing
+merchants. Reports throughput, p50/p95/p99 latency, statements per search,
+how often the pruned regions could not fill the page alone and what those
+fallbacks cost, and how many partitions a pruned plan reads.
+
+    python -m app.datagen --merchants 500000 --truncate
+    python -m bench.partitioning --scheme list --min-rows 1000
+    python -m bench.partitioning --scheme hash --partitions 16 --searches 5000
+
+The scratch schemas are dropped afterwards unless --keep is given.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import List, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.database import DATABASE_URL, engine
+from app.merchants.partitioning import (
+    TABLES,
+    create_statements,
+    index_definitions,
+    key_statements,
+    large_regions,
+    retarget,
+)
+from app.merchants.regions import search_area
+from app.merchants.repository import MerchantRepository
+from bench.loadtest import percentile
+
+PLAIN_SCHEMA = "bench_unpartitioned"
+PARTITIONED_SCHEMA = "bench_partitioned"
+KM_PER_DEG = 111.0
+
+# name, schema, region pruning
+VARIANTS = (
+    ("unpartitioned", PLAIN_SCHEMA, False),
+    ("unpartitioned+pruning", PLAIN_SCHEMA, True),
+    ("partitioned+pruning", PARTITIONED_SCHEMA, True),
+)
+
+
+async def build(schema: str, scheme: str, partitions: int, min_rows: int) -> None:
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("SET LOCAL statement_timeout = 0")
+        regions = (
+            await large_regions(conn, "public.merchants", min_rows)
+            if scheme == "list"
+            else []
+        )
+        statements = [
+            f"DROP SCHEMA IF EXISTS {schema} CASCADE",
+            f"CREATE SCHEMA {schema}",
+            *create_statements(
+                schema,
+                {table: f"public.{table}" for table in TABLES},
+                scheme,
+                regions,
+                partitions,
+            ),
+            *key_statements(schema, scheme),
+        ]
+        for table in TABLES:
+            for definition in await index_definitions(conn, table, scheme != "none"):
+                statements.append(retarget(definition, table, schema))
+        statements.append(f"ANALYZE {schema}.merchants, {schema}.items")
+        for statement in statements:
+            await conn.exec_driver_sql(statement)
+
+
+async def drop(schema: str) -> None:
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+
+
+async def sample_points(count: int, seed: int) -> List[Tuple[float, float]]:
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text(
+                "SELECT latitude, longitude FROM merchants "
+                "ORDER BY md5(id::text || :seed) LIMIT :count"
+            ),
+            {"seed": str(seed), "count": count},
+        )
+        merchants = result.all()
+    rng = random.Random(seed)
+    # Someone within a couple of km of a merchant, like the load test's users
+    return [
+        (
+            lat + rng.uniform(-2, 2) / KM_PER_DEG,
+            long + rng.uniform(-2, 2) / KM_PER_DEG,
+        )
+        for lat, long in (rng.choice(merchants) for _ in range(count))
+    ]
+
+
+async def partitions_read(schema: str, point: Tuple[float, float], limit: int):
+    """(partitions a pruned search plan reads, partitions in total)."""
+    regions, _ = search_area(*point)
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql(f"SET search_path TO {schema}, public")
+        plan = await conn.scalar(
+            text(
+                """
+                EXPLAIN (FORMAT JSON)
+                SELECT id FROM merchants WHERE region = ANY(:regions)
+                ORDER BY geog <-> ST_SetSRID(ST_MakePoint(:long, :lat), 4326)::geography
+                LIMIT :limit
+                """
+            ),
+            {"regions": regions, "lat": point[0], "long": point[1], "limit": limit},
+        )
+        total = await conn.scalar(
+            text(
+                "SELECT count(*) FROM pg_inherits "
+                "WHERE inhparent = to_regclass(:name)"
+            ),
+            {"name": f"{schema}.merchants"},
+        )
+
+    relations = set()
+    nodes = [(json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if "Relation Name" in node:
+            relations.add(node["Relation Name"])
+        nodes.extend(node.get("Plans", ()))
+    return len(relations), total
+
+
+async def run(
+    schema: str,
+    pruning: bool,
+    points: List[Tuple[float, float]],
+    limit: int,
+    concurrency: int,
+    warmup: int,
+) -> dict:
+    bench_engine = create_async_engine(
+        DATABASE_URL,
+        pool_size=concurrency,
+        max_overflow=0,
+        connect_args={"server_settings": {"search_path": f"{schema}, public"}},
+    )
+    sessionmaker = async_sessionmaker(
+        bench_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        conn.info["statements"] = conn.info.get("statements", 0) + 1
+        # The pruned paths filter merchants by region, the full query does not
+        if "FROM merchants" in statement and "merchants.region" not in statement:
+            conn.info["full"] = True
+
+    settings.nearby_region_pruning = pruning
+    latencies: List[float] = []
+    fallbacks: List[float] = []
+    statements = 0
+    queue: List[Tuple[float, float]] = []
+
+    async def worker(record: bool) -> None:
+        nonlocal statements
+        while queue:
+            lat, long = queue.pop()
+            async with sessionmaker() as session:
+                # The session keeps this connection for the whole search
+                info = (await session.connection()).info
+                info.clear()
+                started = time.perf_counter()
+                await MerchantRepository.get_nearby_merchants(
+                    lat, long, None, None, None, limit, 0, session=session
+                )
+                elapsed = time.perf_counter() - started
+                if record:
+                    latencies.append(elapsed)
+                    statements += info.get("statements", 0)
+                    if pruning and info.get("full"):
+                        fallbacks.append(elapsed)
+
+    try:
+        queue = list(points[:warmup])
+        await asyncio.gather(*(worker(False) for _ in range(concurrency)))
+
+        queue = list(reversed(points))
+        event.listen(bench_engine.sync_engine, "before_cursor_execute", count)
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(True) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await bench_engine.dispose()
+
+    latencies.sort()
+    fallbacks.sort()
+    return {
+        "searches": len(latencies),
+        "seconds": round(elapsed, 2),
+        "searchesPerSecond": round(len(latencies) / elapsed),
+        "p50Ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95Ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99Ms": round(percentile(latencies, 99) * 1000, 2),
+        "statementsPerSearch": round(statements / len(latencies), 2),
+        # Pruned searches that could not fill their page from the nearby
+        # regions and ran the full query after the probe
+        "fallbacks": len(fallbacks),
+        "fallbackP50Ms": (
+            round(percentile(fallbacks, 50) * 1000, 2) if fallbacks else None
+        ),
+    }
+
+
+async def main(args) -> dict:
+    print(f"building {PLAIN_SCHEMA} and {PARTITIONED_SCHEMA} ({args.scheme})...")
+    await build(PLAIN_SCHEMA, "none", 0, 0)
+    await build(PARTITIONED_SCHEMA, args.scheme, args.partitions, args.min_rows)
+    try:
+        points = await sample_points(args.searches, args.seed)
+        if not points:
+            raise SystemExit("No merchants found, load a dataset with app.datagen")
+        read, total = await partitions_read(PARTITIONED_SCHEMA, points[0], args.limit)
+
+        report = {
+            "scheme": args.scheme,
+            "partitionsRead": read,
+            "partitions": total,
+            "variants": {},
+        }
+        for name, schema, pruning in VARIANTS:
+            report["variants"][name] = await run(
+                schema, pruning, points, args.limit, args.concurrency, args.warmup
+            )
+        return report
+    finally:
+        if not args.keep:
+            await drop(PLAIN_SCHEMA)
+            await drop(PARTITIONED_SCHEMA)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--scheme", choices=("list", "hash"), default="list")
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--min-rows", type=int, default=1000)
+    parser.add_argument("--searches", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schemas")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(
+            f"a pruned plan reads {report['partitionsRead']} of "
+            f"{report['partitions']} partitions"
+        )
+        print(
+            f"{'variant':<24}{'searches/s':>12}{'p50 ms':>10}{'p95 ms':>10}"
+            f"{'p99 ms':>10}{'queries':>9}{'fallbacks':>11}{'p50 ms':>10}"
+        )
+        for name, result in report["variants"].items():
+            fallback_p50 = result["fallbackP50Ms"]
+            print(
+                f"{name:<24}{result['searchesPerSecond']:>12}{result['p50Ms']:>10}"
+                f"{result['p95Ms']:>10}{result['p99Ms']:>10}"
+                f"{result['statementsPerSearch']:>9}{result['fallbacks']:>11}"
+                f"{'-' if fallback_p50 is None else fallback_p50:>10}"
+            )
+        print(
+            "\nqueries: statements per search; the last p50 is over the searches "
+            "that fell back to the full query"
+        )
@@ -0,0 +1,160 @@
+"""
+Throughput scaling of `python -m app.serve` with the number of workers.
+
+For each worker count the server is started on a free port, warmed up and
+driven by keep-alive clients in separate processes for --duration seconds.
+Clients share the machine with the server, so leave cores for them when
+measuring the top of the curve.
+
+    python -m bench.serve_scaling --workers 1 2 4 --duration 10
+    python -m bench.serve_scaling --path /api/v1/merchants/nearby/-6.2,106.8 \\
+        --token "$TOKEN"
+"""
+
+import argparse
+import http.client
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit
+
+from bench.startup import free_port
+
+
+def wait_ready(url: str, proc: subprocess.Popen, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with status {proc.returncode}")
+        try:
+            with urllib.request.urlopen(url + "/health", timeout=1) as resp:
+                if resp.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.05)
+    raise TimeoutError(f"server not ready within {timeout}s")
+
+
+def client_process(url, path, token, connections, duration, results) -> None:
+    target = urlsplit(url)
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    counts = [0] * connections
+    errors = [0] * connections
+    stop_at = time.perf_counter() + duration
+
+    def run(slot: int) -> None:
+        conn = http.client.HTTPConnection(target.hostname, target.port, timeout=10)
+        while time.perf_counter() < stop_at:
+            try:
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status < 400:
+                    counts[slot] += 1
+                else:
+                    errors[slot] += 1
+            except (OSError, http.client.HTTPException):
+                errors[slot] += 1
+                conn.close()
+                conn = http.client.HTTPConnection(
+                    target.hostname, target.port, timeout=10
+                )
+        conn.close()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(connections)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    results.put((sum(counts), sum(errors)))
+
+
+def drive(url, path, token, clients, connections, duration):
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(
+            target=client_process,
+            args=(url, path, token, connections, duration, results),
+        )
+        for _ in range(clients)
+    ]
+    for p in procs:
+        p.start()
+    totals = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return sum(t[0] for t in totals), sum(t[1] for t in totals)
+
+
+def measure(workers: int, args) -> tuple:
+    port = free_port()
+    env = {
+        **os.environ,
+        "RUN_MIGRATIONS_ON_STARTUP": "false",
+        "SERVE_ACCESS_LOG": "false",
+    }
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "app.serve",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(url, proc, timeout=60)
+        drive(url, args.path, args.token, args.clients, args.connections, 1.0)
+        ok, failed = drive(
+            url, args.path, args.token, args.clients, args.connections, args.duration
+        )
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait()
+    return ok / args.duration, failed
+
+
+def main() -> None:
+    cpus = os.cpu_count() or 1
+    default_workers = [n for n in (1, 2, 4, 8, 16) if n <= cpus] or [1]
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--token", default=None, help="Bearer token for auth routes")
+    parser.add_argument("--clients", type=int, default=max(1, cpus // 2))
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{cpus} CPUs, {args.clients}x{args.connections} connections, {args.path}")
+    print(
+        f"{'workers':>8} {'req/s':>10} {'speedup':>8} {'efficiency':>11} "
+        f"{'errors':>7}"
+    )
+    baseline = None
+    for workers in args.workers:
+        rps, failed = measure(workers, args)
+        baseline = baseline or rps
+        print(
+            f"{workers:>8} {rps:>10.0f} {rps / baseline:>7.2f}x "
+            f"{rps / baseline / workers:>10.0%} {failed:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Cold-start benchmark: time from spawning uvicorn to the first successful
+GET /health. Migrations are skipped so only import and app start-up are
+measured. Exits with status 1 when the median exceeds --budget-ms.
+
+    python -m bench.startup --runs 5 --budget-ms 3000
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_first_request(timeout: float) -> float:
+    port = free_port()
+    env = {**os.environ, "RUN_MIGRATIONS_ON_STARTUP": "false"}
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}/health"
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with status {proc.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as resp:
+                    if resp.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise TimeoutError(f"no successful request within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    samples = []
+    for _ in range(args.runs):
+        samples.append(time_to_first_request(args.timeout))
+        print(f"  {samples[-1]:8.1f} ms")
+
+    median_ms = statistics.median(samples)
+    print(f"Time to first request: median {median_ms:.1f} ms, max {max(samples):.1f} ms")
+    if args.budget_ms is not None and median_ms > args.budget_ms:
+        print(f"FAIL: startup exceeds budget of {args.budget_ms:.0f} ms")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
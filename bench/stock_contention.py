@@ -0,0 +1,177 @@
+"""
+Concurrency stress run for stock reservation at order placement.
+
+Creates a throw-away merchant with two "hot" items, then places hundreds of
+orders for both items at the same time through OrderService. Every order must
+either succeed or fail with 409; deadlocks or overselling abort the run.
+
+    python -m bench.stock_contention --orders 500 --stock 300
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from collections import Counter
+
+from fastapi import HTTPException
+from geoalchemy2 import WKTElement
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import app.models  # noqa: F401
+from app.database import DATABASE_URL
+from app.estimate.models import Estimate, EstimateItem
+from app.merchants.enums import ItemProductCategoryEnum, MerchantCategoryEnum
+from app.merchants.models import Item, Merchant
+from app.merchants.regions import region_of
+from app.orders.models import Order
+from app.orders.service import OrderService
+from app.users.models import User
+
+
+async def setup(sessionmaker, stock: int):
+    merchant_id, user_id = uuid.uuid4(), uuid.uuid4()
+    item_ids = [uuid.uuid4(), uuid.uuid4()]
+    async with sessionmaker() as session:
+        session.add(
+            User(
+                id=user_id,
+                username=f"stress-{user_id.hex[:12]}",
+                email=f"{user_id.hex}@stress.local",
+                password_hash="-",
+            )
+        )
+        session.add(
+            Merchant(
+                id=merchant_id,
+                name="Stress Merchant",
+                merchant_category=MerchantCategoryEnum.BoothKiosk,
+                image_url="https://cdn.example.com/images/stress.jpg",
+                latitude=-6.2,
+                longitude=106.8,
+                geog=WKTElement("POINT(106.8 -6.2)", srid=4326),
+            )
+        )
+        await session.flush()
+        for item_id in item_ids:
+            session.add(
+                Item(
+                    id=item_id,
+                    merchant_id=merchant_id,
+                    region=region_of(-6.2, 106.8),
+                    name="Hot Item",
+                    product_category=ItemProductCategoryEnum.Food,
+                    price=1000,
+                    quantity=stock,
+                    image_url="https://cdn.example.com/images/hot.jpg",
+                )
+            )
+        await session.flush()
+
+        # Two estimates listing the same items in opposite order, the classic
+        # recipe for a lock-order deadlock.
+        estimate_ids = []
+        for ordered_ids in (item_ids, list(reversed(item_ids))):
+            estimate = Estimate(id=uuid.uuid4(), total_price=2000, est_minutes=1)
+            session.add(estimate)
+            await session.flush()
+            for item_id in ordered_ids:
+                session.add(
+                    EstimateItem(
+                        estimate_id=estimate.id,
+                        item_id=item_id,
+                        merchant_id=merchant_id,
+                        quantity=1,
+                        unit_price=1000,
+                        item_name="Hot Item",
+                        product_category=ItemProductCategoryEnum.Food.value,
+                        image_url="https://cdn.example.com/images/hot.jpg",
+                    )
+                )
+            estimate_ids.append(str(estimate.id))
+        await session.commit()
+        user = await session.get(User, user_id)
+    return user, merchant_id, item_ids, estimate_ids
+
+
+async def place(sessionmaker, estimate_id: str, user) -> str:
+    async with sessionmaker() as session:
+        try:
+            await OrderService.place_order_from_estimate(session, estimate_id, user)
+            return "created"
+        except HTTPException as exc:
+            if exc.status_code == 409:
+                return "out_of_stock"
+            raise
+
+
+async def teardown(sessionmaker, user, merchant_id):
+    async with sessionmaker() as session:
+        await session.execute(delete(Order).where(Order.user_id == user.id))
+        await session.execute(delete(User).where(User.id == user.id))
+        await session.execute(
+            delete(Estimate).where(
+                Estimate.id.in_(
+                    select(EstimateItem.estimate_id).where(
+                        EstimateItem.merchant_id == merchant_id
+                    )
+                )
+            )
+        )
+        await session.execute(delete(Merchant).where(Merchant.id == merchant_id))
+        await session.commit()
+
+
+async def main(orders: int, stock: int, concurrency: int) -> int:
+    engine = create_async_engine(
+        DATABASE_URL, pool_size=concurrency, max_overflow=0, pool_timeout=120
+    )
+    sessionmaker = async_sessionmaker(
+        engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+    user, merchant_id, item_ids, estimate_ids = await setup(sessionmaker, stock)
+    try:
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(
+            *(
+                place(sessionmaker, estimate_ids[i % 2], user)
+                for i in range(orders)
+            ),
+            return_exceptions=True,
+        )
+        elapsed = time.perf_counter() - started
+
+        counts = Counter(
+            o if isinstance(o, str) else type(o).__name__ for o in outcomes
+        )
+        async with sessionmaker() as session:
+            result = await session.execute(
+                select(Item.quantity).where(Item.id.in_(item_ids))
+            )
+            remaining = sorted(result.scalars().all())
+
+        expected_created = min(orders, stock)
+        print(f"orders={orders} stock={stock} concurrency={concurrency}")
+        print(f"elapsed={elapsed:.2f}s throughput={orders / elapsed:.0f} orders/s")
+        print(f"outcomes={dict(counts)} remaining_stock={remaining}")
+
+        ok = (
+            counts.get("created", 0) == expected_created
+            and counts.get("out_of_stock", 0) == orders - expected_created
+            and remaining == [stock - expected_created] * 2
+        )
+        print("PASS" if ok else "FAIL")
+        return 0 if ok else 1
+    finally:
+        await teardown(sessionmaker, user, merchant_id)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--stock", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.orders, args.stock, args.concurrency)))